@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser
+from .models import CustomUser, Job
 
 @admin.register(CustomUser)
 class CustomUserAdmin(UserAdmin):
@@ -8,4 +8,12 @@ class CustomUserAdmin(UserAdmin):
     Настраиваем панель отображения, критерии поиска и сортировка списка пользователей"""
     list_display = ('username', 'first_name', 'last_name', 'email')
     search_fields = ('username', 'first_name', 'last_name', 'email')
-    ordering = ('username',)
\ No newline at end of file
+    ordering = ('username',)
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """Фоновые задачи: очередь и задачи, завершившиеся ошибкой (с текстом последней ошибки)"""
+    list_display = ('id', 'kind', 'status', 'attempts', 'run_after', 'locked_by')
+    list_filter = ('status', 'kind')
+    ordering = ('run_after', 'id')
\ No newline at end of file
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ImageShareConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'image_share'
+
+    def ready(self):
+        """Подключение обработчиков сигналов, сбрасывающих кеш фрагментов"""
+        from . import signals  # noqa: F401
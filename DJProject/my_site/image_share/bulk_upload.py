@@ -0,0 +1,132 @@
+import os
+import zipfile
+import zlib
+
+from django import forms
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.validators import FileExtensionValidator
+from django.db import transaction
+
+from .caching import invalidate_gallery
+from .jobs import enqueue_many
+from .models import Image
+
+"""Массовая загрузка: много файлов в одной форме или ZIP-архивы с изображениями.
+Файлы архива распаковываются по одному и потоково, блоками, во временный файл загрузки
+(как большие файлы формы), поэтому архив не распаковывается целиком ни в память, ни на диск.
+Каждый файл проверяется так же, как в ImageForm (расширение и разбор Pillow), и сохраняется в хранилище,
+а строки Image и задачи их обработки вставляются одной транзакцией через bulk_create.
+Ошибка в одном файле не прерывает загрузку: результат сообщается по каждому файлу"""
+
+IMAGE_EXTENSIONS = ['jpeg', 'jpg', 'png', 'gif']
+CHUNK_SIZE = 64 * 1024  # Размер блока распаковки (64 КБ)
+
+# Ошибки чтения отдельного файла архива: поврежденные данные, шифрование, неизвестное сжатие
+_MEMBER_ERRORS = (zipfile.BadZipFile, zlib.error, EOFError, RuntimeError, NotImplementedError)
+_image_field = forms.ImageField(validators=[FileExtensionValidator(IMAGE_EXTENSIONS)])
+
+
+class TooManyFiles(ValueError):
+    """Исключение возбуждается, если в запросе больше BULK_UPLOAD_MAX_FILES файлов"""
+
+
+def _is_hidden(path):
+    """Служебные файлы архиваторов: __MACOSX/, .DS_Store, ._имя"""
+    return any(part == '__MACOSX' or part.startswith('.') for part in path.split('/'))
+
+
+def _is_zip(uploaded_file):
+    return os.path.splitext(uploaded_file.name)[1].lower() == '.zip'
+
+
+def _extract(archive, member):
+    """Распаковывает файл архива блоками во временный файл загрузки"""
+    size_limit = settings.BULK_UPLOAD_MAX_FILE_SIZE
+    extracted = TemporaryUploadedFile(os.path.basename(member.filename), None, member.file_size, None)
+    try:
+        with archive.open(member) as data:
+            for chunk in iter(lambda: data.read(CHUNK_SIZE), b''):
+                if extracted.tell() + len(chunk) > size_limit:  # Размер в оглавлении мог быть неверным
+                    raise ValidationError(f'Файл превышает допустимый размер {size_limit} байт')
+                extracted.write(chunk)
+    except BaseException:
+        extracted.close()
+        raise
+    extracted.seek(0)
+    return extracted
+
+
+def _entries(uploaded_files):
+    """Раскрывает загруженные файлы в список (имя, функция открытия, ошибка).
+    Для архива читается только оглавление, данные файлов не распаковываются"""
+    entries = []
+    for uploaded_file in uploaded_files:
+        if not _is_zip(uploaded_file):
+            entries.append((uploaded_file.name, lambda uploaded_file=uploaded_file: uploaded_file, None))
+            continue
+        try:
+            archive = zipfile.ZipFile(uploaded_file)
+        except zipfile.BadZipFile:
+            entries.append((uploaded_file.name, None, 'Поврежденный ZIP-архив'))
+            continue
+        for member in archive.infolist():
+            if member.is_dir() or _is_hidden(member.filename):
+                continue
+            name = f'{uploaded_file.name}/{member.filename}'
+            if member.file_size > settings.BULK_UPLOAD_MAX_FILE_SIZE:
+                entries.append((name, None, f'Файл превышает допустимый размер '
+                                            f'{settings.BULK_UPLOAD_MAX_FILE_SIZE} байт'))
+            else:
+                entries.append((name, lambda archive=archive, member=member: _extract(archive, member), None))
+    return entries
+
+
+def save_images(uploaded_files, user, description=''):
+    """Функция сохраняет изображения из загруженных файлов и ZIP-архивов и возвращает
+    результат по каждому файлу - словари {'name', 'image', 'error'} в порядке загрузки.
+    Название изображения - имя файла без расширения.
+    Если файлов больше BULK_UPLOAD_MAX_FILES, возбуждает TooManyFiles, ничего не сохранив"""
+    entries = _entries(uploaded_files)
+    if len(entries) > settings.BULK_UPLOAD_MAX_FILES:
+        raise TooManyFiles(f'Можно загрузить не больше {settings.BULK_UPLOAD_MAX_FILES} файлов за раз')
+    results, images = [], []
+    for name, opener, error in entries:
+        result = {'name': name, 'image': None, 'error': error}
+        results.append(result)
+        if error is not None:
+            continue
+        try:
+            image_file = opener()
+        except ValidationError as e:
+            result['error'] = ' '.join(e.messages)
+            continue
+        except _MEMBER_ERRORS as e:
+            result['error'] = f'Не удалось прочитать файл из архива: {e}'
+            continue
+        try:
+            _image_field.clean(image_file)
+            file_name = os.path.basename(image_file.name)
+            image = Image(title=os.path.splitext(file_name)[0][:100], description=description, user=user)
+            image.image.save(file_name, image_file, save=False)  # Файл записывается в хранилище сразу
+        except ValidationError as e:
+            result['error'] = ' '.join(e.messages)
+            continue
+        finally:
+            image_file.close()
+        result['image'] = image
+        images.append(image)
+    if not images:
+        return results
+    try:
+        with transaction.atomic():
+            Image.objects.bulk_create(images)  # Один INSERT; id возвращаются (RETURNING)
+            enqueue_many('process_image', [{'image_id': image.pk} for image in images])
+            # bulk_create не отправляет сигналы, кеш галереи сбрасывается явно
+            transaction.on_commit(invalidate_gallery)
+    except BaseException:
+        for image in images:
+            image.image.delete(save=False)  # Файлы записаны до транзакции
+        raise
+    return results
@@ -0,0 +1,52 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+"""Версии ключей кеша фрагментов галереи и страниц изображений.
+Версия входит в ключ фрагмента ({% cache %}), поэтому при изменении изображения
+или комментария достаточно сменить версию: старые фрагменты больше не читаются
+и со временем вытесняются из кеша"""
+
+FRAGMENT_CACHE_TIMEOUT = getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 600)
+
+GALLERY_VERSION_KEY = 'image_share:gallery_version'
+IMAGE_VERSION_KEY = 'image_share:image_version:{}'
+
+
+def _new_version():
+    """Версия - текущее время в наносекундах. Она не совпадает ни с одной из прежних версий,
+    даже если ключ версии был вытеснен из кеша"""
+    return time.time_ns()
+
+
+def _get_version(key):
+    """Возвращает текущую версию ключа, создавая ее при первом обращении"""
+    return cache.get_or_set(key, _new_version, timeout=None)
+
+
+def _bump_version(key):
+    """Меняет версию ключа. Запись новой версии одним set не зависит от атомарности incr
+    в бэкенде кеша: при одновременных изменениях побеждает любая из новых версий"""
+    cache.set(key, _new_version(), timeout=None)
+
+
+def gallery_version():
+    """Версия фрагментов галереи"""
+    return _get_version(GALLERY_VERSION_KEY)
+
+
+def image_version(image_id):
+    """Версия фрагмента страницы изображения"""
+    return _get_version(IMAGE_VERSION_KEY.format(image_id))
+
+
+def invalidate_gallery():
+    """Делает устаревшими все страницы галереи"""
+    _bump_version(GALLERY_VERSION_KEY)
+
+
+def invalidate_image(image_id):
+    """Делает устаревшими страницу изображения и галерею, где оно показано"""
+    _bump_version(IMAGE_VERSION_KEY.format(image_id))
+    invalidate_gallery()
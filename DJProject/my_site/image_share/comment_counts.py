@@ -0,0 +1,17 @@
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Image
+
+"""Сверка денормализованного счетчика Image.comment_count с таблицей комментариев.
+Счетчик поддерживается сигналами (signals.py); сверка нужна после bulk_create
+и для исправления расхождений"""
+
+
+def reconcile_comment_counts():
+    """Пересчитывает счетчики, отличающиеся от фактического числа комментариев.
+    Возвращает число исправленных изображений"""
+    actual = Coalesce(Subquery(
+        Comment.objects.filter(image=OuterRef('pk')).order_by()
+        .values('image').annotate(count=Count('pk')).values('count')), 0)
+    return Image.objects.exclude(comment_count=actual).update(comment_count=actual)
@@ -0,0 +1,55 @@
+import csv
+import json
+from itertools import islice
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Comment, CustomUser, Image
+
+"""Потоковая выгрузка пользователей, изображений и комментариев в формате NDJSON или CSV.
+Строки читаются из базы через iterator(chunk_size=EXPORT_CHUNK_SIZE): QuerySet не кеширует результат,
+а values_list не создает объекты моделей, поэтому таблица не загружается в память целиком.
+Строки преобразуются в текст частями по EXPORT_CHUNK_SIZE и сразу отдаются клиенту,
+так что память не зависит от размера таблицы. Пароли не выгружаются.
+Пример: python manage.py export images --format csv --output images.csv"""
+
+FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv; charset=utf-8'}  # Формат -> тип содержимого
+TABLES = {  # Имя выгрузки -> модель и выгружаемые поля
+    'users': (CustomUser, ('id', 'username', 'first_name', 'last_name', 'email', 'birth_date', 'date_joined')),
+    'images': (Image, ('id', 'user_id', 'image', 'title', 'description', 'width', 'height', 'format',
+                       'file_size', 'comment_count', 'created_at')),
+    'comments': (Comment, ('id', 'image_id', 'user_id', 'content', 'created_at')),
+}
+
+
+class _Echo:
+    """Файловый объект для csv.writer: writerow возвращает строку вместо записи"""
+
+    def write(self, value):
+        return value
+
+
+def _encoder(table, fmt):
+    """Возвращает заголовок выгрузки и функцию, преобразующую часть строк в текст"""
+    fields = TABLES[table][1]
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        return writer.writerow(fields), lambda rows: ''.join(writer.writerow(row) for row in rows)
+
+    def ndjson(rows):
+        return ''.join(json.dumps(dict(zip(fields, row)), ensure_ascii=False, cls=DjangoJSONEncoder) + '\n'
+                       for row in rows)
+    return '', ndjson
+
+
+def export_rows(table, fmt):
+    """Генератор выгрузки таблицы table: заголовок, затем текст каждой части из EXPORT_CHUNK_SIZE строк"""
+    model, fields = TABLES[table]
+    chunk_size = settings.EXPORT_CHUNK_SIZE
+    header, encode = _encoder(table, fmt)
+    if header:
+        yield header
+    rows = model.objects.order_by('pk').values_list(*fields).iterator(chunk_size=chunk_size)
+    while part := list(islice(rows, chunk_size)):
+        yield encode(part)
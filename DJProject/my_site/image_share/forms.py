@@ -77,6 +77,32 @@ class ImageForm(forms.ModelForm):
         ]
 
 
+class MultipleFileInput(forms.FileInput):
+    """Поле выбора нескольких файлов"""
+    allow_multiple_selected = True
+
+
+class MultipleFileField(forms.FileField):
+    """Поле формы со списком файлов; каждый файл проверяется как в FileField"""
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('widget', MultipleFileInput())
+        super().__init__(*args, **kwargs)
+
+    def clean(self, data, initial=None):
+        single_file_clean = super().clean
+        if isinstance(data, (list, tuple)):
+            return [single_file_clean(item, initial) for item in data]
+        return [single_file_clean(data, initial)]
+
+
+class BulkUploadForm(forms.Form):
+    """Отображение полей для массовой загрузки: несколько изображений или ZIP-архивов
+    и общее описание. Названия изображений берутся из имен файлов"""
+    files = MultipleFileField(label='Изображения или ZIP-архивы',
+                              widget=MultipleFileInput(attrs={'accept': 'image/*,.zip'}))
+    description = forms.CharField(label='Описание', required=False, widget=forms.Textarea)
+
+
 class CommentForm(forms.ModelForm):
     """Отображение полей, где можно оставить комментарий"""
     class Meta:
@@ -0,0 +1,140 @@
+import logging
+import os
+import signal
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .caching import invalidate_image
+from .duplicates import find_duplicate
+from .metadata import extract_metadata
+from .models import Image, Job
+from .thumbnails import make_thumbnails
+
+"""Очередь фоновых задач в таблице Job той же базы SQLite.
+Обработчик запроса добавляет задачу в своей транзакции (вместе со строкой изображения) и сразу отвечает,
+а разбор файла и миниатюры выполняют отдельные процессы-обработчики:
+    python manage.py run_jobs --concurrency 4
+Процесс забирает задачу условным UPDATE: задачу получает только тот, чей UPDATE изменил строку.
+Выполненная задача удаляется в одной транзакции с результатом. При ошибке задача повторяется
+с задержкой JOB_RETRY_DELAY * 2^(попытка - 1), после JOB_MAX_ATTEMPTS попыток получает статус failed.
+Задача процесса, завершившегося аварийно, снова становится доступной через JOB_LEASE секунд,
+поэтому обработчики задач должны быть идемпотентными"""
+
+CLAIM_CANDIDATES = 10  # Сколько задач просматривается за одну попытку взять задачу
+
+logger = logging.getLogger(__name__)
+handlers = {}  # Вид задачи -> обработчик
+_stopping = False
+
+
+def job_handler(kind):
+    """Декоратор регистрирует обработчик задач вида kind - функцию handler(**payload).
+    Обработчик выполняется в транзакции, в которой задача удаляется после успешного выполнения"""
+    def register(handler):
+        handlers[kind] = handler
+        return handler
+    return register
+
+
+def enqueue(kind, **payload):
+    """Создает задачу. Вызывается внутри транзакции, сохраняющей данные, для которых создана задача,
+    чтобы задача и данные фиксировались вместе"""
+    return Job.objects.create(kind=kind, payload=payload, max_attempts=settings.JOB_MAX_ATTEMPTS)
+
+
+def enqueue_many(kind, payloads):
+    """Создает задачи для списка аргументов payloads одним запросом (bulk_create).
+    Как и enqueue, вызывается внутри транзакции, сохраняющей данные"""
+    return Job.objects.bulk_create(Job(kind=kind, payload=payload, max_attempts=settings.JOB_MAX_ATTEMPTS)
+                                   for payload in payloads)
+
+
+def _available(now):
+    """Условие доступности задачи: ожидающая, срок которой наступил, или брошенная обработчиком"""
+    return (Q(status=Job.QUEUED, run_after__lte=now)
+            | Q(status=Job.RUNNING, locked_at__lt=now - timedelta(seconds=settings.JOB_LEASE)))
+
+
+def claim(worker):
+    """Забирает одну доступную задачу и возвращает ее или None, если очередь пуста"""
+    now = timezone.now()
+    candidates = (Job.objects.filter(_available(now)).order_by('run_after', 'pk')
+                  .values_list('pk', 'status', 'attempts', 'max_attempts')[:CLAIM_CANDIDATES])
+    for job_id, job_status, attempts, max_attempts in candidates:
+        available = Job.objects.filter(_available(now), pk=job_id)
+        if job_status == Job.RUNNING and attempts >= max_attempts:
+            # Брошенная задача, исчерпавшая попытки (например, обработчик падает на ней целиком)
+            available.update(status=Job.FAILED, locked_at=None, locked_by=None,
+                             last_error='Превышено время выполнения')
+        elif available.update(status=Job.RUNNING, attempts=F('attempts') + 1, locked_at=now, locked_by=worker):
+            return Job.objects.get(pk=job_id)
+    return None
+
+
+def run_job(job):
+    """Выполняет взятую задачу. При ошибке откладывает повтор или помечает задачу как failed"""
+    job_id = job.pk
+    try:
+        handler = handlers.get(job.kind)
+        if handler is None:
+            raise LookupError(f'Нет обработчика задач {job.kind}')
+        with transaction.atomic():
+            handler(**job.payload)
+            job.delete()
+        return True
+    except Exception:
+        logger.exception(f'Задача {job_id}: попытка {job.attempts} из {job.max_attempts} не удалась')
+        Job.objects.filter(pk=job_id).update(
+            status=Job.FAILED if job.attempts >= job.max_attempts else Job.QUEUED,
+            run_after=timezone.now() + timedelta(seconds=settings.JOB_RETRY_DELAY * 2 ** (job.attempts - 1)),
+            locked_at=None, locked_by=None, last_error=traceback.format_exc(limit=5))
+        return False
+
+
+def _stop(signum, frame):
+    global _stopping
+    _stopping = True
+
+
+def work(worker, once=False):
+    """Цикл процесса-обработчика: выполняет задачи по одной до сигнала остановки
+    (текущая задача при этом завершается), а с once=True - пока очередь не опустеет.
+    Возвращает число выполненных задач"""
+    signal.signal(signal.SIGINT, _stop)
+    signal.signal(signal.SIGTERM, _stop)
+    done = 0
+    try:
+        while not _stopping:
+            close_old_connections()
+            job = claim(worker)
+            if job is None:
+                if once:
+                    break
+                time.sleep(settings.JOB_POLL_INTERVAL)
+                continue
+            done += run_job(job)
+    finally:
+        close_old_connections()
+    return done
+
+
+@job_handler('process_image')
+def process_image(image_id):
+    """Размеры, формат, LQIP-заглушка, перцептивный хеш и миниатюры загруженного файла,
+    а по хешу - ранее загруженная копия изображения"""
+    image = Image.objects.filter(pk=image_id).only('id', 'image').first()
+    if image is None:  # Изображение удалено до обработки
+        return
+    path = image.image.path
+    metadata = extract_metadata(path, os.path.getsize(path)) or {}
+    thumbnails = make_thumbnails(path, settings.MEDIA_ROOT)
+    duplicate_of_id = find_duplicate(metadata['phash'], image_id) if metadata.get('phash') else None
+    Image.objects.filter(pk=image_id).update(thumbnails=thumbnails, duplicate_of_id=duplicate_of_id, **metadata)
+    # update() не отправляет сигналы, кеш сбрасывается явно после фиксации
+    transaction.on_commit(lambda: invalidate_image(image_id))
@@ -0,0 +1,54 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from image_share.caching import invalidate_gallery
+from image_share.metadata import extract_metadata
+from image_share.models import Image
+
+METADATA_FIELDS = ('width', 'height', 'format', 'file_size', 'placeholder', 'phash')
+
+
+class Command(BaseCommand):
+    """Команда заполняет размеры, формат, размер файла, LQIP-заглушку и перцептивный хеш
+    для уже загруженных изображений (каталог media/media).
+    Файлы разбираются в пуле потоков (Pillow освобождает GIL при декодировании),
+    одинаковые файлы - один раз, строки обновляются пакетами bulk_update.
+    Пример: python manage.py backfill_image_metadata --workers 4"""
+    help = 'Заполняет метаданные изображений, у которых их еще нет'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None, help='Число потоков разбора файлов')
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        updated, last_id = 0, 0
+        with ThreadPoolExecutor(options['workers']) as executor:
+            while True:
+                images = list(Image.objects.filter(phash__isnull=True, pk__gt=last_id)
+                              .only('id', 'image').order_by('pk')[:options['batch_size']])
+                if not images:
+                    break
+                last_id = images[-1].pk
+                paths = sorted({image.image.path for image in images})
+                found = dict(zip(paths, executor.map(self.read, paths)))
+                changed = []
+                for image in images:
+                    metadata = found[image.image.path]
+                    if metadata is not None:
+                        for name, value in metadata.items():
+                            setattr(image, name, value)
+                        changed.append(image)
+                Image.objects.bulk_update(changed, METADATA_FIELDS)
+                updated += len(changed)
+        if updated:
+            invalidate_gallery()
+        self.stdout.write(self.style.SUCCESS(f'Обновлено изображений: {updated}'))
+
+    def read(self, path):
+        """Метаданные файла или None, если файла нет или он не является изображением"""
+        try:
+            return extract_metadata(path, os.path.getsize(path))
+        except OSError:
+            return None
@@ -0,0 +1,27 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from image_share.export import FORMATS, TABLES, export_rows
+
+
+class Command(BaseCommand):
+    """Команда выгружает таблицу в NDJSON или CSV потоково, частями (image_share/export.py).
+    Пример: python manage.py export images --format csv --output images.csv"""
+    help = 'Выгружает пользователей, изображения или комментарии в NDJSON или CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('table', choices=sorted(TABLES), help='Что выгружать')
+        parser.add_argument('--format', choices=sorted(FORMATS), default='ndjson', help='Формат выгрузки')
+        parser.add_argument('--output', help='Файл выгрузки (по умолчанию стандартный вывод)')
+
+    def handle(self, *args, **options):
+        output = options['output']
+        # newline='': строки CSV уже заканчиваются на \r\n и не должны преобразовываться
+        out = open(output, 'w', encoding='utf-8', newline='') if output else sys.stdout
+        try:
+            for text in export_rows(options['table'], options['format']):
+                out.write(text)
+        finally:
+            if output:
+                out.close()
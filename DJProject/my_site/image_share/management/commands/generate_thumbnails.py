@@ -0,0 +1,56 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from image_share.caching import invalidate_image
+from image_share.models import Image
+from image_share.thumbnails import get_executor, make_thumbnails
+
+WINDOW_SIZE = 100  # Сколько изображений отправляется в пул за раз
+
+class Command(BaseCommand):
+    """Команда создает миниатюры для уже загруженных изображений (каталог media/media).
+    Изображения читаются и отправляются в пул окнами по WINDOW_SIZE, результаты окна записываются
+    до чтения следующего, поэтому память не зависит от числа изображений.
+    Пример: python manage.py generate_thumbnails --force"""
+    help = 'Создает миниатюры для изображений, у которых их еще нет'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true',
+                            help='Пересоздать миниатюры для всех изображений')
+
+    def handle(self, *args, **options):
+        images = Image.objects.only('id', 'image').order_by('id')
+        if not options['force']:
+            images = images.filter(thumbnails={})
+
+        executor = get_executor()
+        done, last_id = 0, 0
+        # Окна читаются по возрастанию id отдельными запросами, а не одним курсором:
+        # SQLite не изолирует открытый курсор от обновлений той же таблицы
+        while window := list(images.filter(pk__gt=last_id)[:WINDOW_SIZE]):
+            last_id = window[-1].pk
+            futures = {}
+            for image in window:
+                if not os.path.exists(image.image.path):
+                    self.stderr.write(f'Файл не найден: {image.image.path}')
+                    continue
+                futures[image.pk] = executor.submit(make_thumbnails, image.image.path, settings.MEDIA_ROOT)
+            done += self._save(futures)
+        executor.shutdown()
+        self.stdout.write(self.style.SUCCESS(f'Миниатюры созданы для {done} изображений'))
+
+    def _save(self, futures):
+        """Записывает миниатюры окна по мере готовности и возвращает число успешно обработанных"""
+        done = 0
+        for image_id, future in futures.items():
+            try:
+                thumbnails = future.result()
+            except Exception as e:
+                self.stderr.write(f'Изображение {image_id}: {e}')
+                continue
+            Image.objects.filter(pk=image_id).update(thumbnails=thumbnails)
+            invalidate_image(image_id)
+            done += 1
+        return done
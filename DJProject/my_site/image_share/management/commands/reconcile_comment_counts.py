@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from image_share.caching import invalidate_gallery
+from image_share.comment_counts import reconcile_comment_counts
+
+
+class Command(BaseCommand):
+    """Команда пересчитывает Image.comment_count по таблице комментариев.
+    Пример: python manage.py reconcile_comment_counts"""
+    help = 'Исправляет расхождения счетчиков комментариев изображений'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            fixed = reconcile_comment_counts()
+        if fixed:
+            invalidate_gallery()
+        self.stdout.write(self.style.SUCCESS(f'Исправлено счетчиков: {fixed}'))
@@ -0,0 +1,54 @@
+import os
+import signal
+import socket
+from multiprocessing import get_context
+
+from django.core.management.base import BaseCommand
+
+
+def _work_process(worker, once):
+    """Точка входа дочернего процесса. В контексте spawn Django настраивается заново,
+    поэтому модели импортируются только после django.setup()"""
+    import django
+
+    django.setup()
+    from image_share.jobs import work
+
+    work(worker, once)
+
+
+class Command(BaseCommand):
+    """Команда запускает процессы-обработчики фоновых задач (image_share/jobs.py):
+    разбор загруженных файлов и создание миниатюр.
+    Пример: python manage.py run_jobs --concurrency 4"""
+    help = 'Выполняет фоновые задачи обработки загруженных изображений'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=os.cpu_count() or 1,
+                            help='Число процессов-обработчиков')
+        parser.add_argument('--once', action='store_true', help='Выполнить накопившиеся задачи и завершиться')
+
+    def handle(self, *args, **options):
+        from image_share.jobs import work
+
+        name = f'{socket.gethostname()}:{os.getpid()}'
+        if options['concurrency'] <= 1:
+            done = work(name, options['once'])
+            self.stdout.write(self.style.SUCCESS(f'Выполнено задач: {done}'))
+            return
+        # spawn: каждый процесс открывает собственные соединения с базой
+        context = get_context('spawn')
+        processes = [context.Process(target=_work_process, args=(f'{name}/{number}', options['once']))
+                     for number in range(options['concurrency'])]
+        for process in processes:
+            process.start()
+
+        def forward(signum, frame):
+            for process in processes:
+                if process.is_alive():
+                    os.kill(process.pid, signal.SIGTERM)
+
+        signal.signal(signal.SIGINT, forward)
+        signal.signal(signal.SIGTERM, forward)
+        for process in processes:
+            process.join()
@@ -0,0 +1,116 @@
+import os
+import random
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Max
+from PIL import Image as PilImage
+
+from image_share.caching import invalidate_gallery
+from image_share.comment_counts import reconcile_comment_counts
+from image_share.metadata import extract_metadata
+from image_share.models import Comment, CustomUser, Image
+from image_share.search import search_index_suspended
+
+WORDS = ('закат', 'море', 'горы', 'город', 'лес', 'река', 'кот', 'собака', 'поезд', 'мост',
+         'снег', 'небо', 'цветы', 'портрет', 'улица', 'ночь', 'облака', 'озеро', 'корабль', 'поле')
+PLACEHOLDER_DIR = 'media/seed'  # Относительно MEDIA_ROOT
+
+
+def batched(iterable, size):
+    """Разбивает итератор на списки по size элементов"""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def phrase(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+class Command(BaseCommand):
+    """Команда заполняет базу синтетическими пользователями, изображениями и комментариями
+    для проверки под нагрузкой. Данные детерминированы (--seed), строки вставляются
+    пакетами bulk_create в одной транзакции, хеш пароля вычисляется один раз для всех,
+    изображения ссылаются на небольшой набор файлов-заглушек, а полнотекстовый индекс
+    и счетчики комментариев строятся один раз после вставки.
+    Пример: python manage.py seed_data --users 10000 --images 100000 --comments 1000000"""
+    help = 'Заполняет базу синтетическими данными для нагрузочного тестирования'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--images', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=50000)
+        parser.add_argument('--placeholders', type=int, default=16, help='Число различных файлов-заглушек')
+        parser.add_argument('--password', default='seed-password', help='Пароль всех созданных пользователей')
+        parser.add_argument('--seed', type=int, default=0, help='Начальное значение генератора')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        authors = []
+        if not options['users'] and options['images']:  # Авторы - уже существующие пользователи
+            authors = list(CustomUser.objects.values_list('id', flat=True))
+            if not authors:
+                raise CommandError('В базе нет пользователей - авторов изображений, укажите --users больше 0')
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        placeholders = self.make_placeholders(options['placeholders'], rng)
+        metadata = {name: extract_metadata(os.path.join(settings.MEDIA_ROOT, name),
+                                           os.path.getsize(os.path.join(settings.MEDIA_ROOT, name))) or {}
+                    for name in placeholders}  # Одинаковые для всех изображений с этим файлом
+        password = make_password(options['password'])  # Один хеш на всех пользователей
+
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous = OFF')  # Только для этого соединения на время заполнения
+
+        with transaction.atomic(), search_index_suspended():
+            first_user = (CustomUser.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+            user_ids = range(first_user, first_user + options['users'])
+            users = (CustomUser(id=user_id, username=f'seed{user_id}', password=password,
+                                first_name=rng.choice(WORDS).title(), last_name=rng.choice(WORDS).title(),
+                                email=f'seed{user_id}@example.com')
+                     for user_id in user_ids)
+            for batch in batched(users, batch_size):
+                CustomUser.objects.bulk_create(batch)
+            self.stdout.write(f'Пользователей: {len(user_ids)}')
+            authors = user_ids or authors
+
+            first_image = (Image.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+            image_ids = range(first_image, first_image + options['images'])
+            images = (Image(id=image_id, user_id=rng.choice(authors), image=name,
+                            title=phrase(rng, 2).capitalize(), description=phrase(rng, 8), **metadata[name])
+                      for image_id in image_ids for name in [rng.choice(placeholders)])
+            for batch in batched(images, batch_size):
+                Image.objects.bulk_create(batch)
+            self.stdout.write(f'Изображений: {len(image_ids)}')
+
+            if image_ids:
+                comments = (Comment(image_id=rng.choice(image_ids), user_id=rng.choice(authors),
+                                    content=phrase(rng, 6))
+                            for _ in range(options['comments']))
+                for batch in batched(comments, batch_size):
+                    Comment.objects.bulk_create(batch)
+                self.stdout.write(f'Комментариев: {options["comments"]}')
+                reconcile_comment_counts()  # bulk_create не отправляет сигналы, обновляющие счетчики
+
+        invalidate_gallery()  # bulk_create не отправляет сигналы post_save
+        self.stdout.write(self.style.SUCCESS('Данные созданы'))
+
+    def make_placeholders(self, count, rng):
+        """Создает изображения-заглушки из 16 x 12 прямоугольников случайных цветов
+        и возвращает их пути относительно MEDIA_ROOT. Перцептивные хеши таких заглушек различаются;
+        у однотонных изображений хеш нулевой, и все изображения базы оказались бы копиями друг друга"""
+        os.makedirs(os.path.join(settings.MEDIA_ROOT, PLACEHOLDER_DIR), exist_ok=True)
+        names = []
+        for number in range(max(1, count)):
+            name = f'{PLACEHOLDER_DIR}/placeholder-{number}.png'
+            path = os.path.join(settings.MEDIA_ROOT, name)
+            cells = PilImage.new('RGB', (16, 12))
+            cells.putdata([tuple(rng.randrange(256) for _ in range(3)) for _ in range(16 * 12)])
+            if not os.path.exists(path):
+                cells.resize((640, 480), PilImage.NEAREST).save(path)
+            names.append(name)
+        return names
@@ -0,0 +1,114 @@
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.http import require_safe
+
+"""Раздача загруженных файлов (MEDIA_ROOT) с заголовками кеширования.
+В отличие от django.views.static.serve, представление отдает ETag и Last-Modified,
+отвечает 304 на условные запросы, поддерживает запросы диапазона (Range)
+и устанавливает Cache-Control: файлы, путь которых не меняет содержимое, помечаются immutable"""
+
+MEDIA_CACHE_MAX_AGE = getattr(settings, 'MEDIA_CACHE_MAX_AGE', 3600)
+MEDIA_IMMUTABLE_MAX_AGE = getattr(settings, 'MEDIA_IMMUTABLE_MAX_AGE', 31536000)
+MEDIA_IMMUTABLE_PREFIXES = tuple(getattr(settings, 'MEDIA_IMMUTABLE_PREFIXES', ()))
+CHUNK_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class RangeNotSatisfiable(Exception):
+    """Запрошенный диапазон лежит за пределами файла"""
+
+
+def parse_range(header, size):
+    """Разбирает заголовок Range и возвращает пару (start, end) включительно.
+    Возвращает None, если заголовок не поддерживается (несколько диапазонов, другой формат),
+    тогда отдается весь файл"""
+    match = _RANGE_RE.match(header.strip())
+    if not match or not (match.group(1) or match.group(2)):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if start >= size or start > end:
+            raise RangeNotSatisfiable
+    else:
+        suffix = int(last)  # bytes=-N: последние N байт
+        if suffix == 0:
+            raise RangeNotSatisfiable
+        start, end = max(0, size - suffix), size - 1
+    return start, end
+
+
+def _iter_range(path, start, length):
+    """Читает из файла length байт, начиная со start, блоками по CHUNK_SIZE"""
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _set_validators(response, path, etag, last_modified):
+    """Добавляет в ответ валидаторы и Cache-Control"""
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Accept-Ranges'] = 'bytes'
+    if path.startswith(MEDIA_IMMUTABLE_PREFIXES):
+        patch_cache_control(response, public=True, max_age=MEDIA_IMMUTABLE_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(response, public=True, max_age=MEDIA_CACHE_MAX_AGE, must_revalidate=True)
+    return response
+
+
+@require_safe
+def serve_media(request, path):
+    """Представление отдает файл path из MEDIA_ROOT"""
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404('Файл не найден')
+    if not os.path.isfile(full_path):
+        raise Http404('Файл не найден')
+
+    stat = os.stat(full_path)
+    etag = quote_etag(f'{stat.st_mtime_ns:x}-{stat.st_size:x}')
+    last_modified = int(stat.st_mtime)
+
+    # 304 Not Modified (или 412) по If-None-Match / If-Modified-Since
+    conditional = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if conditional is not None:
+        return _set_validators(conditional, path, etag, last_modified)
+
+    content_type = mimetypes.guess_type(full_path)[0] or 'application/octet-stream'
+    range_header = request.headers.get('Range')
+    if_range = request.headers.get('If-Range')
+    if range_header and (if_range is None or if_range in (etag, http_date(last_modified))):
+        try:
+            byte_range = parse_range(range_header, stat.st_size)
+        except RangeNotSatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+        if byte_range is not None:
+            start, end = byte_range
+            length = end - start + 1
+            response = StreamingHttpResponse(_iter_range(full_path, start, length),
+                                             status=206, content_type=content_type)
+            response['Content-Length'] = str(length)
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+            return _set_validators(response, path, etag, last_modified)
+
+    response = FileResponse(open(full_path, 'rb'), content_type=content_type)
+    return _set_validators(response, path, etag, last_modified)
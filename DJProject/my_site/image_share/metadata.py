@@ -0,0 +1,61 @@
+import base64
+import io
+
+from PIL import Image as PILImage, ImageOps
+
+"""Метаданные загруженных изображений: размеры, формат, размер файла, LQIP-заглушка
+(крошечная WebP-копия в data URI, которая показывается размытым фоном, пока грузится оригинал)
+и перцептивный хеш для поиска похожих изображений (duplicates.py).
+Зная ширину и высоту, шаблоны резервируют место под изображение, и страница не сдвигается.
+Для уже загруженных файлов: python manage.py backfill_image_metadata"""
+
+PLACEHOLDER_SIZE = 16  # Длинная сторона заглушки, пикселей
+PLACEHOLDER_QUALITY = 40
+_TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}  # EXIF-поворот на 90 градусов: ширина и высота меняются местами
+
+
+def difference_hash(image):
+    """Возвращает 64-битный разностный хеш (dHash) в виде 16 шестнадцатеричных цифр:
+    каждый бит - сравнение яркости соседних пикселей копии 9x8 в оттенках серого.
+    Хеш почти не меняется при изменении размера, пережатии и небольшой цветокоррекции"""
+    pixels = list(image.convert('L').resize((9, 8), PILImage.LANCZOS).getdata())
+    value = 0
+    for row in range(8):
+        for column in range(8):
+            left = pixels[row * 9 + column]
+            value = value << 1 | (left > pixels[row * 9 + column + 1])
+    return f'{value:016x}'
+
+
+def extract_metadata(source, file_size):
+    """Возвращает словарь с полями width, height, format, file_size, placeholder и phash
+    для файла изображения (путь или открытый файл) или None, если файл не читается как изображение"""
+    try:
+        with PILImage.open(source) as original:
+            image_format = original.format
+            width, height = original.size
+            if original.getexif().get(0x0112) in _TRANSPOSED_ORIENTATIONS:
+                width, height = height, width
+            # JPEG декодируется сразу в уменьшенном масштабе, без разбора полного изображения
+            original.draft('RGB', (PLACEHOLDER_SIZE * 2, PLACEHOLDER_SIZE * 2))
+            preview = ImageOps.exif_transpose(original)
+            phash = difference_hash(preview)
+            preview.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+            if preview.mode in ('RGBA', 'LA', 'PA') or 'transparency' in preview.info:
+                rgba = preview.convert('RGBA')
+                preview = PILImage.new('RGB', rgba.size, (255, 255, 255))
+                preview.paste(rgba, mask=rgba.getchannel('A'))  # Прозрачные области - на белом фоне
+            else:
+                preview = preview.convert('RGB')
+            buffer = io.BytesIO()
+            preview.save(buffer, 'WEBP', quality=PLACEHOLDER_QUALITY)
+    except (OSError, ValueError, PILImage.DecompressionBombError):
+        return None
+    return {
+        'width': width,
+        'height': height,
+        'format': image_format,
+        'file_size': file_size,
+        'placeholder': 'data:image/webp;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii'),
+        'phash': phash,
+    }
@@ -0,0 +1,153 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+
+from django.db import connections
+from django.http import HttpResponse
+from django.views.decorators.http import require_safe
+
+"""Метрики запросов в текстовом формате Prometheus (маршрут /metrics/).
+Для каждого маршрута собираются гистограммы задержки, числа SQL-запросов и времени в БД,
+а также счетчики ответов по статусам. SQL-запросы учитываются через connection.execute_wrapper"""
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+UNMATCHED_ROUTE = 'unmatched'  # Метка для путей без маршрута, чтобы не плодить ряды по каждому URL
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин"""
+    __slots__ = ('buckets', 'counts', 'total', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Последняя корзина - +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def samples(self, name, labels):
+        """Строки гистограммы: накопленные корзины, сумма и количество"""
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{name}_sum{{{labels}}} {self.total}'
+        yield f'{name}_count{{{labels}}} {self.count}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MetricsRegistry:
+    """Хранилище метрик процесса"""
+
+    HISTOGRAMS = (
+        ('http_request_duration_seconds', 'Время обработки запроса, секунды', LATENCY_BUCKETS),
+        ('http_request_db_queries', 'Число SQL-запросов на один запрос', QUERY_BUCKETS),
+        ('http_request_db_seconds', 'Время выполнения SQL-запросов на один запрос, секунды', LATENCY_BUCKETS),
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}  # (method, route) -> гистограммы в порядке HISTOGRAMS
+        self._statuses = {}  # (method, route, status) -> количество
+        self._collectors = []
+
+    def observe_request(self, method, route, status, duration, queries, db_time):
+        """Учитывает завершенный HTTP-запрос"""
+        key = (method, route)
+        with self._lock:
+            histograms = self._histograms.get(key)
+            if histograms is None:
+                histograms = self._histograms[key] = tuple(Histogram(buckets) for _, _, buckets in self.HISTOGRAMS)
+            for histogram, value in zip(histograms, (duration, queries, db_time)):
+                histogram.observe(value)
+            status_key = (method, route, status)
+            self._statuses[status_key] = self._statuses.get(status_key, 0) + 1
+
+    def add_collector(self, collector):
+        """Регистрирует функцию, возвращающую дополнительные метрики
+        в виде списка (имя, описание, тип, значение)"""
+        self._collectors.append(collector)
+
+    def render(self):
+        """Возвращает все метрики в текстовом формате Prometheus"""
+        lines = []
+        with self._lock:
+            for index, (name, help_text, _) in enumerate(self.HISTOGRAMS):
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+                for (method, route), histograms in self._histograms.items():
+                    labels = f'method="{_escape(method)}",route="{_escape(route)}"'
+                    lines.extend(histograms[index].samples(name, labels))
+            lines += ['# HELP http_requests_total Число обработанных запросов по статусам',
+                      '# TYPE http_requests_total counter']
+            for (method, route, status), count in self._statuses.items():
+                lines.append(f'http_requests_total{{method="{_escape(method)}",route="{_escape(route)}",'
+                             f'status="{status}"}} {count}')
+        for collector in self._collectors:
+            for name, help_text, kind, value in collector():
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}', f'{name} {value}']
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+
+
+class QueryStats:
+    """Обертка выполнения SQL (execute_wrapper): считает запросы и время в БД"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+def route_label(request):
+    """Шаблон маршрута (например, images/<int:pk>/) вместо конкретного пути"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return UNMATCHED_ROUTE
+    return match.route or '/'
+
+
+class MetricsMiddleware:
+    """Middleware измеряет время обработки каждого запроса, число SQL-запросов
+    и время в БД, и записывает их в реестр по шаблону маршрута"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = QueryStats()
+        status_code = 500
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats))
+                response = self.get_response(request)
+            status_code = response.status_code
+            return response
+        finally:
+            metrics.observe_request(request.method, route_label(request), status_code,
+                                    time.perf_counter() - started, stats.count, stats.duration)
+
+
+@require_safe
+def metrics_view(request):
+    """Метрики приложения в текстовом формате Prometheus"""
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
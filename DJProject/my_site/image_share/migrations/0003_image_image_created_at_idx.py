@@ -0,0 +1,17 @@
+# Generated by Django 5.1.4 on 2025-02-03 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('image_share', '0002_rename_photo_comment_image'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='image',
+            index=models.Index(fields=['-created_at', '-id'], name='image_created_at_idx'),
+        ),
+    ]
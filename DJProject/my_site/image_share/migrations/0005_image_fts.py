@@ -0,0 +1,64 @@
+# Generated by Django 5.1.4 on 2025-02-14 16:05
+
+from django.db import migrations
+
+"""Полнотекстовый индекс SQLite FTS5 по названию, описанию и комментариям изображений.
+Триггеры поддерживают индекс при изменении таблиц image_share_image и image_share_comment"""
+
+COMMENTS_OF = ("(SELECT group_concat(content, ' ') FROM image_share_comment "
+               "WHERE image_id = {image_id})")
+
+CREATE_SQL = [
+    "CREATE VIRTUAL TABLE image_share_image_fts USING fts5("
+    "title, description, comments, tokenize = 'unicode61 remove_diacritics 2')",
+
+    "INSERT INTO image_share_image_fts (rowid, title, description, comments) "
+    "SELECT id, title, description, " + COMMENTS_OF.format(image_id='image_share_image.id') +
+    " FROM image_share_image",
+
+    "CREATE TRIGGER image_share_image_fts_ai AFTER INSERT ON image_share_image BEGIN "
+    "INSERT INTO image_share_image_fts (rowid, title, description, comments) "
+    "VALUES (new.id, new.title, new.description, ''); END",
+
+    "CREATE TRIGGER image_share_image_fts_au AFTER UPDATE OF title, description ON image_share_image BEGIN "
+    "UPDATE image_share_image_fts SET title = new.title, description = new.description "
+    "WHERE rowid = new.id; END",
+
+    "CREATE TRIGGER image_share_image_fts_ad AFTER DELETE ON image_share_image BEGIN "
+    "DELETE FROM image_share_image_fts WHERE rowid = old.id; END",
+
+    "CREATE TRIGGER image_share_comment_fts_ai AFTER INSERT ON image_share_comment BEGIN "
+    "UPDATE image_share_image_fts SET comments = " + COMMENTS_OF.format(image_id='new.image_id') +
+    " WHERE rowid = new.image_id; END",
+
+    "CREATE TRIGGER image_share_comment_fts_au AFTER UPDATE OF content, image_id ON image_share_comment BEGIN "
+    "UPDATE image_share_image_fts SET comments = " + COMMENTS_OF.format(image_id='old.image_id') +
+    " WHERE rowid = old.image_id; "
+    "UPDATE image_share_image_fts SET comments = " + COMMENTS_OF.format(image_id='new.image_id') +
+    " WHERE rowid = new.image_id; END",
+
+    "CREATE TRIGGER image_share_comment_fts_ad AFTER DELETE ON image_share_comment BEGIN "
+    "UPDATE image_share_image_fts SET comments = " + COMMENTS_OF.format(image_id='old.image_id') +
+    " WHERE rowid = old.image_id; END",
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS image_share_comment_fts_ad",
+    "DROP TRIGGER IF EXISTS image_share_comment_fts_au",
+    "DROP TRIGGER IF EXISTS image_share_comment_fts_ai",
+    "DROP TRIGGER IF EXISTS image_share_image_fts_ad",
+    "DROP TRIGGER IF EXISTS image_share_image_fts_au",
+    "DROP TRIGGER IF EXISTS image_share_image_fts_ai",
+    "DROP TABLE IF EXISTS image_share_image_fts",
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('image_share', '0004_image_thumbnails'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_SQL, reverse_sql=DROP_SQL),
+    ]
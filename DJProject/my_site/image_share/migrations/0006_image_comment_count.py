@@ -0,0 +1,41 @@
+# Generated by Django 5.1.4 on 2025-02-18 10:20
+
+from django.db import migrations, models
+
+"""Счетчик комментариев изображения. Столбец добавляется через ALTER TABLE:
+стандартная AddField для NOT NULL-поля в SQLite пересоздает таблицу,
+а вместе с ней удаляются триггеры полнотекстового индекса (0005_image_fts)"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('image_share', '0005_image_fts'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                migrations.RunSQL(
+                    'ALTER TABLE image_share_image ADD COLUMN comment_count integer NOT NULL DEFAULT 0',
+                    'ALTER TABLE image_share_image DROP COLUMN comment_count',
+                ),
+            ],
+            state_operations=[
+                migrations.AddField(
+                    model_name='image',
+                    name='comment_count',
+                    field=models.IntegerField(default=0, editable=False, verbose_name='Комментариев'),
+                ),
+            ],
+        ),
+        migrations.RunSQL(
+            'UPDATE image_share_image SET comment_count = '
+            '(SELECT COUNT(*) FROM image_share_comment WHERE image_share_comment.image_id = image_share_image.id)',
+            migrations.RunSQL.noop,
+        ),
+        migrations.AddIndex(
+            model_name='image',
+            index=models.Index(fields=['-comment_count', '-id'], name='image_comment_count_idx'),
+        ),
+    ]
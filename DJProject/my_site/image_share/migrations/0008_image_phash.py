@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2025-02-20 11:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('image_share', '0007_image_metadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='image',
+            name='phash',
+            field=models.CharField(blank=True, editable=False, max_length=16, null=True, verbose_name='Перцептивный хеш'),
+        ),
+    ]
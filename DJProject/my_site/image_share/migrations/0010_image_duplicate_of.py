@@ -0,0 +1,19 @@
+# Generated by Django 5.1.4 on 2025-02-24 12:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('image_share', '0009_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='image',
+            name='duplicate_of',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='image_share.image', verbose_name='Копия изображения'),
+        ),
+    ]
@@ -0,0 +1,102 @@
+# Generated by Django 5.1.4 on 2025-02-26 10:28
+
+from django.db import migrations
+
+"""Комментарии индексируются в отдельной таблице FTS5 image_share_comment_fts: по строке на комментарий,
+id изображения хранится в неиндексируемом столбце. Новый комментарий добавляет в индекс одну строку,
+а не перестраивает документ изображения со всеми комментариями (как в 0005)"""
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS image_share_comment_fts_ad",
+    "DROP TRIGGER IF EXISTS image_share_comment_fts_au",
+    "DROP TRIGGER IF EXISTS image_share_comment_fts_ai",
+    "DROP TRIGGER IF EXISTS image_share_image_fts_ad",
+    "DROP TRIGGER IF EXISTS image_share_image_fts_au",
+    "DROP TRIGGER IF EXISTS image_share_image_fts_ai",
+    "DROP TABLE IF EXISTS image_share_comment_fts",
+    "DROP TABLE IF EXISTS image_share_image_fts",
+]
+
+IMAGE_TRIGGERS_SQL = [
+    "CREATE TRIGGER image_share_image_fts_au AFTER UPDATE OF title, description ON image_share_image BEGIN "
+    "UPDATE image_share_image_fts SET title = new.title, description = new.description "
+    "WHERE rowid = new.id; END",
+
+    "CREATE TRIGGER image_share_image_fts_ad AFTER DELETE ON image_share_image BEGIN "
+    "DELETE FROM image_share_image_fts WHERE rowid = old.id; END",
+]
+
+CREATE_SQL = DROP_SQL + [
+    "CREATE VIRTUAL TABLE image_share_image_fts USING fts5("
+    "title, description, tokenize = 'unicode61 remove_diacritics 2')",
+
+    "CREATE VIRTUAL TABLE image_share_comment_fts USING fts5("
+    "content, image_id UNINDEXED, tokenize = 'unicode61 remove_diacritics 2')",
+
+    "INSERT INTO image_share_image_fts (rowid, title, description) "
+    "SELECT id, title, description FROM image_share_image",
+
+    "INSERT INTO image_share_comment_fts (rowid, content, image_id) "
+    "SELECT id, content, image_id FROM image_share_comment",
+
+    "CREATE TRIGGER image_share_image_fts_ai AFTER INSERT ON image_share_image BEGIN "
+    "INSERT INTO image_share_image_fts (rowid, title, description) "
+    "VALUES (new.id, new.title, new.description); END",
+
+    *IMAGE_TRIGGERS_SQL,
+
+    "CREATE TRIGGER image_share_comment_fts_ai AFTER INSERT ON image_share_comment BEGIN "
+    "INSERT INTO image_share_comment_fts (rowid, content, image_id) "
+    "VALUES (new.id, new.content, new.image_id); END",
+
+    "CREATE TRIGGER image_share_comment_fts_au AFTER UPDATE OF content, image_id ON image_share_comment BEGIN "
+    "UPDATE image_share_comment_fts SET content = new.content, image_id = new.image_id "
+    "WHERE rowid = new.id; END",
+
+    "CREATE TRIGGER image_share_comment_fts_ad AFTER DELETE ON image_share_comment BEGIN "
+    "DELETE FROM image_share_comment_fts WHERE rowid = old.id; END",
+]
+
+# Обратная миграция возвращает индекс 0005: комментарии в столбце comments таблицы изображений
+COMMENTS_OF = ("(SELECT group_concat(content, ' ') FROM image_share_comment "
+               "WHERE image_id = {image_id})")
+
+REVERSE_SQL = DROP_SQL + [
+    "CREATE VIRTUAL TABLE image_share_image_fts USING fts5("
+    "title, description, comments, tokenize = 'unicode61 remove_diacritics 2')",
+
+    "INSERT INTO image_share_image_fts (rowid, title, description, comments) "
+    "SELECT id, title, description, " + COMMENTS_OF.format(image_id='image_share_image.id') +
+    " FROM image_share_image",
+
+    "CREATE TRIGGER image_share_image_fts_ai AFTER INSERT ON image_share_image BEGIN "
+    "INSERT INTO image_share_image_fts (rowid, title, description, comments) "
+    "VALUES (new.id, new.title, new.description, ''); END",
+
+    *IMAGE_TRIGGERS_SQL,
+
+    "CREATE TRIGGER image_share_comment_fts_ai AFTER INSERT ON image_share_comment BEGIN "
+    "UPDATE image_share_image_fts SET comments = " + COMMENTS_OF.format(image_id='new.image_id') +
+    " WHERE rowid = new.image_id; END",
+
+    "CREATE TRIGGER image_share_comment_fts_au AFTER UPDATE OF content, image_id ON image_share_comment BEGIN "
+    "UPDATE image_share_image_fts SET comments = " + COMMENTS_OF.format(image_id='old.image_id') +
+    " WHERE rowid = old.image_id; "
+    "UPDATE image_share_image_fts SET comments = " + COMMENTS_OF.format(image_id='new.image_id') +
+    " WHERE rowid = new.image_id; END",
+
+    "CREATE TRIGGER image_share_comment_fts_ad AFTER DELETE ON image_share_comment BEGIN "
+    "UPDATE image_share_image_fts SET comments = " + COMMENTS_OF.format(image_id='old.image_id') +
+    " WHERE rowid = old.image_id; END",
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('image_share', '0010_image_duplicate_of'),
+    ]
+
+    operations = [
+        migrations.RunSQL(CREATE_SQL, reverse_sql=REVERSE_SQL),
+    ]
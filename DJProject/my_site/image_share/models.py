@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
+from django.utils import timezone
 
 
 class CustomUser(AbstractUser):
@@ -29,12 +30,56 @@ class Image(models.Model):
     description = models.TextField(blank=True, verbose_name="Описание")
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='image')
     created_at = models.DateTimeField(auto_now_add=True)
+    thumbnails = models.JSONField(default=dict, blank=True, editable=False,
+                                  verbose_name="Миниатюры")  # {"ширина": {"webp": путь, "jpeg": путь}}
+    # Число комментариев; изменяется сигналами при добавлении и удалении комментариев (signals.py)
+    comment_count = models.IntegerField(default=0, editable=False, verbose_name="Комментариев")
+    # Метаданные файла (metadata.py); пусто, если файл не удалось разобрать как изображение
+    width = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name="Ширина")
+    height = models.PositiveIntegerField(null=True, blank=True, editable=False, verbose_name="Высота")
+    format = models.CharField(max_length=10, null=True, blank=True, editable=False, verbose_name="Формат")
+    file_size = models.PositiveBigIntegerField(null=True, blank=True, editable=False,
+                                               verbose_name="Размер файла")  # Байт
+    placeholder = models.TextField(null=True, blank=True, editable=False,
+                                   verbose_name="Заглушка")  # LQIP-заглушка в виде data URI
+    phash = models.CharField(max_length=16, null=True, blank=True, editable=False,
+                             verbose_name="Перцептивный хеш")  # dHash, 16 шестнадцатеричных цифр
+    # Ранее загруженная копия изображения, найденная по хешу фоновой задачей (jobs.py)
+    duplicate_of = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, editable=False,
+                                     related_name='+', verbose_name="Копия изображения")
+
+    class Meta:
+        """Индексы по дате загрузки и по числу комментариев,
+        по которым упорядочивается и разбивается на страницы галерея"""
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='image_created_at_idx'),
+            models.Index(fields=['-comment_count', '-id'], name='image_comment_count_idx'),
+        ]
 
     def __str__(self):
         """Возвращает название картинки,
         которое изначально дает пользователь"""
         return self.title
 
+    def _thumbnail_urls(self, fmt):
+        """Возвращает пары (ширина, URL) миниатюр заданного формата по возрастанию ширины"""
+        return [(int(width), settings.MEDIA_URL + paths[fmt])
+                for width, paths in sorted(self.thumbnails.items(), key=lambda item: int(item[0]))
+                if fmt in paths]
+
+    def thumbnail_url(self):
+        """URL самой маленькой JPEG-миниатюры, а пока миниатюры не готовы - оригинала"""
+        urls = self._thumbnail_urls('jpeg')
+        return urls[0][1] if urls else self.image.url
+
+    def srcset(self, fmt='jpeg'):
+        """Значение атрибута srcset для тега img/source"""
+        return ', '.join(f'{url} {width}w' for width, url in self._thumbnail_urls(fmt))
+
+    def webp_srcset(self):
+        """Значение srcset для WebP-миниатюр"""
+        return self.srcset('webp')
+
 
 class Comment(models.Model):
     """Создание модели для хранения комментариев к картинке.
@@ -49,3 +94,29 @@ class Comment(models.Model):
         """Возвращает строковое представление,
         включающее имя пользователя и название картинки"""
         return f"Комментарий от {self.user.username} на {self.image.title}"
+
+
+class Job(models.Model):
+    """Задача фоновой обработки (jobs.py).
+    Выполненные задачи удаляются, неудачные остаются со статусом failed и текстом ошибки"""
+    QUEUED, RUNNING, FAILED = 'queued', 'running', 'failed'
+    STATUSES = [(QUEUED, 'В очереди'), (RUNNING, 'Выполняется'), (FAILED, 'Ошибка')]
+
+    kind = models.CharField(max_length=50, verbose_name="Вид")  # Имя обработчика
+    payload = models.JSONField(default=dict, verbose_name="Аргументы")
+    status = models.CharField(max_length=10, choices=STATUSES, default=QUEUED, verbose_name="Статус")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Попыток")
+    max_attempts = models.PositiveIntegerField(default=5, verbose_name="Максимум попыток")
+    run_after = models.DateTimeField(default=timezone.now, verbose_name="Не раньше")
+    locked_at = models.DateTimeField(null=True, blank=True)  # Когда задачу взял обработчик
+    locked_by = models.CharField(max_length=100, null=True, blank=True)
+    last_error = models.TextField(null=True, blank=True, verbose_name="Последняя ошибка")
+
+    class Meta:
+        """Индекс для выбора следующей задачи"""
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='job_status_run_after_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
@@ -0,0 +1,78 @@
+import re
+from contextlib import contextmanager
+
+from django.db import connection
+
+from .models import Image
+
+"""Полнотекстовый поиск изображений по названию, описанию и комментариям.
+Используются виртуальные таблицы SQLite FTS5 image_share_image_fts (название и описание)
+и image_share_comment_fts (по строке на комментарий), см. миграции 0005 и 0011.
+Их поддерживают в актуальном состоянии триггеры на таблицах изображений и комментариев.
+Совпадения из обеих таблиц объединяются по изображению (все слова запроса должны встретиться
+в названии и описании или в одном комментарии) и упорядочиваются по релевантности (bm25)"""
+
+SEARCH_LIMIT = 50
+MAX_TERMS = 10
+# Веса столбцов для bm25: совпадение в названии важнее, чем в описании, а в описании - чем в комментарии
+RANK_WEIGHTS = (10.0, 5.0)
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+_REBUILD_SQL = (
+    'DELETE FROM image_share_image_fts',
+    'DELETE FROM image_share_comment_fts',
+    'INSERT INTO image_share_image_fts (rowid, title, description) '
+    'SELECT id, title, description FROM image_share_image',
+    'INSERT INTO image_share_comment_fts (rowid, content, image_id) '
+    'SELECT id, content, image_id FROM image_share_comment',
+)
+
+# Оценки bm25 отрицательные: сумма выше у изображений, где совпадений больше
+_SEARCH_SQL = (
+    'SELECT image_id FROM ('
+    'SELECT rowid AS image_id, bm25(image_share_image_fts, %s, %s) AS rank FROM image_share_image_fts '
+    'WHERE image_share_image_fts MATCH %s '
+    'UNION ALL '
+    'SELECT image_id, bm25(image_share_comment_fts) AS rank FROM image_share_comment_fts '
+    'WHERE image_share_comment_fts MATCH %s'
+    ') GROUP BY image_id ORDER BY sum(rank) LIMIT %s')
+
+
+def build_match_query(text):
+    """Преобразует введенную строку в безопасный запрос FTS5:
+    каждое слово берется в кавычки и ищется как префикс, слова объединяются через AND"""
+    terms = _TERM_RE.findall(text)[:MAX_TERMS]
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search_images(text, limit=SEARCH_LIMIT):
+    """Возвращает список изображений, подходящих под запрос, в порядке релевантности"""
+    match = build_match_query(text)
+    if not match:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(_SEARCH_SQL, [*RANK_WEIGHTS, match, match, limit])
+        ids = [row[0] for row in cursor.fetchall()]
+    images = Image.objects.select_related('user').in_bulk(ids)
+    return [images[image_id] for image_id in ids if image_id in images]
+
+
+@contextmanager
+def search_index_suspended():
+    """Для массовой вставки (bulk_create): на время блока триггеры индекса удаляются, после него
+    индекс перестраивается одним запросом и триггеры создаются заново.
+    Использовать внутри transaction.atomic, тогда при ошибке откат вернет триггеры на место"""
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND (sql LIKE %s OR sql LIKE %s)",
+                       ['%image_share_image_fts%', '%image_share_comment_fts%'])
+        triggers = cursor.fetchall()
+        for name, _ in triggers:
+            cursor.execute(f'DROP TRIGGER {name}')
+    yield
+    if triggers:  # Без триггеров индекса нет (миграция 0005 не применена)
+        with connection.cursor() as cursor:
+            for statement in _REBUILD_SQL:
+                cursor.execute(statement)
+            for _, sql in triggers:
+                cursor.execute(sql)
@@ -0,0 +1,42 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .caching import invalidate_image
+from .models import Comment, Image
+
+"""Сброс кеша фрагментов при изменении изображений и комментариев.
+Версия увеличивается после фиксации транзакции, чтобы параллельный запрос
+не успел сохранить в кеш фрагмент с еще не зафиксированными данными.
+Здесь же поддерживается счетчик Image.comment_count; bulk_create сигналы не отправляет,
+поэтому после массовой вставки счетчики пересчитываются (comment_counts.py)"""
+
+
+@receiver(post_save, sender=Image)
+@receiver(post_delete, sender=Image)
+def image_changed(sender, instance, **kwargs):
+    """Изображение сохранено или удалено"""
+    image_id = instance.pk
+    transaction.on_commit(lambda: invalidate_image(image_id))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    """Комментарий сохранен или удален - меняется страница изображения и счетчик в галерее"""
+    image_id = instance.image_id
+    transaction.on_commit(lambda: invalidate_image(image_id))
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    """Счетчик комментариев изображения увеличивается в той же транзакции, что и вставка"""
+    if created:
+        Image.objects.filter(pk=instance.image_id).update(comment_count=F('comment_count') + 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    """Комментарий удален - счетчик уменьшается"""
+    Image.objects.filter(pk=instance.image_id).update(comment_count=F('comment_count') - 1)
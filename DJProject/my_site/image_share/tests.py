@@ -1,3 +1,107 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
 
-# Create your tests here.
+from django.db import IntegrityError
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+
+from .media import serve_media
+from .models import CustomUser
+from .write_queue import GroupCommitQueue
+
+
+def _create_user(username):
+    """Операция очереди: создает пользователя и возвращает его id"""
+    return CustomUser.objects.create(username=username).pk
+
+
+def _broken_operation():
+    raise RuntimeError('ошибка вне ORM')
+
+
+class GroupCommitQueueTests(TransactionTestCase):
+    """Групповая фиксация (write_queue.py): операции пакета выполняются в одной транзакции,
+    каждая в своей точке сохранения. TransactionTestCase - поток-писатель работает
+    со своим соединением и видит только зафиксированные данные"""
+
+    def setUp(self):
+        self.write_queue = GroupCommitQueue(enabled=True, max_delay=0.5, timeout=5)
+        self.addCleanup(self.write_queue.close)
+
+    def test_operations_are_committed_in_one_batch(self):
+        futures = [self.write_queue.submit(_create_user, f'user{number}') for number in range(5)]
+        ids = [future.result(timeout=5) for future in futures]
+        self.assertEqual(sorted(CustomUser.objects.values_list('pk', flat=True)), sorted(ids))
+        self.assertEqual((self.write_queue.batches, self.write_queue.writes), (1, 5))
+
+    def test_failed_operation_is_rolled_back_to_its_savepoint(self):
+        futures = [self.write_queue.submit(_create_user, 'first'), self.write_queue.submit(_create_user, 'first'),
+                   self.write_queue.submit(_broken_operation), self.write_queue.submit(_create_user, 'second')]
+        self.assertIsInstance(futures[0].result(timeout=5), int)
+        with self.assertRaises(IntegrityError):  # Пользователь с таким именем уже есть
+            futures[1].result(timeout=5)
+        with self.assertRaises(RuntimeError):
+            futures[2].result(timeout=5)
+        self.assertIsInstance(futures[3].result(timeout=5), int)
+        self.assertEqual(sorted(CustomUser.objects.values_list('username', flat=True)), ['first', 'second'])
+        self.assertEqual(self.write_queue.batches, 1)
+
+    def test_run_waits_for_the_result(self):
+        user_id = self.write_queue.run(_create_user, 'runner')
+        self.assertTrue(CustomUser.objects.filter(pk=user_id, username='runner').exists())
+        self.write_queue.close()
+        self.assertIsNone(self.write_queue._thread)
+
+
+class ServeMediaTests(SimpleTestCase):
+    """Раздача загруженных файлов (media.py): диапазоны, условные запросы и Cache-Control"""
+    content = bytes(range(100))
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        os.makedirs(os.path.join(media_root, 'media'))
+        with open(os.path.join(media_root, 'media', 'photo.png'), 'wb') as f:
+            f.write(self.content)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.factory = RequestFactory()
+
+    def get(self, **headers):
+        return serve_media(self.factory.get('/media/media/photo.png', headers=headers), 'media/photo.png')
+
+    def test_full_response_must_revalidate(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        self.assertIn('must-revalidate', response['Cache-Control'])
+        self.assertNotIn('immutable', response['Cache-Control'])  # Имя оригинала не зависит от содержимого
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+    def test_range(self):
+        response = self.get(range='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+        self.assertEqual(b''.join(response.streaming_content), self.content[10:20])
+        response = self.get(range='bytes=-5')
+        self.assertEqual(b''.join(response.streaming_content), self.content[-5:])
+
+    def test_unsatisfiable_range(self):
+        response = self.get(range='bytes=100-')
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], 'bytes */100')
+
+    def test_if_range(self):
+        etag = self.get()['ETag']
+        self.assertEqual(self.get(range='bytes=0-9', if_range=etag).status_code, 206)
+        response = self.get(range='bytes=0-9', if_range='"old"')  # Файл изменился: отдается целиком
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+
+    def test_not_modified(self):
+        etag = self.get()['ETag']
+        response = self.get(if_none_match=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertIn('must-revalidate', response['Cache-Control'])
@@ -0,0 +1,74 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from django.conf import settings
+
+"""Модуль создания миниатюр загруженных изображений.
+Для каждого изображения строится набор миниатюр фиксированной ширины в форматах WebP и JPEG.
+Миниатюры новых загрузок создает фоновая задача (jobs.py), уже загруженных - команда
+generate_thumbnails в пуле процессов, поэтому сжатие не задерживает ответ на запрос загрузки"""
+
+THUMBNAIL_WIDTHS = getattr(settings, 'THUMBNAIL_WIDTHS', (200, 400, 800))
+THUMBNAIL_DIR = getattr(settings, 'THUMBNAIL_DIR', 'thumbnails')
+THUMBNAIL_WORKERS = getattr(settings, 'THUMBNAIL_WORKERS', None)
+THUMBNAIL_FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+THUMBNAIL_QUALITY = 80
+
+_executor = None
+
+
+def make_thumbnails(source_path, media_root, widths=THUMBNAIL_WIDTHS, thumbnail_dir=THUMBNAIL_DIR):
+    """Создает миниатюры файла source_path и возвращает словарь путей относительно media_root:
+    {"200": {"webp": "thumbnails/media/x.png_200.webp", "jpeg": "thumbnails/media/x.png_200.jpg"}, ...}.
+    Имя миниатюры строится из полного пути исходного файла относительно media_root вместе с расширением,
+    поэтому у файлов x.png и x.jpg или одноименных файлов из разных каталогов миниатюры не совпадают.
+    Функция не обращается к Django и может выполняться в отдельном процессе"""
+    from PIL import Image as PILImage, ImageOps
+
+    source_name = os.path.relpath(source_path, media_root).replace(os.sep, '/')
+    if source_name.startswith('../'):  # Файл вне media_root
+        source_name = os.path.basename(source_path)
+    target_dir = os.path.dirname(os.path.join(media_root, thumbnail_dir, source_name))
+    os.makedirs(target_dir, exist_ok=True)
+
+    result = {}
+    with PILImage.open(source_path) as original:
+        original = ImageOps.exif_transpose(original)  # Учитываем поворот из EXIF
+        if original.mode not in ('RGB', 'RGBA'):
+            transparent = original.mode in ('LA', 'PA') or 'transparency' in original.info
+            original = original.convert('RGBA' if transparent else 'RGB')
+        for width in sorted(widths):
+            target_width = min(width, original.width)  # Миниатюры не увеличиваются
+            height = max(1, round(original.height * target_width / original.width))
+            resized = original.resize((target_width, height), PILImage.LANCZOS)
+            paths = {}
+            for key, pil_format in THUMBNAIL_FORMATS.items():
+                extension = 'jpg' if key == 'jpeg' else key
+                relative_path = f'{thumbnail_dir}/{source_name}_{width}.{extension}'
+                image = _on_white(resized) if pil_format == 'JPEG' else resized
+                image.save(os.path.join(media_root, relative_path), pil_format,
+                           quality=THUMBNAIL_QUALITY, optimize=True)
+                paths[key] = relative_path
+            result[str(width)] = paths
+    return result
+
+
+def _on_white(image):
+    """JPEG без прозрачности: прозрачные области кладутся на белый фон, а не становятся черными"""
+    from PIL import Image as PILImage
+
+    if image.mode != 'RGBA':
+        return image.convert('RGB')
+    background = PILImage.new('RGB', image.size, (255, 255, 255))
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def get_executor():
+    """Возвращает общий пул процессов для создания миниатюр.
+    Используется контекст spawn, чтобы не копировать потоки сервера при fork"""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=THUMBNAIL_WORKERS, mp_context=get_context('spawn'))
+    return _executor
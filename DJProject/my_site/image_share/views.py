@@ -1,11 +1,37 @@
 from django.contrib import messages
+from django.db import transaction
+from django.core.paginator import Paginator
 from django.core.exceptions import ValidationError
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
+from django.utils.functional import SimpleLazyObject
 from django.contrib.auth import login, authenticate, logout
-from .forms import UserRegistrationForm, ImageForm, CommentForm
+from .bulk_upload import TooManyFiles, save_images
+from .forms import UserRegistrationForm, ImageForm, CommentForm, BulkUploadForm
 from .models import CustomUser, Image, Comment
-from django.contrib.auth.decorators import login_required
+from django.contrib.auth.decorators import login_required, user_passes_test
 from .forms import LoginForm
+from .caching import FRAGMENT_CACHE_TIMEOUT, gallery_version, image_version
+from .duplicates import find_similar
+from .export import FORMATS, TABLES, export_rows
+from .jobs import enqueue
+from .search import search_images
+from .write_queue import write_queue
+
+GALLERY_PAGE_SIZE = 24  # Количество изображений на одной странице галереи
+
+
+def save_image(image):
+    """Сохраняет изображение и задачу его обработки (метаданные, перцептивный хеш, миниатюры)
+    в одной транзакции; задачу выполняет процесс manage.py run_jobs уже после ответа"""
+    with transaction.atomic():
+        image.save()
+        enqueue('process_image', image_id=image.pk)
+
+
+def save_comment(comment):
+    """Сохраняет комментарий (операция очереди групповой фиксации)"""
+    comment.save()
 
 
 def register(request):
@@ -51,12 +77,46 @@ def users_list(request):
 @login_required
 def image_gallery(request):
     """Декоратор, ограничивающий доступ для не авторизованных пользователей.
-    Функция-представление отображает загруженные изображения."""
-    try:
-        images = Image.objects.all()
-    except Image.DoesNotExist:
-        images = []
-    return render(request, 'image_gallery.html', {'images': images})
+    Функция-представление отображает загруженные изображения постранично,
+    новые первыми или (sort=popular) по числу комментариев.
+    Автор подгружается через select_related, число комментариев хранится в самом изображении,
+    поэтому страница строится фиксированным числом запросов (COUNT и выборка страницы).
+    Список кешируется как фрагмент шаблона; страница вычисляется лениво,
+    поэтому при попадании в кеш запросы к изображениям не выполняются"""
+    sort = 'popular' if request.GET.get('sort') == 'popular' else ''
+    images = (Image.objects
+              .select_related('user')
+              .only('id', 'image', 'title', 'created_at', 'thumbnails', 'comment_count',
+                    'width', 'height', 'placeholder', 'user__username')
+              .order_by(*(('-comment_count', '-id') if sort else ('-created_at', '-id'))))
+    paginator = Paginator(images, GALLERY_PAGE_SIZE)
+    page_number = request.GET.get('page', '')
+    # Номер страницы входит в ключ фрагмента кеша: произвольные строки не должны порождать новые ключи
+    page_number = str(int(page_number)) if page_number.isdecimal() and int(page_number) > 0 else '1'
+    page_obj = SimpleLazyObject(lambda: paginator.get_page(page_number))
+    return render(request, 'image_gallery.html', {
+        'images': page_obj, 'page_obj': page_obj, 'page_number': page_number, 'sort': sort,
+        'cache_version': gallery_version(), 'cache_timeout': FRAGMENT_CACHE_TIMEOUT,
+    })
+
+@login_required
+def search(request):
+    """Функция-представление полнотекстового поиска изображений
+    по названию, описанию и комментариям. Результаты упорядочены по релевантности"""
+    query = request.GET.get('q', '').strip()
+    images = search_images(query) if query else []
+    return render(request, 'search.html', {'query': query, 'images': images})
+
+@user_passes_test(lambda u: u.is_staff)
+def export(request, table, fmt):
+    """Потоковая выгрузка таблицы users, images или comments в формате ndjson или csv (export.py).
+    Доступна только персоналу: выгрузка users содержит адреса почты всех пользователей.
+    Строки читаются из базы частями и отдаются по мере чтения, ответ не собирается в памяти"""
+    if table not in TABLES or fmt not in FORMATS:
+        raise Http404
+    response = StreamingHttpResponse(export_rows(table, fmt), content_type=FORMATS[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{table}.{fmt}"'
+    return response
 
 def logout_view(request):
     logout(request)
@@ -73,7 +133,12 @@ def upload_image(request):
             try:
                 image = form.save(commit=False)
                 image.user = request.user
-                image.save()
+                if write_queue.enabled:
+                    # Файл записывается в потоке запроса, писатель только добавляет строку в пакет
+                    image.image.save(image.image.name, image.image.file, save=False)
+                    write_queue.run(save_image, image)
+                else:
+                    save_image(image)
                 messages.success(request, "Фотография успешно загружена!")
                 return redirect('image_gallery')
             except ValidationError as e:
@@ -86,21 +151,57 @@ def upload_image(request):
         form = ImageForm()
     return render(request, 'upload_image.html', {'form': form})
 
+@login_required
+def upload_images(request):
+    """Массовая загрузка нескольких изображений или ZIP-архивов (bulk_upload.py).
+    Все изображения сохраняются одной транзакцией; на странице показывается результат по каждому файлу"""
+    results = None
+    if request.method == 'POST':
+        form = BulkUploadForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                results = save_images(form.cleaned_data['files'], request.user, form.cleaned_data['description'])
+            except TooManyFiles as e:
+                form.add_error('files', str(e))
+            else:
+                form = BulkUploadForm()
+    else:
+        form = BulkUploadForm()
+    created = sum(1 for result in results if result['image']) if results else 0
+    return render(request, 'upload_images.html', {'form': form, 'results': results, 'created': created})
+
 @login_required
 def image_detail(request, pk):
     """Добавление комментариев доступно только для авторизованных пользователей.
     Комментарии будут добавлены, если передаваемое значение является POST-запросом,
-    а также будет пройдена проверка на корректность заполнения"""
-    image = get_object_or_404(Image, pk=pk)  # получение объекта или возвращение ошибки в случае его отсутствия
-    comments = image.comments.all()  # получение всех связанных комментариев
+    а также будет пройдена проверка на корректность заполнения.
+    Изображение и комментарии кешируются как фрагмент шаблона и загружаются лениво,
+    только если фрагмента нет в кеше"""
+    # получение объекта или возвращение ошибки в случае его отсутствия (при первом обращении)
+    image = SimpleLazyObject(lambda: get_object_or_404(Image, pk=pk))
+    comments = Comment.objects.filter(image_id=pk).select_related('user')  # получение всех связанных комментариев
     if request.method == 'POST':
         form = CommentForm(request.POST)
         if form.is_valid():
             comment = form.save(commit=False)
-            comment.image = image
+            comment.image = get_object_or_404(Image, pk=pk)
             comment.user = request.user
-            comment.save()
+            if write_queue.enabled:  # Групповая фиксация: один COMMIT на пакет комментариев
+                write_queue.run(save_comment, comment)
+            else:
+                save_comment(comment)
             return redirect('image_detail', pk=pk)
     else:
         form = CommentForm()
-    return render(request, 'image_detail.html', {'image': image, 'comments': comments, 'form': form})
+    return render(request, 'image_detail.html', {
+        'image': image, 'image_id': pk, 'comments': comments, 'form': form,
+        'cache_version': image_version(pk), 'cache_timeout': FRAGMENT_CACHE_TIMEOUT,
+        # Вне кешируемого фрагмента: похожие изображения появляются с новыми загрузками
+        'similar': SimpleLazyObject(lambda: _similar_images(pk)),
+    })
+
+
+def _similar_images(pk):
+    """Изображения, похожие на изображение pk; без загрузки самого изображения, только его хеша"""
+    phash = Image.objects.filter(pk=pk).values_list('phash', flat=True).first()
+    return find_similar(phash, exclude_id=pk) if phash else []
@@ -0,0 +1,146 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .metrics import metrics
+
+"""Групповая фиксация небольших записей (комментарии, строки загруженных изображений).
+Операции передаются единственному потоку-писателю, который собирает их в пакет
+в течение WRITE_BATCH_DELAY секунд (или до WRITE_BATCH_SIZE операций) и выполняет
+в одной транзакции: на весь пакет приходится один COMMIT вместо одного на запрос.
+Каждая операция выполняется в своей точке сохранения, поэтому ошибка одной записи
+не отменяет остальные. Поток запроса ждет результат своей операции (не дольше WRITE_TIMEOUT
+секунд), так что ответ отправляется после фиксации. Режим включается настройкой WRITE_BEHIND"""
+
+logger = logging.getLogger(__name__)
+
+WRITE_BEHIND = getattr(settings, 'WRITE_BEHIND', False)
+WRITE_BATCH_DELAY = getattr(settings, 'WRITE_BATCH_DELAY', 0.002)
+WRITE_BATCH_SIZE = getattr(settings, 'WRITE_BATCH_SIZE', 256)
+WRITE_TIMEOUT = getattr(settings, 'WRITE_TIMEOUT', 30)
+
+_STOP = object()
+
+
+class GroupCommitQueue:
+    """Очередь записей с единственным писателем и групповой фиксацией.
+    Операция - функция operation(*args), которая сохраняет модели через ORM;
+    обработчики transaction.on_commit выполняются после фиксации всего пакета"""
+
+    def __init__(self, enabled=WRITE_BEHIND, max_batch=WRITE_BATCH_SIZE, max_delay=WRITE_BATCH_DELAY,
+                 timeout=WRITE_TIMEOUT):
+        self.enabled = enabled
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches = 0  # Зафиксированных транзакций
+        self.writes = 0  # Выполненных операций
+
+    def submit(self, operation, *args):
+        """Ставит операцию в очередь и возвращает Future с ее результатом"""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((future, operation, args))
+        return future
+
+    def run(self, operation, *args):
+        """Выполняет операцию в составе пакета и возвращает ее результат.
+        Если результата нет за timeout секунд, еще не начатая операция отменяется
+        и выбрасывается TimeoutError"""
+        future = self.submit(operation, *args)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def close(self):
+        """Выполняет оставшиеся операции и останавливает поток-писатель"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._loop, name='group-commit', daemon=True)
+                    self._thread.start()
+
+    def _loop(self):
+        stopping = False
+        try:
+            while not stopping:
+                item = self._queue.get()
+                if item is _STOP:
+                    break
+                batch = [item]
+                deadline = time.perf_counter() + self.max_delay
+                while len(batch) < self.max_batch:
+                    timeout = deadline - time.perf_counter()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=timeout)
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+                try:
+                    self._execute(batch)
+                except Exception as e:
+                    logger.exception('Ошибка выполнения пакета из %s операций', len(batch))
+                    for future, _, _ in batch:
+                        if not future.done():
+                            future.set_exception(e)
+        finally:
+            connection.close()  # Соединение принадлежит потоку-писателю
+            with self._lock:
+                if self._thread is threading.current_thread():
+                    self._thread = None  # Следующая операция запустит новый поток
+
+    def _execute(self, batch):
+        """Выполняет пакет одной транзакцией, каждую операцию - в своей точке сохранения"""
+        batch = [item for item in batch if item[0].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        outcomes = []
+        try:
+            with transaction.atomic():
+                for future, operation, args in batch:
+                    try:
+                        with transaction.atomic():
+                            outcomes.append((future, operation(*args), None))
+                    except Exception as e:
+                        outcomes.append((future, None, e))
+        except Exception as e:  # Не удалось зафиксировать весь пакет
+            logger.exception('Ошибка фиксации пакета из %s операций', len(batch))
+            for future, _, _ in batch:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        self.writes += len(batch)
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+write_queue = GroupCommitQueue()  # Общая очередь для представлений
+metrics.add_collector(lambda: [
+    ('write_queue_batches_total', 'Транзакции очереди групповой фиксации', 'counter', write_queue.batches),
+    ('write_queue_writes_total', 'Операции очереди групповой фиксации', 'counter', write_queue.writes),
+])
@@ -43,6 +43,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'image_share.metrics.MetricsMiddleware',  # Первым, чтобы учитывать время всех остальных middleware
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -76,13 +77,46 @@ WSGI_APPLICATION = 'my_site.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
+# Профиль SQLite для нескольких одновременных процессов и потоков сервера: тот же набор PRAGMA,
+# что в FastApiProject/app/sqlite_profile.py, там же описано назначение каждой
+SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))
+SQLITE_PRAGMAS = {
+    'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+    'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -64 * 1024)),
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'timeout': SQLITE_BUSY_TIMEOUT / 1000,  # busy_timeout соединения, секунды
+            'init_command': ';'.join(f'PRAGMA {name} = {value}' for name, value in SQLITE_PRAGMAS.items()),
+            # Транзакция сразу берет блокировку записи: при конкуренции писатели ждут busy_timeout,
+            # а не получают ошибку при попытке повысить блокировку чтения до записи
+            'transaction_mode': 'IMMEDIATE',
+        },
+    }
+}
+
+
+# Кеш фрагментов галереи и страниц изображений.
+# Файловый кеш общий для всех процессов сервера на одной машине,
+# поэтому сброс версии в одном процессе виден остальным
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'django_cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
     }
 }
 
+FRAGMENT_CACHE_TIMEOUT = 600  # Время жизни фрагмента, секунды
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -130,4 +164,34 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
 
-LOGIN_URL = 'login'
\ No newline at end of file
+# Миниатюры загруженных изображений (см. image_share/thumbnails.py)
+THUMBNAIL_WIDTHS = (200, 400, 800)
+THUMBNAIL_DIR = 'thumbnails'
+THUMBNAIL_WORKERS = None  # None - по числу ядер процессора
+
+# Кеширование загруженных файлов (см. image_share/media.py).
+# Имена оригиналов не зависят от содержимого (после удаления файла то же имя может получить
+# другая загрузка), а миниатюры пересоздаются, поэтому все файлы проверяются (must-revalidate)
+MEDIA_CACHE_MAX_AGE = 3600
+MEDIA_IMMUTABLE_MAX_AGE = 31536000
+MEDIA_IMMUTABLE_PREFIXES = ()  # Каталоги с адресуемыми по содержимому файлами
+
+LOGIN_URL = 'login'
+# Групповая фиксация комментариев и загрузок одним потоком-писателем (см. image_share/write_queue.py)
+WRITE_BEHIND = os.environ.get('WRITE_BEHIND', '0') == '1'
+WRITE_BATCH_DELAY = float(os.environ.get('WRITE_BATCH_DELAY_MS', 2)) / 1000  # Время сбора пакета, секунды
+WRITE_BATCH_SIZE = int(os.environ.get('WRITE_BATCH_SIZE', 256))  # Максимум операций в пакете
+WRITE_TIMEOUT = float(os.environ.get('WRITE_TIMEOUT', 30))  # Ожидание фиксации записи, секунды
+# Поиск похожих изображений по перцептивному хешу (см. image_share/duplicates.py)
+DUPLICATE_MAX_DISTANCE = int(os.environ.get('DUPLICATE_MAX_DISTANCE', 6))  # Порог, бит из 64
+SIMILAR_LIMIT = 12  # Сколько похожих изображений показывать
+# Очередь фоновых задач обработки загрузок (см. image_share/jobs.py)
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 5))
+JOB_RETRY_DELAY = float(os.environ.get('JOB_RETRY_DELAY', 5))  # Задержка первого повтора, секунды
+JOB_LEASE = float(os.environ.get('JOB_LEASE', 300))  # Максимальное время выполнения задачи, секунды
+JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 1))  # Пауза при пустой очереди, секунды
+# Массовая загрузка файлов и ZIP-архивов (см. image_share/bulk_upload.py)
+BULK_UPLOAD_MAX_FILES = int(os.environ.get('BULK_UPLOAD_MAX_FILES', 500))  # Файлов в запросе, включая файлы архивов
+BULK_UPLOAD_MAX_FILE_SIZE = int(os.environ.get('BULK_UPLOAD_MAX_FILE_SIZE', 20 * 1024 * 1024))  # Файл архива
+DATA_UPLOAD_MAX_NUMBER_FILES = BULK_UPLOAD_MAX_FILES  # По умолчанию Django принимает не больше 100 файлов
+EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 1000))  # Строк в одной части выгрузки (export.py)
@@ -15,10 +15,12 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path
-from image_share.views import home, register, users_list, image_gallery, upload_image, image_detail, login_view, logout_view
+from django.urls import path, re_path
+from image_share.views import (home, register, users_list, image_gallery, upload_image, upload_images,
+                               image_detail, login_view, logout_view, search, export)
+from image_share.media import serve_media
+from image_share.metrics import metrics_view
 from django.conf import settings
-from django.conf.urls.static import static
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -29,7 +31,11 @@ urlpatterns = [
     path('logout/', logout_view, name='logout'),
     path('images/', image_gallery, name='image_gallery'),
     path('images/upload/', upload_image, name='upload_image'),
+    path('images/upload/bulk/', upload_images, name='upload_images'),  # Несколько файлов или ZIP-архив
     path('images/<int:pk>/', image_detail, name='image_detail'),
-]
-
-urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    path('search/', search, name='search'),
+    path('export/<str:table>.<str:fmt>', export, name='export'),  # Потоковая выгрузка в NDJSON или CSV
+    path('metrics/', metrics_view, name='metrics'),  # Метрики в формате Prometheus
+    # Загруженные файлы: ETag/Last-Modified, 304, Range и Cache-Control
+    re_path(r'^%s(?P<path>.*)$' % settings.MEDIA_URL.lstrip('/'), serve_media, name='media'),
+]
\ No newline at end of file
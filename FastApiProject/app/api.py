@@ -0,0 +1,98 @@
+from typing import Optional, Set, Type
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import models, schemas
+from .database import get_async_db
+from .pagination import keyset_query, make_page
+
+"""JSON API версии 1 для мобильного клиента: /api/v1/images, /api/v1/images/{id}/comments, /api/v1/users.
+Списки разбиваются на страницы курсорами (app/pagination.py): ответ содержит items, next_cursor
+и prev_cursor, следующая страница запрашивается с ?after=<next_cursor>, предыдущая - с ?before=<prev_cursor>.
+Параметр fields (например, ?fields=id,filename) оставляет в элементах только перечисленные поля.
+Элементы списка изображений не содержат комментариев (только comment_count): комментарии изображения
+отдаются постранично запросом /api/v1/images/{id}/comments.
+Элементы проверяются схемами из app/schemas.py (они же описывают ответ в OpenAPI) и сериализуются orjson.
+Ответ возвращается готовым ORJSONResponse, поэтому FastAPI не проверяет его схемой второй раз.
+Доступ - по сессии, как у страниц приложения; без входа API отвечает 401, а не перенаправлением"""
+
+API_PAGE_SIZE = 50  # Размер страницы по умолчанию
+API_MAX_PAGE_SIZE = 200
+
+router = APIRouter(prefix="/api/v1", tags=["api"], default_response_class=ORJSONResponse)
+
+
+def require_session(request: Request) -> int:
+    """Зависимость: id пользователя из сессии или ответ 401"""
+    user_id = request.session.get("user_id")
+    if not user_id:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    return user_id
+
+
+def _fields(fields: Optional[str], schema: Type[BaseModel]) -> Set[str]:
+    """Разбирает параметр fields ("id,filename"); без него возвращает все поля схемы"""
+    if not fields:
+        return set(schema.model_fields)
+    selected = {name.strip() for name in fields.split(",") if name.strip()}
+    if not selected:  # Например, ?fields=,
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Не выбрано ни одного поля")
+    unknown = selected - set(schema.model_fields)
+    if unknown:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Неизвестные поля: {', '.join(sorted(unknown))}")
+    return selected
+
+
+async def _page(db: AsyncSession, stmt, column, schema: Type[BaseModel], include: Set[str],
+                after: Optional[str], before: Optional[str], limit: int) -> ORJSONResponse:
+    """Выбирает страницу запроса stmt и возвращает ее ответом с полями include каждого элемента"""
+    try:
+        rows = (await db.scalars(keyset_query(stmt, column, after, before, limit))).all()
+    except ValueError as e:  # Поврежденный курсор или after вместе с before
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    page = make_page(list(rows), column, after, before, limit)
+    return ORJSONResponse({
+        "items": [schema.model_validate(row).model_dump(include=include) for row in page.items],
+        "next_cursor": page.next_cursor,
+        "prev_cursor": page.prev_cursor,
+    })
+
+
+@router.get("/images", response_model=schemas.CursorPage[schemas.ImageSummary])
+async def list_images(after: Optional[str] = None, before: Optional[str] = None,
+                      limit: int = Query(API_PAGE_SIZE, ge=1, le=API_MAX_PAGE_SIZE),
+                      fields: Optional[str] = Query(None, description="Поля через запятую, например id,filename"),
+                      db: AsyncSession = Depends(get_async_db), user_id: int = Depends(require_session)):
+    """Страница изображений по возрастанию id (без комментариев, с их числом comment_count)"""
+    include = _fields(fields, schemas.ImageSummary)
+    stmt = select(models.Image)
+    return await _page(db, stmt, models.Image.id, schemas.ImageSummary, include, after, before, limit)
+
+
+@router.get("/images/{image_id}/comments", response_model=schemas.CursorPage[schemas.Comment])
+async def list_comments(image_id: int, after: Optional[str] = None, before: Optional[str] = None,
+                        limit: int = Query(API_PAGE_SIZE, ge=1, le=API_MAX_PAGE_SIZE),
+                        fields: Optional[str] = Query(None, description="Поля через запятую, например id,text"),
+                        db: AsyncSession = Depends(get_async_db), user_id: int = Depends(require_session)):
+    """Страница комментариев к изображению по возрастанию id"""
+    include = _fields(fields, schemas.Comment)
+    if await db.get(models.Image, image_id) is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    stmt = select(models.Comment).where(models.Comment.image_id == image_id)
+    return await _page(db, stmt, models.Comment.id, schemas.Comment, include, after, before, limit)
+
+
+@router.get("/users", response_model=schemas.CursorPage[schemas.User])
+async def list_users(after: Optional[str] = None, before: Optional[str] = None,
+                     limit: int = Query(API_PAGE_SIZE, ge=1, le=API_MAX_PAGE_SIZE),
+                     fields: Optional[str] = Query(None, description="Поля через запятую, например id,username"),
+                     db: AsyncSession = Depends(get_async_db), user_id: int = Depends(require_session)):
+    """Страница пользователей по возрастанию id (без хешей паролей)"""
+    include = _fields(fields, schemas.User)
+    stmt = select(models.CustomUser)
+    return await _page(db, stmt, models.CustomUser.id, schemas.User, include, after, before, limit)
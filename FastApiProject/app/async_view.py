@@ -0,0 +1,95 @@
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from . import models, schemas
+from .hashing import password_hasher
+from .pagination import Page, keyset_query, make_page
+
+"""Асинхронные версии функций модуля view для работы через AsyncSession.
+Пока запрос ждет ответа базы данных, цикл событий обслуживает другие запросы.
+Связи, которые используются в шаблонах, загружаются заранее (selectinload),
+так как ленивая загрузка в асинхронной сессии недоступна"""
+
+
+async def create_user(db: AsyncSession, user: schemas.UserCreate):
+    """Функция для создания нового пользователя."""
+    # Проверка на существование пользователя
+    existing_user = await db.scalar(select(models.CustomUser).where(models.CustomUser.email == user.email))
+    if existing_user:
+        raise ValueError("Пользователь с таким email уже существует")
+
+    hashed_password = await password_hasher.hash(user.password)  # Хеширование пароля вне цикла событий
+    db_user = models.CustomUser(
+        username=user.username,
+        first_name=user.first_name,
+        last_name=user.last_name,
+        email=user.email,
+        birth_date=user.birth_date,
+        hashed_password=hashed_password,
+    )
+    db.add(db_user)  # Добавление объекта
+    await db.commit()  # Сохранение изменений в БД
+    await db.refresh(db_user)
+    return db_user
+
+
+async def get_users(db: AsyncSession, after: Optional[str] = None, before: Optional[str] = None,
+                    limit: int = 100) -> Page:
+    """Функция возвращает страницу пользователей с учетом курсоров after/before и лимита"""
+    column = models.CustomUser.id
+    rows = (await db.scalars(keyset_query(select(models.CustomUser), column, after, before, limit))).all()
+    return make_page(list(rows), column, after, before, limit)
+
+
+async def get_user(db: AsyncSession, username: str):
+    """Функция для получения пользователя по имени пользователя"""
+    return await db.scalar(select(models.CustomUser).where(models.CustomUser.username == username))
+
+
+async def get_user_by_id(db: AsyncSession, user_id: int):
+    """Функция для получения пользователя по идентификатору"""
+    return await db.get(models.CustomUser, user_id)
+
+
+async def add_image(db: AsyncSession, image: schemas.ImageCreate, user_id: int):
+    """Функция возвращает добавленное изображение"""
+    db_image = models.Image(**image.dict(), user_id=user_id)
+    db.add(db_image)
+    await db.commit()
+    await db.refresh(db_image)
+    return db_image
+
+
+async def get_images(db: AsyncSession, after: Optional[str] = None, before: Optional[str] = None,
+                     limit: int = 100) -> Page:
+    """Функция возвращает страницу изображений вместе с комментариями и их авторами"""
+    column = models.Image.id
+    stmt = select(models.Image).options(
+        selectinload(models.Image.comments).selectinload(models.Comment.user))
+    rows = (await db.scalars(keyset_query(stmt, column, after, before, limit))).all()
+    return make_page(list(rows), column, after, before, limit)
+
+
+async def get_image_from_db(image_id: int, db: AsyncSession):
+    """Функция возвращает изображение вместе с комментариями и их авторами"""
+    return await db.scalar(
+        select(models.Image)
+        .options(selectinload(models.Image.comments).selectinload(models.Comment.user))
+        .where(models.Image.id == image_id))
+
+
+async def add_comment(db: AsyncSession, comment: schemas.CommentCreate, user_id: int, image_id: int):
+    """Функция возвращает сохраненный объект комментария"""
+    db_comment = models.Comment(**comment.dict(), user_id=user_id, image_id=image_id)
+    db.add(db_comment)
+    await db.commit()
+    await db.refresh(db_comment)
+    return db_comment
+
+
+async def get_comments_by_image(db: AsyncSession, image_id: int):
+    """Функция возвращает список комментариев к изображению"""
+    return (await db.scalars(select(models.Comment).where(models.Comment.image_id == image_id))).all()
@@ -0,0 +1,92 @@
+import os
+import zipfile
+import zlib
+from typing import BinaryIO, Callable, List, NamedTuple, Optional, Tuple
+
+from .storage import store_stream
+from .uploads import MAX_UPLOAD_SIZE, SavedUpload, UploadTooLarge
+
+"""Массовая загрузка: много файлов в одной форме или ZIP-архивы с изображениями.
+Файлы архива распаковываются по одному и потоково, блоками, сразу в хранилище (app/storage.py):
+архив не распаковывается целиком ни в память, ни на диск. Размер каждого файла ограничен
+MAX_UPLOAD_SIZE, число файлов в запросе - BULK_MAX_FILES; число проверяется по оглавлениям архивов
+до записи первого файла. Ошибка в одном файле не прерывает загрузку: результат сообщается по каждому файлу.
+Функции синхронные и вызываются в пуле потоков"""
+
+BULK_MAX_FILES = int(os.environ.get("BULK_UPLOAD_MAX_FILES", 500))  # Файлов в одном запросе
+BULK_MAX_UPLOAD_SIZE = int(os.environ.get("BULK_UPLOAD_MAX_SIZE", 500 * 1024 * 1024))  # Тело запроса (500 МБ)
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
+
+# Ошибки чтения отдельного файла архива: поврежденные данные, шифрование, неизвестное сжатие
+_MEMBER_ERRORS = (zipfile.BadZipFile, zlib.error, EOFError, RuntimeError, NotImplementedError)
+
+
+class TooManyFiles(ValueError):
+    """Исключение возбуждается, если в запросе больше BULK_MAX_FILES файлов"""
+
+    def __init__(self, max_files: int):
+        super().__init__(f"Можно загрузить не больше {max_files} файлов за раз")
+        self.max_files = max_files
+
+
+class BulkItem(NamedTuple):
+    """Результат для одного файла: имя (для файла архива - архив/путь), сохраненный файл или ошибка"""
+    filename: str
+    saved: Optional[SavedUpload] = None
+    error: Optional[str] = None
+
+
+def _is_image(name: str) -> bool:
+    return os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+
+
+def _is_hidden(path: str) -> bool:
+    """Служебные файлы архиваторов: __MACOSX/, .DS_Store, ._имя"""
+    return any(part == "__MACOSX" or part.startswith(".") for part in path.split("/"))
+
+
+def _entries(filename: str, source: BinaryIO) -> List[Tuple[str, Optional[Callable], Optional[str]]]:
+    """Раскрывает загруженный файл в список (имя, функция открытия, ошибка).
+    Для архива читается только оглавление, данные файлов не распаковываются"""
+    if os.path.splitext(filename)[1].lower() != ".zip":
+        if not _is_image(filename):
+            return [(filename, None, "Файл не является изображением")]
+        return [(filename, lambda: source, None)]
+    try:
+        archive = zipfile.ZipFile(source)
+    except zipfile.BadZipFile:
+        return [(filename, None, "Поврежденный ZIP-архив")]
+    entries = []
+    for member in archive.infolist():
+        if member.is_dir() or _is_hidden(member.filename):
+            continue
+        name = f"{filename}/{member.filename}"
+        if not _is_image(member.filename):
+            entries.append((name, None, "Файл не является изображением"))
+        elif member.file_size > MAX_UPLOAD_SIZE:  # Размер из оглавления; при чтении он проверяется еще раз
+            entries.append((name, None, str(UploadTooLarge(MAX_UPLOAD_SIZE))))
+        else:
+            entries.append((name, lambda member=member: archive.open(member), None))
+    return entries
+
+
+def store_files(files: List[Tuple[str, BinaryIO]], max_files: int = BULK_MAX_FILES) -> List[BulkItem]:
+    """Функция сохраняет в хранилище файлы (имя, файловый объект) и изображения из ZIP-архивов
+    и возвращает результат по каждому файлу в порядке загрузки.
+    Если файлов больше max_files, возбуждает TooManyFiles, ничего не сохранив"""
+    entries = [entry for filename, source in files for entry in _entries(filename, source)]
+    if len(entries) > max_files:
+        raise TooManyFiles(max_files)
+    items = []
+    for name, opener, error in entries:
+        if error is not None:
+            items.append(BulkItem(name, error=error))
+            continue
+        try:
+            with opener() as data:
+                items.append(BulkItem(name, saved=store_stream(data, name)))
+        except UploadTooLarge as e:
+            items.append(BulkItem(name, error=str(e)))
+        except _MEMBER_ERRORS as e:
+            items.append(BulkItem(name, error=f"Не удалось прочитать файл из архива: {e}"))
+    return items
@@ -0,0 +1,35 @@
+import argparse
+
+from sqlalchemy import func, select, update
+from sqlalchemy.engine import Connection
+
+from . import models
+from .database import engine
+
+"""Сверка денормализованного счетчика images.comment_count с таблицей комментариев.
+Счетчик поддерживается обработчиками в models.py; сверка нужна после массовых вставок
+в обход ORM и для исправления расхождений (например, после ручного редактирования базы).
+
+Запуск из каталога FastApiProject:
+    python -m app.comment_counts"""
+
+
+def reconcile_comment_counts(connection: Connection) -> int:
+    """Пересчитывает счетчики, отличающиеся от фактического числа комментариев.
+    Возвращает число исправленных изображений"""
+    images, comments = models.Image.__table__, models.Comment.__table__
+    actual = (select(func.count()).select_from(comments)
+              .where(comments.c.image_id == images.c.id).scalar_subquery())
+    return connection.execute(
+        update(images).where(images.c.comment_count != actual).values(comment_count=actual)).rowcount
+
+
+def main():
+    argparse.ArgumentParser(description="Сверка счетчиков комментариев изображений").parse_args()
+    with engine.begin() as connection:
+        fixed = reconcile_comment_counts(connection)
+    print(f"Исправлено счетчиков: {fixed}")
+
+
+if __name__ == "__main__":
+    main()
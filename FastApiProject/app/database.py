@@ -0,0 +1,40 @@
+import os
+
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from .sqlite_profile import apply_sqlite_profile
+
+"""Настройка базы данных и создание движков SQLAlchemy,
+которые используются для подключения и взаимодействия с базой данных.
+Синхронный движок нужен для миграций, скриптов и создания таблиц,
+асинхронный (aiosqlite) - для обработчиков запросов, чтобы ожидание БД не блокировало цикл событий"""
+
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///image_share.db")
+ASYNC_DATABASE_URL = DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+
+engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})  # Движок для взаимодействия с БД
+apply_sqlite_profile(engine)  # WAL, busy_timeout и остальные PRAGMA для каждого соединения
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+async_engine = create_async_engine(ASYNC_DATABASE_URL)  # Асинхронный движок
+apply_sqlite_profile(async_engine.sync_engine)
+# expire_on_commit=False: после commit объекты остаются доступны шаблонам без повторной загрузки
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession,
+                                       autoflush=False, expire_on_commit=False)
+
+
+def get_db():
+    """Генератор для управления сессиями базы данных"""
+    db = SessionLocal()  # Создание новой сессии БД
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_db():
+    """Асинхронный генератор для управления сессиями базы данных в обработчиках запросов"""
+    async with AsyncSessionLocal() as db:
+        yield db
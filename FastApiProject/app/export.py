@@ -0,0 +1,97 @@
+import argparse
+import csv
+import json
+import os
+import sys
+from typing import AsyncIterator, Callable, Sequence, Tuple
+
+from sqlalchemy import select
+
+from . import models
+from .database import AsyncSessionLocal, SessionLocal
+
+"""Потоковая выгрузка пользователей, изображений и комментариев в формате NDJSON или CSV.
+Строки читаются из базы частями по EXPORT_CHUNK_SIZE (yield_per). Выбираются только столбцы,
+а не объекты ORM, поэтому карта идентичности сессии не растет. Каждая часть сразу
+преобразуется в текст и отдается клиенту, так что память не зависит от размера таблицы.
+Хеши паролей не выгружаются. Таблица users с адресами почты выгружается только из командной строки,
+по HTTP - HTTP_TABLES. Выгрузка из командной строки (из каталога FastApiProject):
+    python -m app.export images --format csv --output images.csv"""
+
+EXPORT_CHUNK_SIZE = int(os.environ.get("EXPORT_CHUNK_SIZE", 1000))  # Строк в одной части
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}  # Формат -> тип содержимого
+TABLES = {  # Имя выгрузки -> модель и выгружаемые столбцы
+    "users": (models.CustomUser, ("id", "username", "first_name", "last_name", "email", "birth_date")),
+    "images": (models.Image, ("id", "user_id", "filename", "content_hash", "description", "width", "height",
+                              "format", "file_size", "comment_count")),
+    "comments": (models.Comment, ("id", "image_id", "user_id", "text")),
+}
+HTTP_TABLES = ("images", "comments")  # Выгрузки, доступные любому вошедшему пользователю
+
+
+class _Echo:
+    """Файловый объект для csv.writer: writerow возвращает строку вместо записи"""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+def export_query(table: str):
+    """Запрос выгрузки таблицы table в порядке id с чтением частями"""
+    model, fields = TABLES[table]
+    return (select(*(getattr(model, field) for field in fields)).order_by(model.id)
+            .execution_options(yield_per=EXPORT_CHUNK_SIZE))
+
+
+def encoder(table: str, fmt: str) -> Tuple[str, Callable[[Sequence], str]]:
+    """Возвращает заголовок выгрузки и функцию, преобразующую часть строк в текст"""
+    fields = TABLES[table][1]
+    if fmt == "csv":
+        writer = csv.writer(_Echo())
+        return writer.writerow(fields), lambda rows: "".join(writer.writerow(row) for row in rows)
+
+    def ndjson(rows: Sequence) -> str:
+        return "".join(json.dumps(dict(zip(fields, row)), ensure_ascii=False, default=str) + "\n" for row in rows)
+    return "", ndjson
+
+
+async def export_stream(table: str, fmt: str) -> AsyncIterator[str]:
+    """Асинхронно выдает выгрузку по частям для StreamingResponse.
+    Сессия открывается здесь, а не через зависимость: ответ передается уже после выхода из обработчика"""
+    header, encode = encoder(table, fmt)
+    if header:
+        yield header
+    async with AsyncSessionLocal() as db:
+        result = await db.stream(export_query(table))
+        async for rows in result.partitions():
+            yield encode(rows)
+
+
+def export_to(out, table: str, fmt: str) -> int:
+    """Записывает выгрузку в текстовый файл out и возвращает число строк"""
+    header, encode = encoder(table, fmt)
+    out.write(header)
+    count = 0
+    with SessionLocal() as db:
+        for rows in db.execute(export_query(table)).partitions():
+            out.write(encode(rows))
+            count += len(rows)
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Выгрузка таблицы в NDJSON или CSV")
+    parser.add_argument("table", choices=sorted(TABLES), help="Что выгружать")
+    parser.add_argument("--format", choices=sorted(FORMATS), default="ndjson", help="Формат выгрузки")
+    parser.add_argument("--output", default="-", help="Файл выгрузки (по умолчанию стандартный вывод)")
+    args = parser.parse_args()
+    if args.output == "-":
+        count = export_to(sys.stdout, args.table, args.format)
+    else:
+        with open(args.output, "w", encoding="utf-8", newline="") as out:
+            count = export_to(out, args.table, args.format)
+    print(f"Выгружено строк: {count}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .view import pwd_context
+
+"""Модуль выносит хеширование и проверку паролей (bcrypt) из цикла событий.
+Вычисления выполняются в отдельном пуле потоков (bcrypt освобождает GIL),
+число одновременных вычислений ограничено, а длина очереди отслеживается и тоже ограничена,
+поэтому всплеск входов не останавливает обработку остальных запросов"""
+
+PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+PASSWORD_HASH_MAX_WAITING = int(os.environ.get("PASSWORD_HASH_MAX_WAITING", 1000))
+
+
+class HasherBusy(RuntimeError):
+    """Исключение возбуждается, если очередь на хеширование переполнена"""
+
+
+class PasswordHasher:
+    """Ограниченный исполнитель операций с паролями со статистикой очереди.
+    workers=0 включает прежний режим: хеширование прямо в цикле событий (для сравнения в бенчмарке)"""
+
+    def __init__(self, context, workers: int = PASSWORD_HASH_WORKERS,
+                 max_waiting: int = PASSWORD_HASH_MAX_WAITING):
+        self._context = context
+        self.workers = workers
+        self.max_waiting = max_waiting
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="password-hash") if workers else None
+        self._semaphore = asyncio.Semaphore(workers) if workers else None
+        self.waiting = 0  # Сколько операций ждут свободного потока
+        self.running = 0  # Сколько операций выполняется сейчас
+        self.max_waiting_seen = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.run_time_total = 0.0
+
+    async def hash(self, password: str) -> str:
+        """Возвращает хеш пароля"""
+        return await self._run(self._context.hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Проверяет пароль по хешу"""
+        return await self._run(self._context.verify, plain_password, hashed_password)
+
+    async def _run(self, func, *args):
+        """Выполняет func в пуле потоков, дожидаясь свободного места в пределах лимита"""
+        if self._executor is None:
+            started = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                self._record(0.0, time.perf_counter() - started)
+
+        if self.waiting >= self.max_waiting:
+            self.rejected += 1
+            raise HasherBusy("Слишком много одновременных проверок пароля, повторите позже")
+
+        queued_at = time.perf_counter()
+        self.waiting += 1
+        self.max_waiting_seen = max(self.max_waiting_seen, self.waiting)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        started = time.perf_counter()
+        self.running += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self.running -= 1
+            self._semaphore.release()
+            self._record(started - queued_at, time.perf_counter() - started)
+
+    def _record(self, waited: float, ran: float) -> None:
+        """Учитывает завершенную операцию в статистике"""
+        self.completed += 1
+        self.wait_time_total += waited
+        self.wait_time_max = max(self.wait_time_max, waited)
+        self.run_time_total += ran
+
+    def stats(self) -> dict:
+        """Возвращает текущую статистику очереди хеширования"""
+        completed = self.completed or 1
+        return {
+            "workers": self.workers,
+            "waiting": self.waiting,
+            "running": self.running,
+            "max_waiting_seen": self.max_waiting_seen,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(self.wait_time_total / completed * 1000, 3),
+            "max_wait_ms": round(self.wait_time_max * 1000, 3),
+            "avg_run_ms": round(self.run_time_total / completed * 1000, 3),
+        }
+
+
+password_hasher = PasswordHasher(pwd_context)  # Общий исполнитель для обработчиков запросов
@@ -0,0 +1,180 @@
+import argparse
+import json
+import logging
+import os
+import signal
+import socket
+import time
+import traceback
+from datetime import datetime, timedelta
+from multiprocessing import get_context
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.orm import Session
+
+from . import models
+from .database import SessionLocal
+from .duplicates import find_duplicate
+from .metadata import extract_metadata
+from .storage import UPLOAD_DIR
+
+"""Очередь фоновых задач в таблице jobs той же базы SQLite.
+Обработчик запроса добавляет задачу в своей транзакции (вместе со строкой изображения) и сразу отвечает,
+а разбор файла выполняют отдельные процессы-обработчики (запуск из каталога FastApiProject):
+    python -m app.jobs --concurrency 4
+Процесс забирает задачу условным UPDATE: задачу получает только тот, чей UPDATE изменил строку.
+Выполненная задача удаляется в одной транзакции с результатом. При ошибке задача повторяется
+с задержкой JOB_RETRY_DELAY * 2^(попытка - 1), после JOB_MAX_ATTEMPTS попыток получает статус failed.
+Задача процесса, завершившегося аварийно, снова становится доступной через JOB_LEASE секунд,
+поэтому обработчики задач должны быть идемпотентными"""
+
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", 5))
+JOB_RETRY_DELAY = float(os.environ.get("JOB_RETRY_DELAY", 5))  # Задержка первого повтора, секунды
+JOB_LEASE = float(os.environ.get("JOB_LEASE", 300))  # Максимальное время выполнения задачи, секунды
+JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", 1))  # Пауза при пустой очереди, секунды
+CLAIM_CANDIDATES = 10  # Сколько задач просматривается за одну попытку взять задачу
+
+logger = logging.getLogger(__name__)
+handlers: Dict[str, Callable] = {}  # Вид задачи -> обработчик
+_stopping = False
+
+
+def job_handler(kind: str):
+    """Декоратор регистрирует обработчик задач вида kind - функцию handler(session, **payload).
+    Обработчик только изменяет данные в сессии, фиксирует их очередь вместе с удалением задачи"""
+    def register(handler: Callable) -> Callable:
+        handlers[kind] = handler
+        return handler
+    return register
+
+
+def enqueue(db, kind: str, **payload) -> models.Job:
+    """Добавляет задачу в сессию (синхронную или асинхронную) без фиксации:
+    задача сохраняется в той же транзакции, что и данные, для которых она создана"""
+    job = models.Job(kind=kind, payload=json.dumps(payload), max_attempts=JOB_MAX_ATTEMPTS)
+    db.add(job)
+    return job
+
+
+def _available(now: datetime):
+    """Условие доступности задачи: ожидающая, срок которой наступил, или брошенная обработчиком"""
+    Job = models.Job
+    return or_(and_(Job.status == "queued", Job.run_after <= now),
+               and_(Job.status == "running", Job.locked_at < now - timedelta(seconds=JOB_LEASE)))
+
+
+def claim(session: Session, worker: str) -> Optional[models.Job]:
+    """Забирает одну доступную задачу и возвращает ее или None, если очередь пуста"""
+    Job = models.Job
+    now = datetime.utcnow()
+    candidates = session.execute(
+        select(Job.id, Job.status, Job.attempts, Job.max_attempts)
+        .where(_available(now)).order_by(Job.run_after, Job.id).limit(CLAIM_CANDIDATES)).all()
+    for job_id, job_status, attempts, max_attempts in candidates:
+        if job_status == "running" and attempts >= max_attempts:
+            # Брошенная задача, исчерпавшая попытки (например, обработчик падает на ней целиком)
+            values = {"status": "failed", "locked_at": None, "locked_by": None,
+                      "last_error": "Превышено время выполнения"}
+        else:
+            values = {"status": "running", "attempts": Job.attempts + 1, "locked_at": now, "locked_by": worker}
+        claimed = session.execute(update(Job).where(Job.id == job_id, _available(now)).values(**values)).rowcount
+        session.commit()
+        if claimed and values["status"] == "running":
+            return session.get(Job, job_id)
+    session.commit()
+    return None
+
+
+def run_job(session: Session, job: models.Job) -> bool:
+    """Выполняет взятую задачу. При ошибке откладывает повтор или помечает задачу как failed"""
+    job_id, attempts, max_attempts = job.id, job.attempts, job.max_attempts
+    handler = handlers.get(job.kind)
+    try:
+        if handler is None:
+            raise LookupError(f"Нет обработчика задач {job.kind}")
+        handler(session, **json.loads(job.payload))
+        session.delete(job)
+        session.commit()
+        return True
+    except Exception:
+        session.rollback()
+        failed = attempts >= max_attempts
+        logger.exception(f"Задача {job_id}: попытка {attempts} из {max_attempts} не удалась")
+        session.execute(update(models.Job).where(models.Job.id == job_id).values(
+            status="failed" if failed else "queued",
+            run_after=datetime.utcnow() + timedelta(seconds=JOB_RETRY_DELAY * 2 ** (attempts - 1)),
+            locked_at=None, locked_by=None, last_error=traceback.format_exc(limit=5)))
+        session.commit()
+        return False
+
+
+def _stop(signum, frame) -> None:
+    global _stopping
+    _stopping = True
+
+
+def work(worker: str, once: bool = False) -> int:
+    """Цикл процесса-обработчика: выполняет задачи по одной до сигнала остановки
+    (текущая задача при этом завершается), а с once=True - пока очередь не опустеет.
+    Возвращает число выполненных задач"""
+    signal.signal(signal.SIGINT, _stop)
+    signal.signal(signal.SIGTERM, _stop)
+    done = 0
+    session = SessionLocal()
+    try:
+        while not _stopping:
+            job = claim(session, worker)
+            if job is None:
+                if once:
+                    break
+                time.sleep(JOB_POLL_INTERVAL)
+                continue
+            done += run_job(session, job)
+    finally:
+        session.close()
+    return done
+
+
+@job_handler("process_image")
+def process_image(session: Session, image_id: int) -> None:
+    """Размеры, формат, LQIP-заглушка и перцептивный хеш загруженного файла,
+    а по хешу - ранее загруженная копия изображения"""
+    image = session.get(models.Image, image_id)
+    if image is None:  # Изображение удалено до обработки
+        return
+    for name, value in (extract_metadata(os.path.join(UPLOAD_DIR, image.filename)) or {}).items():
+        setattr(image, name, value)
+    image.duplicate_of_id = find_duplicate(session, image.phash, image.id) if image.phash else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Обработчик фоновых задач")
+    parser.add_argument("--concurrency", type=int, default=os.cpu_count() or 1, help="Число процессов-обработчиков")
+    parser.add_argument("--once", action="store_true", help="Выполнить накопившиеся задачи и завершиться")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    name = f"{socket.gethostname()}:{os.getpid()}"
+    if args.concurrency <= 1:
+        print(f"Выполнено задач: {work(name, args.once)}")
+        return
+    # spawn: каждый процесс открывает собственные соединения с базой
+    context = get_context("spawn")
+    processes = [context.Process(target=work, args=(f"{name}/{number}", args.once))
+                 for number in range(args.concurrency)]
+    for process in processes:
+        process.start()
+
+    def forward(signum, frame):
+        for process in processes:
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGINT, forward)
+    signal.signal(signal.SIGTERM, forward)
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()
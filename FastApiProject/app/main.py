@@ -1,14 +1,30 @@
-from fastapi import FastAPI, Depends, HTTPException, Form, Request, status, UploadFile
-from typing import Optional
-from sqlalchemy import create_engine
+from fastapi import FastAPI, Depends, File, Header, HTTPException, Form, Request, Response, status, UploadFile, Query
+from typing import List, Optional
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse, RedirectResponse
-from app import models, view, schemas, forms
+from fastapi.responses import HTMLResponse, PlainTextResponse, RedirectResponse, StreamingResponse
+from app import models, view, async_view, schemas, forms
+from app.api import router as api_router
+from app.bulk_upload import BULK_MAX_UPLOAD_SIZE, TooManyFiles, store_files
+from app.database import AsyncSessionLocal, engine, get_async_db
+from app.duplicates import duplicate_index, find_similar, refresh_index
+from app.export import FORMATS, HTTP_TABLES, export_stream
+from app.hashing import HasherBusy, password_hasher
+from app.jobs import enqueue
+from app.metrics import MetricsMiddleware, metrics
+from app.resumable import (MAX_CHUNK_SIZE, OffsetMismatch, UploadNotFound, abort_upload, create_upload,
+                           finalize_upload, get_upload, write_chunk)
+from app.search import ensure_search_index, search_images
+from app.static_files import CachedStaticFiles
+from app.storage import UPLOAD_DIR, store_upload
+from app.user_cache import user_cache
+from app.uploads import SavedUpload, UploadSizeLimitMiddleware, UploadTooLarge
+from app.write_queue import write_queue
 import os
 from fastapi.staticfiles import StaticFiles
-from passlib.context import CryptContext
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
 from starlette.middleware.sessions import SessionMiddleware
 import logging
 
@@ -16,48 +32,81 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-"""Настройка базы данных и создание движка SQLAlchemy,
-который используется для подключения и взаимодействия с базой данных"""
-DATABASE_URL = "sqlite:///image_share.db"
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})  # Движок для взаимодействия с БД
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
+"""Движки и сессии базы данных настраиваются в модуле app.database.
+Обработчики запросов используют асинхронную сессию (get_async_db)"""
 models.Base.metadata.create_all(bind=engine)  # Создание таблиц, описанных в моделях
+ensure_search_index(engine)  # Полнотекстовый индекс FTS5 и триггеры для него
 
 app = FastAPI()  # Создаем экземпляр приложения FastAPI
 templates = Jinja2Templates(directory="app/templates")  # Настройка шаблонизатора Jinja2 и установка пути
 app.add_middleware(SessionMiddleware, secret_key="your_secret_key")
+app.add_middleware(UploadSizeLimitMiddleware, paths=["/upload_image"])  # Ограничение размера загрузок
+app.add_middleware(UploadSizeLimitMiddleware, paths=["/upload_images"], max_size=BULK_MAX_UPLOAD_SIZE)
+app.add_middleware(MetricsMiddleware)  # Внешний слой: метрики учитывают время всех остальных middleware
 
-UPLOAD_DIR = "uploads"  # Директория для хранения загруженных файлов
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+os.makedirs(UPLOAD_DIR, exist_ok=True)  # Директория для хранения загруженных файлов
 
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+# Загруженные файлы отдаются с ETag/Last-Modified, поддержкой Range и Cache-Control
+app.mount("/uploads", CachedStaticFiles(directory=UPLOAD_DIR), name="uploads")
 
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-'''функции для создания и проверки токенов:'''
+app.include_router(api_router)  # JSON API для мобильного клиента: /api/v1/... (app/api.py)
 
-def get_db():
-    """Генератор для управления сессиями базы данных"""
-    db = SessionLocal()  # Создание новой сессии БД
-    try:
-        yield db
-    finally:
-        db.close()
+PAGE_SIZE = 20  # Количество записей на одной странице списков
+
+
+def _service_metrics():
+    """Состояние очереди хеширования паролей и кеша пользователей для /metrics"""
+    hasher = password_hasher.stats()
+    return [
+        ("password_hasher_workers", "Число потоков хеширования паролей", "gauge", hasher["workers"]),
+        ("password_hasher_waiting", "Операции, ожидающие свободного потока", "gauge", hasher["waiting"]),
+        ("password_hasher_running", "Выполняемые сейчас операции", "gauge", hasher["running"]),
+        ("password_hasher_completed_total", "Завершенные операции", "counter", hasher["completed"]),
+        ("password_hasher_rejected_total", "Операции, отклоненные из-за переполнения очереди",
+         "counter", hasher["rejected"]),
+        ("password_hasher_max_wait_seconds", "Максимальное ожидание в очереди", "gauge",
+         hasher["max_wait_ms"] / 1000),
+        ("user_cache_hits_total", "Попадания в кеш пользователей", "counter", user_cache.hits),
+        ("user_cache_misses_total", "Промахи кеша пользователей", "counter", user_cache.misses),
+        ("write_queue_batches_total", "Транзакции очереди групповой фиксации", "counter", write_queue.batches),
+        ("write_queue_writes_total", "Операции очереди групповой фиксации", "counter", write_queue.writes),
+    ]
+
+
+metrics.add_collector(_service_metrics)
+
+
+@app.on_event("startup")
+async def _load_duplicate_index():
+    """Загружает перцептивные хеши всех изображений в индекс похожих изображений"""
+    async with AsyncSessionLocal() as db:
+        await refresh_index(db)
+    logger.info(f"Индекс похожих изображений: {len(duplicate_index)} хешей")
+
+
+@app.on_event("shutdown")
+def _close_write_queue():
+    """Дожидается фиксации записей, оставшихся в очереди"""
+    write_queue.close()
+
+'''функции для создания и проверки токенов:'''
 
-def get_image_from_db(image_id: int, db: Session):
-    image = db.query(models.Image).filter(models.Image.id == image_id).first()
-    return image
+async def get_image_from_db(image_id: int, db: AsyncSession):
+    return await async_view.get_image_from_db(image_id, db)
 '''зависимость для проверки аутентификации:'''
-def get_current_user(request: Request, db: Session = Depends(get_db)):
+async def get_current_user(request: Request, db: AsyncSession = Depends(get_async_db)):
     user_id = request.session.get("user_id")
     if not user_id:
         raise HTTPException(status_code=status.HTTP_307_TEMPORARY_REDIRECT, headers={"Location": "/login"})
-    user = db.query(models.CustomUser).filter(models.CustomUser.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=status.HTTP_307_TEMPORARY_REDIRECT, headers={"Location": "/login"})
+    user = user_cache.get(user_id)  # В установившемся режиме пользователь берется из кеша без запроса к БД
+    if user is None:
+        user = await async_view.get_user_by_id(db, user_id)
+        if not user:
+            raise HTTPException(status_code=status.HTTP_307_TEMPORARY_REDIRECT, headers={"Location": "/login"})
+        db.expunge(user)  # Отсоединяем объект от сессии, чтобы безопасно хранить его в кеше
+        user_cache.set(user_id, user)
     return user
 
 # Главная страница
@@ -78,7 +127,8 @@ async def register_form(request: Request) -> HTMLResponse:
 @app.post("/reg", response_class=HTMLResponse)
 async def register_user(request: Request, username: str = Form(...), first_name: str = Form(...),
                         last_name: str = Form(...), email: str = Form(...), birth_date: str = Form(...),
-                        password: str = Form(...), confirm_password: str = Form(...), db: Session = Depends(get_db)):
+                        password: str = Form(...), confirm_password: str = Form(...),
+                        db: AsyncSession = Depends(get_async_db)):
     try:
         # Проверка совпадения паролей
         if password != confirm_password:
@@ -94,75 +144,250 @@ async def register_user(request: Request, username: str = Form(...), first_name:
         password=password,
         confirm_password=confirm_password
         )
-        view.create_user(db, user_data)
-        db.commit()
+        await async_view.create_user(db, user_data)  # Пользователь сохраняется внутри create_user
 
         return templates.TemplateResponse("home.html", {"request": request, "message": "Вы успешно зарегистрировались!"})
+    except HasherBusy as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
     except SQLAlchemyError as e:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 # Список пользователей
 @app.get("/list", response_class=HTMLResponse)
-async def users_list(request: Request, db: Session = Depends(get_db),
+async def users_list(request: Request, after: Optional[str] = None, before: Optional[str] = None,
+                     limit: int = Query(PAGE_SIZE, ge=1, le=100), db: AsyncSession = Depends(get_async_db),
                      current_user: models.CustomUser = Depends(get_current_user)) -> HTMLResponse:
     """
     Обработка GET-запроса на получение списка зарегистрированных пользователей.
-    Возвращает список пользователей из базы данных.
+    Возвращает страницу пользователей из базы данных, курсоры after/before задают ее положение.
     """
-    users = view.get_users(db)  # Вызываем функцию для извлечения всех пользователей
-    return templates.TemplateResponse("users_list.html", {"request": request, "users": users,
-                                                          "current_user": current_user})
+    try:
+        page = await async_view.get_users(db, after=after, before=before, limit=limit)  # Извлекаем страницу пользователей
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return templates.TemplateResponse("users_list.html", {"request": request, "users": page.items,
+                                                          "page": page, "limit": limit, "current_user": current_user})
 
 @app.get("/images", response_class=HTMLResponse)
-async def view_images(request: Request, db: Session = Depends(get_db),
-                    current_user: models.CustomUser = Depends(get_current_user)) -> HTMLResponse:
-    images = view.get_images(db)
+async def view_images(request: Request, after: Optional[str] = None, before: Optional[str] = None,
+                      limit: int = Query(PAGE_SIZE, ge=1, le=100), db: AsyncSession = Depends(get_async_db),
+                      current_user: models.CustomUser = Depends(get_current_user)) -> HTMLResponse:
+    """Обработка GET-запроса на получение страницы изображений.
+    Курсоры after/before задают положение страницы в списке, limit - ее размер;
+    ссылки на соседние страницы сохраняют limit"""
+    try:
+        page = await async_view.get_images(db, after=after, before=before, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     logger.info(f"Current user: {current_user.username}")  # Логирование
     return templates.TemplateResponse(
     "images.html",
-    {"request": request, "images": images, "current_user": current_user}
+    {"request": request, "images": page.items, "page": page, "limit": limit, "current_user": current_user}
     )
 
+@app.get("/search", response_class=HTMLResponse)
+async def search(request: Request, q: str = "", db: AsyncSession = Depends(get_async_db),
+                 current_user: models.CustomUser = Depends(get_current_user)) -> HTMLResponse:
+    """Полнотекстовый поиск изображений по описанию и комментариям.
+    Результаты упорядочены по релевантности"""
+    query = q.strip()
+    images = await search_images(db, query) if query else []
+    return templates.TemplateResponse(
+    "search.html",
+    {"request": request, "images": images, "query": query, "current_user": current_user}
+    )
+
+@app.get("/export/{table}.{fmt}")
+async def export(table: str, fmt: str, current_user: models.CustomUser = Depends(get_current_user)):
+    """Потоковая выгрузка таблицы images или comments в формате ndjson или csv (app/export.py).
+    Строки читаются из базы частями и отдаются по мере чтения, ответ не собирается в памяти.
+    Пользователи (с адресами почты) выгружаются только из командной строки: python -m app.export users"""
+    if table not in HTTP_TABLES or fmt not in FORMATS:
+        raise HTTPException(status_code=404, detail="Export not found")
+    return StreamingResponse(export_stream(table, fmt), media_type=FORMATS[fmt],
+                             headers={"Content-Disposition": f'attachment; filename="{table}.{fmt}"'})
+
 @app.post("/upload_image")
-async def upload_image(file: UploadFile, description: Optional[str] = Form(None), db: Session = Depends(get_db)):
+async def upload_image(file: UploadFile, description: Optional[str] = Form(None),
+                       db: AsyncSession = Depends(get_async_db)):
     """Асинхронная функция-обработчик для запросов к конечной точке "/upload_image".
-        Получает загруженный файл из данных формы и сессию базы данных."""
-    file_path = os.path.join(UPLOAD_DIR, file.filename)  # Создаем путь для сохранения картинки
-    with open(file_path, "wb") as f:  # Считываем содержимое открытого файла и записываем данные в открытый файл
-        f.write(await file.read())
-        # Сохранение описания вместе с файлом
-        image = models.Image(filename=file.filename, description=description)
-        db.add(image)
-        db.commit()
-    db.refresh(image)
+        Получает загруженный файл из данных формы и сессию базы данных.
+        Файл записывается на диск блоками вне цикла событий, размер ограничен MAX_UPLOAD_SIZE.
+        Имя файла в хранилище - хеш содержимого, поэтому повторные загрузки не занимают место.
+        Разбор файла (размеры, заглушка, перцептивный хеш) выполняется фоновой задачей (app/jobs.py),
+        которая сохраняется в одной транзакции с изображением, поэтому ответ не ждет обработки."""
+    try:
+        saved = await store_upload(file)  # Потоковая запись с подсчетом SHA-256
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    logger.info(f"Загружен файл {file.filename}: {saved.size} байт, sha256={saved.sha256}")
+    image_id = await save_image(db, saved, description)
     # Перенаправляем пользователя на страницу с изображением
-    return RedirectResponse(url=f"/get_image/{image.id}", status_code=303)
+    return RedirectResponse(url=f"/get_image/{image_id}", status_code=303)
+
+
+async def save_image(db: AsyncSession, saved: SavedUpload, description: Optional[str]) -> int:
+    """Сохраняет изображение для файла из хранилища вместе с задачей его обработки
+    и возвращает id изображения"""
+    if write_queue.enabled:  # Строка добавляется пакетом вместе с другими записями
+        return await write_queue.run(view.insert_image, saved.path, saved.sha256, description)
+    image = models.Image(filename=saved.path, content_hash=saved.sha256, description=description)
+    db.add(image)
+    await db.flush()
+    enqueue(db, "process_image", image_id=image.id)
+    await db.commit()
+    return image.id
+
+
+@app.post("/upload_images", response_model=schemas.BulkUploadResult)
+async def upload_images(files: List[UploadFile] = File(...), description: Optional[str] = Form(None),
+                        db: AsyncSession = Depends(get_async_db)):
+    """Массовая загрузка: несколько файлов в поле files, в том числе ZIP-архивы с изображениями
+    (app/bulk_upload.py). Все изображения и задачи их обработки сохраняются одной транзакцией.
+    Возвращает результат по каждому файлу: id изображения или причину, по которой файл пропущен"""
+    try:
+        items = await run_in_threadpool(store_files, [(file.filename or "", file.file) for file in files])
+    except TooManyFiles as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    image_ids = iter(await save_images(db, [item.saved for item in items if item.saved], description))
+    results = []
+    for item in items:
+        image_id = next(image_ids) if item.saved else None
+        results.append(schemas.BulkUploadItem(filename=item.filename, image_id=image_id, error=item.error,
+                                              url=f"/get_image/{image_id}" if image_id else None))
+    created = sum(1 for item in results if item.image_id)
+    logger.info(f"Массовая загрузка: создано изображений {created}, пропущено файлов {len(results) - created}")
+    return schemas.BulkUploadResult(created=created, failed=len(results) - created, items=results)
+
+
+async def save_images(db: AsyncSession, saved_files: List[SavedUpload], description: Optional[str]) -> List[int]:
+    """Сохраняет изображения для нескольких файлов из хранилища одной транзакцией:
+    строки вставляются одним flush, задачи обработки фиксируются вместе с ними. Возвращает id по порядку"""
+    if not saved_files:
+        return []
+    images = [models.Image(filename=saved.path, content_hash=saved.sha256, description=description)
+              for saved in saved_files]
+    db.add_all(images)
+    await db.flush()
+    for image in images:
+        enqueue(db, "process_image", image_id=image.id)
+    await db.commit()
+    return [image.id for image in images]
+
+'''Возобновляемая загрузка больших файлов по частям (app/resumable.py):
+POST /resumable_uploads - создать загрузку, PATCH /resumable_uploads/{id} с заголовком Upload-Offset -
+отправить часть, GET - узнать смещение после обрыва, POST /resumable_uploads/{id}/complete - завершить,
+DELETE - отменить'''
+
+def _resumable_state(upload) -> schemas.ResumableUpload:
+    return schemas.ResumableUpload(id=upload.id, filename=upload.filename, size=upload.size,
+                                   offset=upload.offset, max_chunk_size=MAX_CHUNK_SIZE)
+
+
+@app.post("/resumable_uploads", response_model=schemas.ResumableUpload, status_code=status.HTTP_201_CREATED)
+async def create_resumable_upload(data: schemas.ResumableUploadCreate, response: Response):
+    """Создает загрузку объявленного размера; адрес загрузки возвращается в заголовке Location"""
+    try:
+        upload = await run_in_threadpool(create_upload, data.filename, data.size, data.description)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    response.headers["Location"] = f"/resumable_uploads/{upload.id}"
+    return _resumable_state(upload)
+
+
+@app.get("/resumable_uploads/{upload_id}", response_model=schemas.ResumableUpload)
+async def get_resumable_upload(upload_id: str, response: Response):
+    """Возвращает состояние загрузки: с offset клиент продолжает после обрыва соединения"""
+    try:
+        upload = await run_in_threadpool(get_upload, upload_id)
+    except UploadNotFound:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    response.headers["Upload-Offset"] = str(upload.offset)
+    return _resumable_state(upload)
+
+
+@app.patch("/resumable_uploads/{upload_id}", response_model=schemas.ResumableUpload)
+async def patch_resumable_upload(upload_id: str, request: Request, response: Response,
+                                 upload_offset: int = Header(..., ge=0)):
+    """Дописывает часть из тела запроса (application/offset+octet-stream или любой двоичный тип).
+    Тело не буферизуется: блоки записываются на диск по мере поступления.
+    При несовпадении смещения или если другая часть этой загрузки еще записывается,
+    возвращает 409 и текущее смещение в заголовке Upload-Offset"""
+    try:
+        upload = await write_chunk(upload_id, upload_offset, request.stream())
+    except UploadNotFound:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    except OffsetMismatch as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e),
+                            headers={"Upload-Offset": str(e.offset)})
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except ClientDisconnect:  # Полученные байты сохранены, клиент продолжит с нового смещения
+        logger.info(f"Загрузка {upload_id}: соединение оборвано")
+        return Response(status_code=status.HTTP_400_BAD_REQUEST)
+    response.headers["Upload-Offset"] = str(upload.offset)
+    return _resumable_state(upload)
+
+
+@app.post("/resumable_uploads/{upload_id}/complete", response_model=schemas.ResumableUploadResult,
+          status_code=status.HTTP_201_CREATED)
+async def complete_resumable_upload(upload_id: str, db: AsyncSession = Depends(get_async_db)):
+    """Завершает загрузку: файл переносится в хранилище и создается изображение"""
+    try:
+        saved, description = await finalize_upload(upload_id)
+    except UploadNotFound:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    except OffsetMismatch as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e),
+                            headers={"Upload-Offset": str(e.offset)})
+    logger.info(f"Загружен файл по частям: {saved.size} байт, sha256={saved.sha256}")
+    image_id = await save_image(db, saved, description)
+    return schemas.ResumableUploadResult(image_id=image_id, url=f"/get_image/{image_id}")
+
+
+@app.delete("/resumable_uploads/{upload_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_resumable_upload(upload_id: str):
+    """Отменяет загрузку и удаляет полученные байты"""
+    try:
+        await abort_upload(upload_id)
+    except UploadNotFound:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    except OffsetMismatch as e:  # Часть загрузки еще записывается
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e),
+                            headers={"Upload-Offset": str(e.offset)})
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 @app.post("/images/{image_id}/comments")
 async def add_comment(
     image_id: int,
     text: str = Form(...),  # Получаем текст комментария из формы
     user_id: int = Form(...),  # ID пользователя также передаётся через форму
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     ):
     """Асинхронная функция-обработчик для запросов к /images/{image_id}/comments.
     Возвращает словарь об успешной загрузке комментария."""
-    comment_data = schemas.CommentCreate(text=text, response_class=HTMLResponse)
-    # Передаем в функцию add_comment новый комментарий
-    comment = view.add_comment(db, comment_data, user_id=user_id, image_id=image_id)
+    if write_queue.enabled:  # Групповая фиксация: один COMMIT на пакет комментариев
+        await write_queue.run(view.insert_comment, text, user_id, image_id)
+    else:
+        comment_data = schemas.CommentCreate(text=text, response_class=HTMLResponse)
+        # Передаем в функцию add_comment новый комментарий
+        comment = await async_view.add_comment(db, comment_data, user_id=user_id, image_id=image_id)
     # Перенаправляем пользователя обратно на страницу с изображением
     return RedirectResponse(url=f"/get_image/{image_id}", status_code=303)
 
 '''Просмотр, конкретного изображения и его описания'''
 @app.get("/get_image/{image_id}", response_class=HTMLResponse)
-async def get_image(request: Request, image_id: int, db: Session = Depends(get_db)):
-    image = view.get_image_from_db(image_id, db)
+async def get_image(request: Request, image_id: int, db: AsyncSession = Depends(get_async_db)):
+    image = await async_view.get_image_from_db(image_id, db)
     if not image:
         raise HTTPException(status_code=404, detail="Image not found")
-    return templates.TemplateResponse("get_image.html", {"request": request, "image": image})
+    similar = await find_similar(db, image.phash, exclude_id=image.id) if image.phash else []
+    duplicate = await db.get(models.Image, image.duplicate_of_id) if image.duplicate_of_id else None
+    return templates.TemplateResponse("get_image.html", {"request": request, "image": image, "similar": similar,
+                                                         "duplicate": duplicate})
 
 '''Маршрут для входа в систему'''
 @app.get("/login", response_class=HTMLResponse)
@@ -170,13 +395,24 @@ async def login_form(request: Request):
     return templates.TemplateResponse("login.html", {"request": request})
 
 @app.post("/login", response_class=HTMLResponse)
-async def login(request: Request, username: str = Form(...), password: str = Form(...), db: Session = Depends(get_db)):
-    user = view.get_user(db, username)
-    if not user or not view.verify_password(password, user.hashed_password):
+async def login(request: Request, username: str = Form(...), password: str = Form(...),
+                db: AsyncSession = Depends(get_async_db)):
+    user = await async_view.get_user(db, username)
+    try:
+        # Проверка bcrypt выполняется в пуле потоков и не блокирует другие запросы
+        valid = bool(user) and await password_hasher.verify(password, user.hashed_password)
+    except HasherBusy as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e))
+    if not valid:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="неверное имя или пароль")
     request.session["user_id"] = user.id
     return RedirectResponse(url="/images", status_code=303)
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics_endpoint():
+    """Метрики приложения в текстовом формате Prometheus"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 '''Маршрут для выхода из системы'''
 @app.post("/logout")
 async def logout(request: Request):
@@ -0,0 +1,116 @@
+import argparse
+import base64
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from sqlalchemy import select, update
+
+from . import models
+from .database import engine
+from .storage import UPLOAD_DIR
+
+"""Метаданные загруженных изображений: размеры, формат, размер файла, LQIP-заглушка
+(крошечная WebP-копия в data URI, которая показывается размытым фоном, пока грузится оригинал)
+и перцептивный хеш для поиска похожих изображений (app/duplicates.py).
+Зная ширину и высоту, шаблоны резервируют место под изображение, и страница не сдвигается.
+Pillow импортируется внутри функции: без него загрузка работает, но метаданные не заполняются.
+
+Заполнение для уже загруженных файлов (запуск из каталога FastApiProject):
+    python -m app.metadata --workers 4"""
+
+PLACEHOLDER_SIZE = 16  # Длинная сторона заглушки, пикселей
+PLACEHOLDER_QUALITY = 40
+_TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}  # EXIF-поворот на 90 градусов: ширина и высота меняются местами
+
+
+def difference_hash(image) -> str:
+    """Функция возвращает 64-битный разностный хеш (dHash) в виде 16 шестнадцатеричных цифр:
+    каждый бит - сравнение яркости соседних пикселей копии 9x8 в оттенках серого.
+    Хеш почти не меняется при изменении размера, пережатии и небольшой цветокоррекции"""
+    from PIL import Image as PILImage
+
+    pixels = list(image.convert("L").resize((9, 8), PILImage.LANCZOS).getdata())
+    value = 0
+    for row in range(8):
+        for column in range(8):
+            left = pixels[row * 9 + column]
+            value = value << 1 | (left > pixels[row * 9 + column + 1])
+    return f"{value:016x}"
+
+
+def extract_metadata(path: str) -> Optional[dict]:
+    """Функция возвращает словарь со столбцами width, height, format, file_size, placeholder и phash
+    для файла изображения или None, если файл не читается как изображение"""
+    try:
+        from PIL import Image as PILImage, ImageOps
+    except ImportError:
+        return None
+    try:
+        with PILImage.open(path) as original:
+            image_format = original.format
+            width, height = original.size
+            if original.getexif().get(0x0112) in _TRANSPOSED_ORIENTATIONS:
+                width, height = height, width
+            # JPEG декодируется сразу в уменьшенном масштабе, без разбора полного изображения
+            original.draft("RGB", (PLACEHOLDER_SIZE * 2, PLACEHOLDER_SIZE * 2))
+            preview = ImageOps.exif_transpose(original)
+            phash = difference_hash(preview)
+            preview.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+            if preview.mode in ("RGBA", "LA", "PA") or "transparency" in preview.info:
+                rgba = preview.convert("RGBA")
+                preview = PILImage.new("RGB", rgba.size, (255, 255, 255))
+                preview.paste(rgba, mask=rgba.getchannel("A"))  # Прозрачные области - на белом фоне
+            else:
+                preview = preview.convert("RGB")
+            buffer = io.BytesIO()
+            preview.save(buffer, "WEBP", quality=PLACEHOLDER_QUALITY)
+    except (OSError, ValueError, PILImage.DecompressionBombError):
+        return None
+    return {
+        "width": width,
+        "height": height,
+        "format": image_format,
+        "file_size": os.path.getsize(path),
+        "placeholder": "data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode("ascii"),
+        "phash": phash,
+    }
+
+
+def backfill(workers: Optional[int] = None, batch_size: int = 500) -> int:
+    """Заполняет метаданные изображений, у которых их еще нет. Возвращает число обновленных строк.
+    Одинаковые файлы (адресуемое по содержимому хранилище) разбираются один раз"""
+    images = models.Image.__table__
+    updated, last_id = 0, 0
+    with ThreadPoolExecutor(workers) as executor:  # Pillow освобождает GIL при декодировании
+        while True:
+            with engine.connect() as connection:
+                rows = connection.execute(
+                    select(images.c.id, images.c.filename)
+                    .where(images.c.phash.is_(None), images.c.id > last_id)
+                    .order_by(images.c.id).limit(batch_size)).all()
+            if not rows:
+                return updated
+            last_id = rows[-1].id
+            filenames = sorted({row.filename for row in rows})
+            found = dict(zip(filenames, executor.map(
+                lambda name: extract_metadata(os.path.join(UPLOAD_DIR, name)), filenames)))
+            with engine.begin() as connection:
+                for row in rows:
+                    if found[row.filename] is not None:
+                        connection.execute(update(images).where(images.c.id == row.id)
+                                           .values(**found[row.filename]))
+                        updated += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Заполнение метаданных загруженных изображений")
+    parser.add_argument("--workers", type=int, default=None, help="Число потоков разбора файлов")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    print(f"Обновлено изображений: {backfill(args.workers, args.batch_size)}")
+
+
+if __name__ == "__main__":
+    main()
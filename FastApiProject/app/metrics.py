@@ -0,0 +1,172 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+"""Метрики запросов в текстовом формате Prometheus (маршрут /metrics).
+Для каждого маршрута собираются гистограммы задержки, числа SQL-запросов и времени в БД,
+а также счетчики ответов по статусам. SQL-запросы считаются через события SQLAlchemy
+и относятся к HTTP-запросу через contextvars, поэтому учитываются и в пуле потоков,
+и в асинхронной сессии. Запись метрики - несколько операций со словарем под блокировкой"""
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+UNMATCHED_ROUTE = "unmatched"  # Метка для путей без маршрута, чтобы не плодить ряды по каждому URL
+
+
+class QueryStats:
+    """Число SQL-запросов и суммарное время в БД в рамках одного HTTP-запроса"""
+    __slots__ = ("count", "duration")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+
+_current_queries: ContextVar = ContextVar("current_queries", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _query_started(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _query_finished(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_queries.get()
+    if stats is not None and context is not None:
+        stats.count += 1
+        stats.duration += time.perf_counter() - getattr(context, "_metrics_started", time.perf_counter())
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин"""
+    __slots__ = ("buckets", "counts", "total", "count")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Последняя корзина - +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def samples(self, name: str, labels: str):
+        """Строки гистограммы: накопленные корзины, сумма и количество"""
+        cumulative = 0
+        for bound, count in zip(self.buckets + ("+Inf",), self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f"{name}_sum{{{labels}}} {self.total}"
+        yield f"{name}_count{{{labels}}} {self.count}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """Хранилище метрик процесса"""
+
+    HISTOGRAMS = (
+        ("http_request_duration_seconds", "Время обработки запроса, секунды", LATENCY_BUCKETS),
+        ("http_request_db_queries", "Число SQL-запросов на один запрос", QUERY_BUCKETS),
+        ("http_request_db_seconds", "Время выполнения SQL-запросов на один запрос, секунды", LATENCY_BUCKETS),
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}  # (method, route) -> гистограммы в порядке HISTOGRAMS
+        self._statuses = {}  # (method, route, status) -> количество
+        self._collectors = []
+
+    def observe_request(self, method: str, route: str, status: int, duration: float,
+                        queries: int, db_time: float) -> None:
+        """Учитывает завершенный HTTP-запрос"""
+        key = (method, route)
+        with self._lock:
+            histograms = self._histograms.get(key)
+            if histograms is None:
+                histograms = self._histograms[key] = tuple(Histogram(buckets) for _, _, buckets in self.HISTOGRAMS)
+            for histogram, value in zip(histograms, (duration, queries, db_time)):
+                histogram.observe(value)
+            status_key = (method, route, status)
+            self._statuses[status_key] = self._statuses.get(status_key, 0) + 1
+
+    def add_collector(self, collector) -> None:
+        """Регистрирует функцию, возвращающую дополнительные метрики
+        в виде списка (имя, описание, тип, значение)"""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Возвращает все метрики в текстовом формате Prometheus"""
+        lines = []
+        with self._lock:
+            for index, (name, help_text, _) in enumerate(self.HISTOGRAMS):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+                for (method, route), histograms in self._histograms.items():
+                    labels = f'method="{_escape(method)}",route="{_escape(route)}"'
+                    lines.extend(histograms[index].samples(name, labels))
+            lines += ["# HELP http_requests_total Число обработанных запросов по статусам",
+                      "# TYPE http_requests_total counter"]
+            for (method, route, status), count in self._statuses.items():
+                lines.append(f'http_requests_total{{method="{_escape(method)}",route="{_escape(route)}",'
+                             f'status="{status}"}} {count}')
+        for collector in self._collectors:
+            for name, help_text, kind, value in collector():
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+class MetricsMiddleware:
+    """ASGI-middleware измеряет время обработки каждого HTTP-запроса,
+    число SQL-запросов и время в БД, и записывает их в реестр по шаблону маршрута"""
+
+    def __init__(self, app, registry: MetricsRegistry = metrics):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        stats = QueryStats()
+        token = _current_queries.set(stats)
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - started
+            _current_queries.reset(token)
+            self.registry.observe_request(scope["method"], route_label(scope), status_code,
+                                          duration, stats.count, stats.duration)
+
+
+def route_label(scope) -> str:
+    """Шаблон маршрута (например, /get_image/{image_id}) вместо конкретного пути.
+    Маршрутизатор Starlette дописывает найденный маршрут и префикс монтирования в scope"""
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if scope.get("root_path"):  # Смонтированное приложение, например /uploads
+        return scope["root_path"] + "/{path}"
+    return UNMATCHED_ROUTE
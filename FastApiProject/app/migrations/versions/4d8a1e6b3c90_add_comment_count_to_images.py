@@ -0,0 +1,29 @@
+"""add comment_count to images
+
+Revision ID: 4d8a1e6b3c90
+Revises: 9e2b6d4c7a15
+Create Date: 2025-02-18 10:42:17.305114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4d8a1e6b3c90'
+down_revision: Union[str, None] = '9e2b6d4c7a15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('images', sa.Column('comment_count', sa.Integer(), server_default='0', nullable=False))
+    # Начальные значения счетчиков по существующим комментариям
+    op.execute('UPDATE images SET comment_count = '
+               '(SELECT COUNT(*) FROM comments WHERE comments.image_id = images.id)')
+
+
+def downgrade() -> None:
+    op.drop_column('images', 'comment_count')
@@ -0,0 +1,51 @@
+"""add FTS5 search index for images and comments
+
+Revision ID: 7c4a2f9e1d3b
+Revises: 5b1f0c7a9d2e
+Create Date: 2025-02-14 17:40:12.118304
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c4a2f9e1d3b'
+down_revision: Union[str, None] = '5b1f0c7a9d2e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+COMMENTS_OF = "(SELECT group_concat(text, ' ') FROM comments WHERE image_id = {image_id})"
+
+
+def upgrade() -> None:
+    op.execute("CREATE VIRTUAL TABLE images_fts USING fts5("
+               "description, comments, tokenize = 'unicode61 remove_diacritics 2')")
+    op.execute("INSERT INTO images_fts (rowid, description, comments) "
+               "SELECT id, description, " + COMMENTS_OF.format(image_id='images.id') + " FROM images")
+    op.execute("CREATE TRIGGER images_fts_ai AFTER INSERT ON images BEGIN "
+               "INSERT INTO images_fts (rowid, description, comments) VALUES (new.id, new.description, ''); END")
+    op.execute("CREATE TRIGGER images_fts_au AFTER UPDATE OF description ON images BEGIN "
+               "UPDATE images_fts SET description = new.description WHERE rowid = new.id; END")
+    op.execute("CREATE TRIGGER images_fts_ad AFTER DELETE ON images BEGIN "
+               "DELETE FROM images_fts WHERE rowid = old.id; END")
+    op.execute("CREATE TRIGGER comments_fts_ai AFTER INSERT ON comments BEGIN "
+               "UPDATE images_fts SET comments = " + COMMENTS_OF.format(image_id='new.image_id') +
+               " WHERE rowid = new.image_id; END")
+    op.execute("CREATE TRIGGER comments_fts_au AFTER UPDATE OF text, image_id ON comments BEGIN "
+               "UPDATE images_fts SET comments = " + COMMENTS_OF.format(image_id='old.image_id') +
+               " WHERE rowid = old.image_id; "
+               "UPDATE images_fts SET comments = " + COMMENTS_OF.format(image_id='new.image_id') +
+               " WHERE rowid = new.image_id; END")
+    op.execute("CREATE TRIGGER comments_fts_ad AFTER DELETE ON comments BEGIN "
+               "UPDATE images_fts SET comments = " + COMMENTS_OF.format(image_id='old.image_id') +
+               " WHERE rowid = old.image_id; END")
+
+
+def downgrade() -> None:
+    for trigger in ('comments_fts_ad', 'comments_fts_au', 'comments_fts_ai',
+                    'images_fts_ad', 'images_fts_au', 'images_fts_ai'):
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE IF EXISTS images_fts")
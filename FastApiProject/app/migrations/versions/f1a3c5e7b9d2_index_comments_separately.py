@@ -0,0 +1,76 @@
+"""index comments in their own FTS5 table
+
+Revision ID: f1a3c5e7b9d2
+Revises: c6d0a4e8f2b5
+Create Date: 2025-02-26 10:14:37.602815
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1a3c5e7b9d2'
+down_revision: Union[str, None] = 'c6d0a4e8f2b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TRIGGERS = ('comments_fts_ad', 'comments_fts_au', 'comments_fts_ai',
+            'images_fts_ad', 'images_fts_au', 'images_fts_ai')
+COMMENTS_OF = "(SELECT group_concat(text, ' ') FROM comments WHERE image_id = {image_id})"
+
+
+def _drop_index() -> None:
+    # IF EXISTS: ensure_search_index при запуске приложения мог уже перестроить индекс
+    for trigger in TRIGGERS:
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE IF EXISTS comments_fts")
+    op.execute("DROP TABLE IF EXISTS images_fts")
+
+
+def _create_image_triggers(columns: str, values: str) -> None:
+    op.execute("CREATE TRIGGER images_fts_ai AFTER INSERT ON images BEGIN "
+               f"INSERT INTO images_fts ({columns}) VALUES ({values}); END")
+    op.execute("CREATE TRIGGER images_fts_au AFTER UPDATE OF description ON images BEGIN "
+               "UPDATE images_fts SET description = new.description WHERE rowid = new.id; END")
+    op.execute("CREATE TRIGGER images_fts_ad AFTER DELETE ON images BEGIN "
+               "DELETE FROM images_fts WHERE rowid = old.id; END")
+
+
+def upgrade() -> None:
+    _drop_index()
+    op.execute("CREATE VIRTUAL TABLE images_fts USING fts5("
+               "description, tokenize = 'unicode61 remove_diacritics 2')")
+    op.execute("CREATE VIRTUAL TABLE comments_fts USING fts5("
+               "text, image_id UNINDEXED, tokenize = 'unicode61 remove_diacritics 2')")
+    op.execute("INSERT INTO images_fts (rowid, description) SELECT id, description FROM images")
+    op.execute("INSERT INTO comments_fts (rowid, text, image_id) SELECT id, text, image_id FROM comments")
+    _create_image_triggers("rowid, description", "new.id, new.description")
+    op.execute("CREATE TRIGGER comments_fts_ai AFTER INSERT ON comments BEGIN "
+               "INSERT INTO comments_fts (rowid, text, image_id) VALUES (new.id, new.text, new.image_id); END")
+    op.execute("CREATE TRIGGER comments_fts_au AFTER UPDATE OF text, image_id ON comments BEGIN "
+               "UPDATE comments_fts SET text = new.text, image_id = new.image_id WHERE rowid = new.id; END")
+    op.execute("CREATE TRIGGER comments_fts_ad AFTER DELETE ON comments BEGIN "
+               "DELETE FROM comments_fts WHERE rowid = old.id; END")
+
+
+def downgrade() -> None:
+    _drop_index()
+    op.execute("CREATE VIRTUAL TABLE images_fts USING fts5("
+               "description, comments, tokenize = 'unicode61 remove_diacritics 2')")
+    op.execute("INSERT INTO images_fts (rowid, description, comments) "
+               "SELECT id, description, " + COMMENTS_OF.format(image_id='images.id') + " FROM images")
+    _create_image_triggers("rowid, description, comments", "new.id, new.description, ''")
+    op.execute("CREATE TRIGGER comments_fts_ai AFTER INSERT ON comments BEGIN "
+               "UPDATE images_fts SET comments = " + COMMENTS_OF.format(image_id='new.image_id') +
+               " WHERE rowid = new.image_id; END")
+    op.execute("CREATE TRIGGER comments_fts_au AFTER UPDATE OF text, image_id ON comments BEGIN "
+               "UPDATE images_fts SET comments = " + COMMENTS_OF.format(image_id='old.image_id') +
+               " WHERE rowid = old.image_id; "
+               "UPDATE images_fts SET comments = " + COMMENTS_OF.format(image_id='new.image_id') +
+               " WHERE rowid = new.image_id; END")
+    op.execute("CREATE TRIGGER comments_fts_ad AFTER DELETE ON comments BEGIN "
+               "UPDATE images_fts SET comments = " + COMMENTS_OF.format(image_id='old.image_id') +
+               " WHERE rowid = old.image_id; END")
@@ -1,4 +1,6 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey, Text
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Index, Text, event, update
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
@@ -29,8 +31,21 @@ class Image(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id'))
-    filename = Column(String, nullable=False)
+    filename = Column(String, nullable=False)  # Путь файла относительно каталога uploads
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256 содержимого файла
     description = Column(String, nullable=True)
+    # Метаданные файла (app/metadata.py); пусто, если файл не удалось разобрать как изображение
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    format = Column(String(10), nullable=True)
+    file_size = Column(Integer, nullable=True)  # Байт
+    placeholder = Column(Text, nullable=True)  # LQIP-заглушка в виде data URI
+    phash = Column(String(16), nullable=True)  # Перцептивный хеш для поиска похожих (app/duplicates.py)
+    # Ранее загруженная копия изображения, найденная по хешу фоновой задачей; без внешнего ключа,
+    # чтобы удаление оригинала не затрагивало копии
+    duplicate_of_id = Column(Integer, nullable=True)
+    # Число комментариев; поддерживается при добавлении и удалении комментариев (см. ниже)
+    comment_count = Column(Integer, nullable=False, default=0, server_default="0")
     user = relationship("CustomUser", back_populates="images")
 
 # Комментарии к фото
@@ -38,7 +53,7 @@ class Comment(Base):
     __tablename__ = 'comments' # Указание имени таблицы в базе данных.
 
     id = Column(Integer, primary_key=True, index=True)
-    image_id = Column(Integer, ForeignKey('images.id'))
+    image_id = Column(Integer, ForeignKey('images.id'), index=True)
     user_id = Column(Integer, ForeignKey('users.id'))
     text = Column(Text, nullable=False)
     user = relationship("CustomUser", back_populates="comments")
@@ -49,3 +64,42 @@ class Comment(Base):
 CustomUser.images = relationship("Image", back_populates="user")
 CustomUser.comments = relationship("Comment", back_populates="user")
 Image.comments = relationship("Comment", back_populates="image")
+
+
+# Задача фоновой обработки (app/jobs.py); выполненные задачи удаляются, неудачные остаются со статусом failed
+class Job(Base):
+    __tablename__ = 'jobs'
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(50), nullable=False)  # Имя обработчика
+    payload = Column(Text, nullable=False, default="{}")  # Аргументы обработчика в JSON
+    status = Column(String(10), nullable=False, default="queued")  # queued, running или failed
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    run_after = Column(DateTime, nullable=False, default=datetime.utcnow)  # Не раньше этого времени (UTC)
+    locked_at = Column(DateTime, nullable=True)  # Когда задачу взял обработчик
+    locked_by = Column(String(100), nullable=True)
+    last_error = Column(Text, nullable=True)
+
+    __table_args__ = (Index("ix_jobs_status_run_after", "status", "run_after"),)
+
+
+"""Счетчик комментариев изображения изменяется в той же транзакции, что и сам комментарий,
+поэтому галерея выводит число комментариев без подсчета. Массовые вставки в обход ORM
+(app/seed.py) и возможное расхождение исправляет app/comment_counts.py"""
+
+
+def _change_comment_count(connection, image_id, delta: int) -> None:
+    if image_id is not None:
+        connection.execute(update(Image.__table__).where(Image.__table__.c.id == image_id)
+                           .values(comment_count=Image.__table__.c.comment_count + delta))
+
+
+@event.listens_for(Comment, "after_insert")
+def _comment_inserted(mapper, connection, target):
+    _change_comment_count(connection, target.image_id, 1)
+
+
+@event.listens_for(Comment, "after_delete")
+def _comment_deleted(mapper, connection, target):
+    _change_comment_count(connection, target.image_id, -1)
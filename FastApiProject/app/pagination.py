@@ -0,0 +1,87 @@
+import base64
+from typing import Any, List, NamedTuple, Optional
+
+"""Модуль реализует курсорную (keyset) пагинацию.
+Вместо offset используется условие по возрастающему ключу (id),
+поэтому стоимость получения любой страницы одинакова и не зависит от ее номера"""
+
+CURSOR_PREFIX = "id:"
+
+
+class Page(NamedTuple):
+    """Страница выборки: элементы и непрозрачные курсоры соседних страниц"""
+    items: List[Any]
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+
+def encode_cursor(value: int) -> str:
+    """Функция кодирует значение ключа в непрозрачный токен для URL"""
+    raw = f"{CURSOR_PREFIX}{value}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> int:
+    """Функция восстанавливает значение ключа из токена.
+    Возбуждает ValueError, если токен поврежден"""
+    padded = token + "=" * (-len(token) % 4)
+    try:
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Некорректный курсор")
+    if not raw.startswith(CURSOR_PREFIX):
+        raise ValueError("Некорректный курсор")
+    return int(raw[len(CURSOR_PREFIX):])
+
+
+def keyset_paginate(query, column, after: Optional[str] = None,
+                    before: Optional[str] = None, limit: int = 100) -> Page:
+    """Функция возвращает страницу запроса query, упорядоченного по column.
+    after - курсор, после которого начинается страница (движение вперед),
+    before - курсор, перед которым заканчивается страница (движение назад).
+    Запрашивается limit + 1 строка, чтобы без COUNT узнать, есть ли следующая страница"""
+    rows = keyset_query(query, column, after, before, limit).all()
+    return make_page(rows, column, after, before, limit)
+
+
+def keyset_query(query, column, after: Optional[str] = None,
+                 before: Optional[str] = None, limit: int = 100):
+    """Функция добавляет к запросу условие, сортировку и лимит страницы.
+    Подходит как для Query синхронной сессии, так и для select() асинхронной"""
+    if after is not None and before is not None:
+        raise ValueError("Нельзя одновременно указывать after и before")
+    if before is not None:
+        return query.filter(column < decode_cursor(before)).order_by(column.desc()).limit(limit + 1)
+    if after is not None:
+        query = query.filter(column > decode_cursor(after))
+    return query.order_by(column.asc()).limit(limit + 1)
+
+
+def make_page(rows: List[Any], column, after: Optional[str] = None,
+              before: Optional[str] = None, limit: int = 100) -> Page:
+    """Функция строит страницу из строк, полученных по запросу keyset_query"""
+    if before is not None:
+        has_more = len(rows) > limit
+        items = list(reversed(rows[:limit]))
+        if not items:
+            return Page(items)
+        return Page(
+            items,
+            next_cursor=encode_cursor(_key(items[-1], column)),
+            prev_cursor=encode_cursor(_key(items[0], column)) if has_more else None,
+        )
+
+    has_more = len(rows) > limit
+    items = rows[:limit]
+    if not items:
+        return Page(items)
+    return Page(
+        items,
+        next_cursor=encode_cursor(_key(items[-1], column)) if has_more else None,
+        prev_cursor=encode_cursor(_key(items[0], column)) if after is not None else None,
+    )
+
+
+def _key(item, column) -> int:
+    """Значение ключа пагинации у объекта модели"""
+    return getattr(item, column.key)
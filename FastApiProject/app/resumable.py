@@ -0,0 +1,216 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+import uuid
+import weakref
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, BinaryIO, NamedTuple, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from .storage import TEMP_DIR, commit_file
+from .uploads import CHUNK_SIZE, SavedUpload, UploadTooLarge
+
+"""Возобновляемая загрузка больших файлов по частям.
+Клиент создает загрузку с объявленным размером, затем отправляет части запросами PATCH
+с заголовком Upload-Offset (смещение первого байта части) и завершает загрузку.
+Состояние хранится во временном каталоге: <id>.json - имя файла, размер и описание,
+<id>.part - уже полученные байты. Смещение загрузки - размер файла .part, поэтому оно
+переживает обрыв соединения и перезапуск сервера: после обрыва клиент запрашивает смещение
+и продолжает с него. Байты, полученные до обрыва, сохраняются.
+Часть записывается на диск по мере поступления, память на загрузку не превышает одного блока.
+Запись части, завершение и отмена выполняются под исключительной блокировкой ОС (flock) файла .part,
+поэтому запросы одной загрузки не пересекаются и тогда, когда их обслуживают разные процессы сервера;
+запрос, пришедший во время записи другой части, получает 409. Часть пишется с заявленного смещения
+(seek), а не дописывается в конец. Незавершенные загрузки удаляются через RESUMABLE_UPLOAD_TTL секунд"""
+
+try:
+    import fcntl
+except ImportError:  # Windows: остается только блокировка внутри процесса
+    fcntl = None
+
+RESUMABLE_DIR = os.path.join(TEMP_DIR, "resumable")
+MAX_RESUMABLE_SIZE = int(os.environ.get("MAX_RESUMABLE_UPLOAD_SIZE", 200 * 1024 * 1024))  # Размер файла (200 МБ)
+MAX_CHUNK_SIZE = int(os.environ.get("MAX_RESUMABLE_CHUNK_SIZE", 8 * 1024 * 1024))  # Размер одной части (8 МБ)
+RESUMABLE_UPLOAD_TTL = int(os.environ.get("RESUMABLE_UPLOAD_TTL", 24 * 3600))  # Время жизни загрузки, секунды
+_UPLOAD_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+# Блокировки загрузок процесса: запросы одной загрузки в процессе ждут друг друга, а не получают 409
+_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+
+
+class UploadNotFound(LookupError):
+    """Загрузки нет: неверный id, загрузка завершена, отменена или удалена по сроку"""
+
+
+class OffsetMismatch(ValueError):
+    """Смещение части не совпадает со смещением загрузки (или загрузка не получена целиком)"""
+
+    def __init__(self, offset: int, message: str = "Смещение части не совпадает со смещением загрузки"):
+        super().__init__(message)
+        self.offset = offset
+
+
+class UploadBusy(OffsetMismatch):
+    """Загрузку в этот момент изменяет другой запрос (возможно, в другом процессе)"""
+
+    def __init__(self, offset: int):
+        super().__init__(offset, "Часть этой загрузки уже записывается")
+
+
+class ResumableUpload(NamedTuple):
+    """Состояние загрузки: id, исходное имя файла, объявленный размер, описание и полученные байты"""
+    id: str
+    filename: str
+    size: int
+    description: Optional[str]
+    offset: int
+
+
+def _paths(upload_id: str):
+    if not _UPLOAD_ID_RE.match(upload_id):
+        raise UploadNotFound(upload_id)
+    base = os.path.join(RESUMABLE_DIR, upload_id)
+    return base + ".json", base + ".part"
+
+
+def _lock(upload_id: str) -> asyncio.Lock:
+    lock = _locks.get(upload_id)
+    if lock is None:
+        lock = _locks[upload_id] = asyncio.Lock()
+    return lock
+
+
+def _open_locked(upload_id: str) -> BinaryIO:
+    """Открывает файл частей на чтение и запись и берет исключительную блокировку flock без ожидания"""
+    info_path, part_path = _paths(upload_id)
+    try:
+        part = open(part_path, "r+b")
+    except FileNotFoundError:
+        raise UploadNotFound(upload_id)
+    try:
+        if fcntl is not None:
+            try:
+                fcntl.flock(part.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise UploadBusy(os.fstat(part.fileno()).st_size)
+        # Между открытием и блокировкой загрузку могли завершить (файл перенесен в хранилище) или отменить
+        try:
+            current = os.stat(part_path).st_ino
+        except FileNotFoundError:
+            current = None
+        if current != os.fstat(part.fileno()).st_ino or not os.path.exists(info_path):
+            raise UploadNotFound(upload_id)
+    except BaseException:
+        part.close()
+        raise
+    return part
+
+
+@asynccontextmanager
+async def _locked_part(upload_id: str) -> AsyncIterator[BinaryIO]:
+    """Удерживает блокировки загрузки (процесса и ОС) на время блока и отдает открытый файл частей.
+    Закрытие файла снимает блокировку ОС"""
+    async with _lock(upload_id):
+        part = await run_in_threadpool(_open_locked, upload_id)
+        try:
+            yield part
+        finally:
+            await run_in_threadpool(part.close)
+
+
+def create_upload(filename: str, size: int, description: Optional[str] = None) -> ResumableUpload:
+    """Функция создает загрузку: пустой файл частей и описание загрузки"""
+    if size > MAX_RESUMABLE_SIZE:
+        raise UploadTooLarge(MAX_RESUMABLE_SIZE)
+    os.makedirs(RESUMABLE_DIR, exist_ok=True)
+    purge_expired()
+    upload = ResumableUpload(uuid.uuid4().hex, filename, size, description, 0)
+    info_path, part_path = _paths(upload.id)
+    open(part_path, "wb").close()
+    temp_path = info_path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as out:
+        json.dump({"filename": filename, "size": size, "description": description}, out)
+    os.replace(temp_path, info_path)  # Описание появляется целиком или не появляется
+    return upload
+
+
+def get_upload(upload_id: str) -> ResumableUpload:
+    """Функция возвращает состояние загрузки; смещение - текущий размер файла частей"""
+    info_path, part_path = _paths(upload_id)
+    try:
+        with open(info_path, encoding="utf-8") as info_file:
+            info = json.load(info_file)
+        offset = os.path.getsize(part_path)
+    except FileNotFoundError:
+        raise UploadNotFound(upload_id)
+    return ResumableUpload(upload_id, info["filename"], info["size"], info["description"], offset)
+
+
+async def write_chunk(upload_id: str, offset: int, body: AsyncIterator[bytes]) -> ResumableUpload:
+    """Функция записывает часть, поступающую потоком body, начиная со смещения offset.
+    Если соединение оборвалось, полученные байты остаются; если часть длиннее MAX_CHUNK_SIZE
+    или выходит за объявленный размер, она отбрасывается целиком. Возвращает новое состояние"""
+    async with _locked_part(upload_id) as part:
+        upload = await run_in_threadpool(get_upload, upload_id)
+        if offset != upload.offset:
+            raise OffsetMismatch(upload.offset)
+        limit = min(MAX_CHUNK_SIZE, upload.size - upload.offset)
+        await run_in_threadpool(part.seek, offset)
+        written = 0
+        async for data in body:
+            written += len(data)
+            if written > limit:
+                await run_in_threadpool(part.truncate, offset)
+                raise UploadTooLarge(limit)
+            await run_in_threadpool(part.write, data)
+        return upload._replace(offset=offset + written)
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as data:
+        for block in iter(lambda: data.read(CHUNK_SIZE * 16), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+async def finalize_upload(upload_id: str) -> Tuple[SavedUpload, Optional[str]]:
+    """Функция проверяет, что файл получен целиком, переносит его в хранилище по хешу содержимого
+    и удаляет состояние загрузки. Возвращает пару (SavedUpload, описание)"""
+    async with _locked_part(upload_id):
+        upload = await run_in_threadpool(get_upload, upload_id)
+        if upload.offset != upload.size:
+            raise OffsetMismatch(upload.offset, "Файл получен не полностью")
+        info_path, part_path = _paths(upload_id)
+        sha256 = await run_in_threadpool(_hash_file, part_path)
+        name = await commit_file(part_path, sha256, upload.filename)
+        await run_in_threadpool(os.remove, info_path)
+        return SavedUpload(name, upload.size, sha256), upload.description
+
+
+async def abort_upload(upload_id: str) -> None:
+    """Функция отменяет загрузку и удаляет полученные байты"""
+    async with _locked_part(upload_id):  # UploadNotFound для неизвестной загрузки
+        await run_in_threadpool(_remove, upload_id)
+
+
+def _remove(upload_id: str) -> None:
+    for path in _paths(upload_id):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def purge_expired(ttl: int = RESUMABLE_UPLOAD_TTL) -> int:
+    """Функция удаляет загрузки, которые не менялись дольше ttl секунд. Возвращает их число"""
+    deadline = time.time() - ttl
+    removed = 0
+    for entry in os.scandir(RESUMABLE_DIR):
+        upload_id, extension = os.path.splitext(entry.name)
+        if extension == ".part" and entry.stat().st_mtime < deadline:
+            _remove(upload_id)
+            removed += 1
+    return removed
@@ -1,7 +1,6 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 from datetime import date
-from typing import Optional
-from typing import List
+from typing import Generic, List, Optional, TypeVar
 from fastapi import HTTPException, status
 
 """Этот модуль играет ключевую роль в управлении и валидации данных.
@@ -48,11 +47,23 @@ class ImageCreate(ImageBase):
     pass
 
 
-class Image(ImageBase):
+class ImageSummary(ImageBase):
+    """Модель изображения без комментариев (элемент списка изображений в API);
+    комментарии отдаются постранично отдельным запросом"""
+    id: int
+    user_id: Optional[int] = None  # Изображения, загруженные без входа, не связаны с пользователем
+    comment_count: int = 0
+    width: Optional[int] = None
+    height: Optional[int] = None
+
+    class Config:
+        """Настройка поведения Pydantic при взаимодействии с моделями"""
+        from_attributes = True
+
+
+class Image(ImageSummary):
     """Модель для представления изображений.
     Список комментариев к изображению, связан с моделью Comment"""
-    id: int
-    user_id: int
     comments: List["Comment"] = []
 
     class Config:
@@ -71,8 +82,57 @@ class CommentCreate(CommentBase):
 
 class Comment(CommentBase):
     id: int
-    photo_id: int
+    image_id: int
     user_id: int
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+T = TypeVar("T")
+
+
+class CursorPage(BaseModel, Generic[T]):
+    """Страница списка JSON API: элементы и курсоры соседних страниц (app/pagination.py)"""
+    items: List[T]
+    next_cursor: Optional[str] = None
+    prev_cursor: Optional[str] = None
+
+
+class ResumableUploadCreate(BaseModel):
+    """Модель для создания возобновляемой загрузки: имя и размер файла в байтах, описание"""
+    filename: str
+    size: int = Field(gt=0)
+    description: Optional[str] = None
+
+
+class ResumableUpload(BaseModel):
+    """Состояние возобновляемой загрузки: offset - сколько байт уже получено,
+    max_chunk_size - наибольший допустимый размер одной части"""
+    id: str
+    filename: str
+    size: int
+    offset: int
+    max_chunk_size: int
+
+
+class ResumableUploadResult(BaseModel):
+    """Результат завершения загрузки: id созданного изображения и адрес его страницы"""
+    image_id: int
+    url: str
+
+
+class BulkUploadItem(BaseModel):
+    """Результат массовой загрузки для одного файла (для файла из архива filename - архив/путь):
+    id и адрес созданного изображения или ошибка"""
+    filename: str
+    image_id: Optional[int] = None
+    url: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BulkUploadResult(BaseModel):
+    """Результат массовой загрузки: число созданных изображений, пропущенных файлов и результаты по файлам"""
+    created: int
+    failed: int
+    items: List[BulkUploadItem]
\ No newline at end of file
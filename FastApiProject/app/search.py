@@ -0,0 +1,121 @@
+import re
+from contextlib import contextmanager
+from typing import List
+
+from sqlalchemy import select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from . import models
+
+"""Полнотекстовый поиск изображений по описанию и комментариям.
+Используются виртуальные таблицы SQLite FTS5 images_fts (описания) и comments_fts (по строке
+на комментарий, id изображения хранится в неиндексируемом столбце), которые поддерживают
+в актуальном состоянии триггеры на таблицах images и comments. Новый комментарий добавляет
+в индекс одну строку, а не перестраивает документ изображения со всеми комментариями.
+При поиске совпадения из обеих таблиц объединяются по изображению; все слова запроса
+должны встретиться в описании или в одном комментарии.
+Для баз, созданных через create_all, индекс создает ensure_search_index при запуске,
+для баз под управлением Alembic - миграции 7c4a2f9e1d3b и f1a3c5e7b9d2"""
+
+SEARCH_LIMIT = 50
+MAX_TERMS = 10
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+SEARCH_INDEX_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS images_fts USING fts5("
+    "description, tokenize = 'unicode61 remove_diacritics 2')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS comments_fts USING fts5("
+    "text, image_id UNINDEXED, tokenize = 'unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS images_fts_ai AFTER INSERT ON images BEGIN "
+    "INSERT INTO images_fts (rowid, description) VALUES (new.id, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS images_fts_au AFTER UPDATE OF description ON images BEGIN "
+    "UPDATE images_fts SET description = new.description WHERE rowid = new.id; END",
+    "CREATE TRIGGER IF NOT EXISTS images_fts_ad AFTER DELETE ON images BEGIN "
+    "DELETE FROM images_fts WHERE rowid = old.id; END",
+    "CREATE TRIGGER IF NOT EXISTS comments_fts_ai AFTER INSERT ON comments BEGIN "
+    "INSERT INTO comments_fts (rowid, text, image_id) VALUES (new.id, new.text, new.image_id); END",
+    "CREATE TRIGGER IF NOT EXISTS comments_fts_au AFTER UPDATE OF text, image_id ON comments BEGIN "
+    "UPDATE comments_fts SET text = new.text, image_id = new.image_id WHERE rowid = new.id; END",
+    "CREATE TRIGGER IF NOT EXISTS comments_fts_ad AFTER DELETE ON comments BEGIN "
+    "DELETE FROM comments_fts WHERE rowid = old.id; END",
+]
+
+# Заполнение индекса уже существующими записями
+SEARCH_INDEX_BACKFILL = (
+    "INSERT INTO images_fts (rowid, description) SELECT id, description FROM images",
+    "INSERT INTO comments_fts (rowid, text, image_id) SELECT id, text, image_id FROM comments",
+)
+
+# Индекс прежнего вида: комментарии изображения в столбце images_fts.comments
+_LEGACY_INDEX_DROP = tuple(f"DROP TRIGGER IF EXISTS {name}" for name in (
+    "comments_fts_ai", "comments_fts_au", "comments_fts_ad", "images_fts_ai", "images_fts_au", "images_fts_ad",
+)) + ("DROP TABLE IF EXISTS images_fts",)
+
+_TRIGGERS_SQL = text("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' "
+                     "AND (sql LIKE '%images_fts%' OR sql LIKE '%comments_fts%')")
+
+# Изображения с совпадением в описании или хотя бы в одном комментарии; оценки bm25 отрицательные,
+# поэтому сумма выше у изображений, где совпадений больше. Описание важнее комментария
+_SEARCH_SQL = text(
+    "SELECT image_id FROM ("
+    "SELECT rowid AS image_id, bm25(images_fts, 5.0) AS rank FROM images_fts WHERE images_fts MATCH :match "
+    "UNION ALL "
+    "SELECT image_id, bm25(comments_fts) AS rank FROM comments_fts WHERE comments_fts MATCH :match"
+    ") GROUP BY image_id ORDER BY sum(rank) LIMIT :limit")
+
+
+def ensure_search_index(engine: Engine) -> None:
+    """Создает поисковые индексы и триггеры, если их еще нет, и заполняет индексы.
+    Индекс прежнего вида пересоздается"""
+    with engine.begin() as connection:
+        exists = connection.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'comments_fts'")).first()
+        if not exists:
+            for statement in _LEGACY_INDEX_DROP:
+                connection.exec_driver_sql(statement)
+        for statement in SEARCH_INDEX_DDL:
+            connection.exec_driver_sql(statement)
+        if not exists:
+            for statement in SEARCH_INDEX_BACKFILL:
+                connection.exec_driver_sql(statement)
+
+
+@contextmanager
+def search_index_suspended(connection: Connection):
+    """Для массовой вставки: на время блока триггеры индекса удаляются, после него индекс
+    перестраивается одним запросом и триггеры создаются заново. Все выполняется в текущей
+    транзакции соединения, поэтому при ошибке откат возвращает триггеры на место"""
+    triggers = connection.execute(_TRIGGERS_SQL).all()
+    for name, _ in triggers:
+        connection.exec_driver_sql(f"DROP TRIGGER {name}")
+    yield
+    if triggers:  # Без триггеров индекса нет
+        connection.exec_driver_sql("DELETE FROM images_fts")
+        connection.exec_driver_sql("DELETE FROM comments_fts")
+        for statement in SEARCH_INDEX_BACKFILL:
+            connection.exec_driver_sql(statement)
+        for _, sql in triggers:
+            connection.exec_driver_sql(sql)
+
+
+def build_match_query(query: str) -> str:
+    """Преобразует введенную строку в безопасный запрос FTS5:
+    каждое слово берется в кавычки и ищется как префикс, слова объединяются через AND"""
+    terms = _TERM_RE.findall(query)[:MAX_TERMS]
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+async def search_images(db: AsyncSession, query: str, limit: int = SEARCH_LIMIT) -> List[models.Image]:
+    """Возвращает изображения, подходящие под запрос, в порядке релевантности"""
+    match = build_match_query(query)
+    if not match:
+        return []
+    ids = (await db.execute(_SEARCH_SQL, {"match": match, "limit": limit})).scalars().all()
+    if not ids:
+        return []
+    result = await db.execute(select(models.Image).where(models.Image.id.in_(ids))
+                              .options(selectinload(models.Image.comments)))
+    images = {image.id: image for image in result.scalars()}
+    return [images[image_id] for image_id in ids if image_id in images]
@@ -0,0 +1,150 @@
+import argparse
+import hashlib
+import os
+import random
+import struct
+import zlib
+from datetime import date, timedelta
+from itertools import islice
+
+from sqlalchemy import func, insert, select
+
+from . import models
+from .comment_counts import reconcile_comment_counts
+from .database import engine
+from .metadata import extract_metadata
+from .search import ensure_search_index, search_index_suspended
+from .storage import UPLOAD_DIR, blob_name
+from .view import pwd_context
+
+"""Скрипт заполняет базу синтетическими пользователями, изображениями и комментариями
+для проверки под нагрузкой. Данные детерминированы (--seed), строки вставляются пакетами
+(executemany) в одной транзакции, хеш пароля вычисляется один раз для всех пользователей,
+изображения ссылаются на небольшой набор файлов-заглушек в хранилище, а полнотекстовый
+индекс и счетчики комментариев строятся один раз после вставки.
+
+Запуск из каталога FastApiProject:
+    python -m app.seed --users 10000 --images 100000 --comments 1000000"""
+
+WORDS = ("закат", "море", "горы", "город", "лес", "река", "кот", "собака", "поезд", "мост",
+         "снег", "небо", "цветы", "портрет", "улица", "ночь", "облака", "озеро", "корабль", "поле")
+
+
+def batched(iterable, size: int):
+    """Разбивает итератор на списки по size элементов"""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def phrase(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def placeholder_png(rng: random.Random, width: int = 640, height: int = 480, columns: int = 16,
+                    rows: int = 12) -> bytes:
+    """PNG-изображение из columns x rows прямоугольников случайных цветов (без сторонних библиотек).
+    Перцептивные хеши таких заглушек различаются; у однотонных изображений хеш нулевой,
+    и все изображения базы оказались бы копиями друг друга"""
+    bounds = [column * width // columns for column in range(columns + 1)]
+    lines = []
+    for row in range(rows):
+        line = b"\x00" + b"".join(bytes(rng.randrange(256) for _ in range(3)) * (right - left)
+                                  for left, right in zip(bounds, bounds[1:]))
+        lines.append(line * ((row + 1) * height // rows - row * height // rows))
+
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header)
+            + chunk(b"IDAT", zlib.compress(b"".join(lines))) + chunk(b"IEND", b""))
+
+
+def make_placeholders(count: int, rng: random.Random):
+    """Сохраняет файлы-заглушки в хранилище под именами-хешами.
+    Возвращает список пар (путь относительно UPLOAD_DIR, хеш содержимого)"""
+    placeholders = []
+    for _ in range(max(1, count)):
+        data = placeholder_png(rng)
+        content_hash = hashlib.sha256(data).hexdigest()
+        name = blob_name(content_hash, "placeholder.png")
+        path = os.path.join(UPLOAD_DIR, name)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(data)
+        placeholders.append((name, content_hash))
+    return placeholders
+
+
+def seed(users: int, images: int, comments: int, placeholders: int = 16, password: str = "seed-password",
+         seed_value: int = 0, batch_size: int = 5000) -> None:
+    """Добавляет в базу users пользователей, images изображений и comments комментариев.
+    При users=0 авторами изображений и комментариев становятся уже существующие пользователи"""
+    models.Base.metadata.create_all(bind=engine)
+    authors = []
+    if not users and images:
+        with engine.connect() as connection:
+            authors = connection.scalars(select(models.CustomUser.id)).all()
+        if not authors:
+            raise ValueError("В базе нет пользователей - авторов изображений, укажите --users больше 0")
+    rng = random.Random(seed_value)
+    files = make_placeholders(placeholders, rng)
+    # Метаданные одинаковы для всех изображений с одним файлом
+    metadata = {name: extract_metadata(os.path.join(UPLOAD_DIR, name)) or {} for name, _ in files}
+    hashed_password = pwd_context.hash(password)  # Один хеш на всех пользователей
+
+    ensure_search_index(engine)
+    with engine.begin() as connection:
+        connection.exec_driver_sql("PRAGMA synchronous = OFF")  # Только для этого соединения
+        with search_index_suspended(connection):
+            first_user = (connection.scalar(select(func.max(models.CustomUser.id))) or 0) + 1
+            user_ids = range(first_user, first_user + users)
+            rows = ({"id": user_id, "username": f"seed{user_id}", "email": f"seed{user_id}@example.com",
+                     "first_name": rng.choice(WORDS).title(), "last_name": rng.choice(WORDS).title(),
+                     "birth_date": (date(1970, 1, 1) + timedelta(days=rng.randrange(15000))).isoformat(),
+                     "hashed_password": hashed_password}
+                    for user_id in user_ids)
+            for batch in batched(rows, batch_size):
+                connection.execute(insert(models.CustomUser), batch)
+            print(f"Пользователей: {users}")
+            authors = user_ids or authors
+
+            first_image = (connection.scalar(select(func.max(models.Image.id))) or 0) + 1
+            image_ids = range(first_image, first_image + images)
+            rows = ({"id": image_id, "user_id": rng.choice(authors), "filename": name,
+                     "content_hash": content_hash, "description": phrase(rng, 8), **metadata[name]}
+                    for image_id in image_ids for name, content_hash in [rng.choice(files)])
+            for batch in batched(rows, batch_size):
+                connection.execute(insert(models.Image), batch)
+            print(f"Изображений: {images}")
+
+            if image_ids:
+                rows = ({"image_id": rng.choice(image_ids), "user_id": rng.choice(authors), "text": phrase(rng, 6)}
+                        for _ in range(comments))
+                for batch in batched(rows, batch_size):
+                    connection.execute(insert(models.Comment), batch)
+                print(f"Комментариев: {comments}")
+                reconcile_comment_counts(connection)  # Вставка в обход ORM не обновляет счетчики
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Синтетические данные для нагрузочного тестирования")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--images", type=int, default=10000)
+    parser.add_argument("--comments", type=int, default=50000)
+    parser.add_argument("--placeholders", type=int, default=16, help="Число различных файлов-заглушек")
+    parser.add_argument("--password", default="seed-password", help="Пароль всех созданных пользователей")
+    parser.add_argument("--seed", type=int, default=0, help="Начальное значение генератора")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+    try:
+        seed(args.users, args.images, args.comments, args.placeholders, args.password, args.seed, args.batch_size)
+    except ValueError as error:
+        parser.error(str(error))
+    print("Данные созданы")
+
+
+if __name__ == "__main__":
+    main()
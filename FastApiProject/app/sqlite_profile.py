@@ -0,0 +1,35 @@
+import os
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+"""Профиль SQLite, который применяется к каждому новому соединению движков приложения.
+WAL позволяет читателям не ждать писателя и наоборот; busy_timeout (мс) задает, сколько
+соединение ждет блокировку вместо немедленной ошибки "database is locked";
+synchronous=NORMAL в режиме WAL не нарушает целостность, fsync выполняется при контрольной точке;
+mmap_size (байт) и cache_size (отрицательное значение - КиБ) уменьшают число системных вызовов.
+Значения настраиваются переменными окружения SQLITE_*"""
+
+SQLITE_PRAGMAS = {
+    "journal_mode": os.environ.get("SQLITE_JOURNAL_MODE", "WAL"),
+    "busy_timeout": int(os.environ.get("SQLITE_BUSY_TIMEOUT", 5000)),
+    "synchronous": os.environ.get("SQLITE_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": int(os.environ.get("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+    "cache_size": int(os.environ.get("SQLITE_CACHE_SIZE", -64 * 1024)),
+}
+
+
+def apply_sqlite_profile(engine: Engine, pragmas: dict = SQLITE_PRAGMAS) -> None:
+    """Регистрирует установку PRAGMA при каждом новом соединении движка (для SQLite).
+    Для асинхронного движка передается async_engine.sync_engine"""
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name} = {value}")
+        finally:
+            cursor.close()
@@ -0,0 +1,24 @@
+import os
+
+from fastapi.staticfiles import StaticFiles
+
+from .storage import is_content_addressed
+
+"""Раздача загруженных изображений с заголовками кеширования.
+StaticFiles уже отдает ETag и Last-Modified, отвечает 304 на условные запросы
+и поддерживает Range; здесь добавляется Cache-Control. Файлы с именем-хешем
+неизменяемы и кешируются на год с флагом immutable, остальные - с обязательной проверкой"""
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+MUTABLE_CACHE_CONTROL = "public, max-age=3600, must-revalidate"
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles с заголовком Cache-Control в зависимости от стабильности пути"""
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        name = os.path.relpath(full_path, self.directory)
+        response.headers["cache-control"] = (
+            IMMUTABLE_CACHE_CONTROL if is_content_addressed(name) else MUTABLE_CACHE_CONTROL)
+        return response
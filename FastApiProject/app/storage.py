@@ -0,0 +1,89 @@
+import hashlib
+import os
+import re
+import uuid
+from typing import BinaryIO
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from .uploads import CHUNK_SIZE, MAX_UPLOAD_SIZE, SavedUpload, UploadTooLarge, save_upload
+
+"""Модуль адресуемого по содержимому хранилища загруженных файлов.
+Файл сохраняется под именем, равным SHA-256 его содержимого, в дереве каталогов
+uploads/ab/cd/<sha256>.<ext>. Одинаковые загрузки занимают место на диске один раз,
+а ссылками на файл служат строки таблицы images с тем же content_hash.
+Изображения в приложении не удаляются, поэтому файлы из хранилища тоже не удаляются"""
+
+UPLOAD_DIR = "uploads"
+TEMP_DIR = "uploads_tmp"  # Файлы, которые еще загружаются (тот же диск, чтобы перенос был атомарным)
+_EXTENSION_RE = re.compile(r"^\.[a-z0-9]{1,10}$")
+_BLOB_NAME_RE = re.compile(r"^[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.[a-z0-9]{1,10})?$")
+
+
+def blob_name(content_hash: str, original_filename: str = "") -> str:
+    """Функция возвращает путь файла относительно UPLOAD_DIR по его хешу.
+    Расширение исходного имени сохраняется, чтобы по нему определялся тип содержимого"""
+    extension = os.path.splitext(original_filename or "")[1].lower()
+    if not _EXTENSION_RE.match(extension):
+        extension = ""
+    return f"{content_hash[:2]}/{content_hash[2:4]}/{content_hash}{extension}"
+
+
+def is_content_addressed(name: str) -> bool:
+    """Функция проверяет, что путь относительно UPLOAD_DIR - имя-хеш из хранилища.
+    Содержимое по такому пути никогда не меняется"""
+    return bool(_BLOB_NAME_RE.match(name.replace(os.sep, "/")))
+
+
+async def store_upload(file: UploadFile, max_size: int = MAX_UPLOAD_SIZE) -> SavedUpload:
+    """Функция потоково сохраняет загрузку во временный файл, затем переносит его в хранилище.
+    Если файл с таким содержимым уже есть, временная копия удаляется и повторно не записывается.
+    Возвращает SavedUpload, где path - путь относительно UPLOAD_DIR"""
+    os.makedirs(TEMP_DIR, exist_ok=True)
+    temp_path = os.path.join(TEMP_DIR, uuid.uuid4().hex)
+    saved = await save_upload(file, temp_path, max_size=max_size)
+    name = await commit_file(temp_path, saved.sha256, file.filename)
+    return SavedUpload(name, saved.size, saved.sha256)
+
+
+def store_stream(source: BinaryIO, original_filename: str = "", max_size: int = MAX_UPLOAD_SIZE) -> SavedUpload:
+    """Синхронная версия store_upload для файлового объекта (например, файла из ZIP-архива):
+    данные копируются блоками во временный файл с подсчетом SHA-256 и переносятся в хранилище.
+    Вызывается в пуле потоков"""
+    os.makedirs(TEMP_DIR, exist_ok=True)
+    temp_path = os.path.join(TEMP_DIR, uuid.uuid4().hex)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(temp_path, "wb") as out:
+            for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLarge(max_size)
+                digest.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    name = blob_name(digest.hexdigest(), original_filename)
+    _commit_blob(temp_path, os.path.join(UPLOAD_DIR, name))
+    return SavedUpload(name, size, digest.hexdigest())
+
+
+async def commit_file(temp_path: str, content_hash: str, original_filename: str = "") -> str:
+    """Функция переносит записанный временный файл с известным хешем в хранилище
+    (или удаляет его, если такой файл уже есть) и возвращает путь относительно UPLOAD_DIR"""
+    name = blob_name(content_hash, original_filename)
+    await run_in_threadpool(_commit_blob, temp_path, os.path.join(UPLOAD_DIR, name))
+    return name
+
+
+def _commit_blob(temp_path: str, target: str) -> None:
+    """Перемещает временный файл в хранилище или удаляет его, если такой блоб уже есть"""
+    if os.path.exists(target):
+        os.remove(temp_path)
+        return
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    os.replace(temp_path, target)
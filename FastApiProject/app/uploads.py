@@ -0,0 +1,115 @@
+import hashlib
+import os
+from typing import NamedTuple
+
+from fastapi import HTTPException, UploadFile, status
+from starlette.concurrency import run_in_threadpool
+
+"""Модуль потоковой записи загружаемых файлов на диск.
+Файл читается и записывается блоками фиксированного размера, запись выполняется в пуле потоков,
+поэтому память на одну загрузку постоянна, а цикл событий не блокируется дисковыми операциями"""
+
+CHUNK_SIZE = 64 * 1024  # Размер блока чтения/записи (64 КБ)
+MAX_UPLOAD_SIZE = int(os.environ.get("MAX_UPLOAD_SIZE", 20 * 1024 * 1024))  # Максимальный размер файла (20 МБ)
+
+
+class UploadTooLarge(ValueError):
+    """Исключение возбуждается, если файл превышает допустимый размер"""
+
+    def __init__(self, max_size: int):
+        super().__init__(f"Файл превышает допустимый размер {max_size} байт")
+        self.max_size = max_size
+
+
+class SavedUpload(NamedTuple):
+    """Результат сохранения файла: путь, размер в байтах и SHA-256 содержимого"""
+    path: str
+    size: int
+    sha256: str
+
+
+async def save_upload(file: UploadFile, destination: str, max_size: int = MAX_UPLOAD_SIZE,
+                      chunk_size: int = CHUNK_SIZE) -> SavedUpload:
+    """Функция потоково сохраняет загруженный файл в destination.
+    Данные пишутся во временный файл *.part, который переименовывается только после
+    успешного завершения; при превышении max_size запись прерывается и файл удаляется"""
+    temp_path = destination + ".part"
+    digest = hashlib.sha256()
+    size = 0
+    out = await run_in_threadpool(open, temp_path, "wb")
+    try:
+        while True:
+            chunk = await file.read(chunk_size)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_size:
+                raise UploadTooLarge(max_size)
+            digest.update(chunk)
+            await run_in_threadpool(out.write, chunk)
+        await run_in_threadpool(out.close)
+        await run_in_threadpool(os.replace, temp_path, destination)
+    except BaseException:
+        await run_in_threadpool(_discard, out, temp_path)
+        raise
+    return SavedUpload(destination, size, digest.hexdigest())
+
+
+def _discard(out, temp_path: str) -> None:
+    """Закрывает и удаляет недописанный временный файл"""
+    out.close()
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+
+class UploadSizeLimitMiddleware:
+    """ASGI-middleware ограничивает размер тела запроса для маршрутов загрузки.
+    Тело проверяется по мере поступления, поэтому слишком большой запрос обрывается
+    сразу после превышения лимита, а не после полного разбора multipart-формы"""
+
+    def __init__(self, app, paths, max_size: int = MAX_UPLOAD_SIZE, overhead: int = CHUNK_SIZE):
+        self.app = app
+        self.paths = set(paths)
+        self.max_body = max_size + overhead  # Запас на заголовки multipart и текстовые поля
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None:
+            try:
+                declared = int(content_length)
+            except ValueError:
+                declared = -1
+            if declared < 0:  # Нечисловой или отрицательный заголовок
+                await self._reject(scope, receive, send, status.HTTP_400_BAD_REQUEST,
+                                   "Некорректный заголовок Content-Length")
+                return
+            if declared > self.max_body:
+                await self._reject(scope, receive, send)
+                return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body:
+                    # HTTPException пробрасывается FastAPI из разбора формы без изменений
+                    raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                        detail="Файл слишком большой")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    async def _reject(self, scope, receive, send, status_code: int = status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                      text: str = "Файл слишком большой"):
+        """Отправляет текстовый ответ об ошибке, по умолчанию 413 Request Entity Too Large"""
+        from starlette.responses import PlainTextResponse
+
+        response = PlainTextResponse(text, status_code=status_code)
+        await response(scope, receive, send)
@@ -0,0 +1,89 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from . import models
+
+"""Модуль кеширует пользователей, которых восстанавливает get_current_user.
+Кеш живет в памяти процесса, ограничен по размеру (LRU) и времени жизни записи (TTL).
+Объекты хранятся отсоединенными от сессии (expunge) и используются только для чтения.
+Запись удаляется из кеша после фиксации транзакции, изменившей или удалившей пользователя"""
+
+USER_CACHE_TTL = float(os.environ.get("USER_CACHE_TTL", 60))  # Время жизни записи, секунды
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", 1024))  # Максимальное число записей
+
+_CHANGED_KEY = "user_cache_changed_ids"
+
+
+class TTLCache:
+    """Потокобезопасный LRU-кеш с ограниченным временем жизни записей"""
+
+    def __init__(self, maxsize: int = USER_CACHE_SIZE, ttl: float = USER_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """Возвращает значение или None, если записи нет или она устарела"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[1] < time.monotonic():
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def set(self, key, value) -> None:
+        """Сохраняет значение, вытесняя самую давно использованную запись при переполнении"""
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key) -> None:
+        """Удаляет запись из кеша"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        """Очищает кеш"""
+        with self._lock:
+            self._data.clear()
+
+
+user_cache = TTLCache()
+
+
+@event.listens_for(models.CustomUser, "after_update")
+@event.listens_for(models.CustomUser, "after_delete")
+def _remember_changed_user(mapper, connection, target):
+    """Запоминает id измененного пользователя до фиксации транзакции"""
+    user_cache.invalidate(target.id)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_CHANGED_KEY, set()).add(target.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    """После фиксации удаляет из кеша всех измененных в транзакции пользователей.
+    Повторное удаление нужно, если запись успела попасть в кеш до фиксации"""
+    for user_id in session.info.pop(_CHANGED_KEY, ()):
+        user_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changed_users(session):
+    """При откате изменения не применились, список очищается"""
+    session.info.pop(_CHANGED_KEY, None)
@@ -1,5 +1,8 @@
 from sqlalchemy.orm import Session
+from typing import Optional
 from . import models, schemas
+from .jobs import enqueue
+from .pagination import Page, keyset_paginate
 from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
 
@@ -39,11 +42,13 @@ def create_user(db: Session, user: schemas.UserCreate):
     return db_user
 
 
-def get_users(db: Session, skip: int = 0, limit: int = 100):
+def get_users(db: Session, after: Optional[str] = None, before: Optional[str] = None,
+              limit: int = 100) -> Page:
     """Функция для получения списка пользователей.
-        Возвращает список пользователей, запрошенных из базы данных
-        с учетом параметров пропуска и лимита"""
-    return db.query(models.CustomUser).offset(skip).limit(limit).all()
+        Возвращает страницу пользователей, запрошенных из базы данных
+        с учетом курсоров after/before и лимита"""
+    return keyset_paginate(db.query(models.CustomUser), models.CustomUser.id,
+                           after=after, before=before, limit=limit)
 
 
 def get_user_by_username(db: Session, username: str):
@@ -60,9 +65,12 @@ def add_image(db: Session, image: schemas.ImageCreate, user_id: int):
     return db_image
 
 
-def get_images(db: Session, skip: int = 0, limit: int = 100):
-    """Функция возвращает список изображений, с учетом параметров пропуска и лимита."""
-    return db.query(models.Image).offset(skip).limit(limit).all()
+def get_images(db: Session, after: Optional[str] = None, before: Optional[str] = None,
+               limit: int = 100) -> Page:
+    """Функция возвращает страницу изображений с учетом курсоров after/before и лимита."""
+    return keyset_paginate(db.query(models.Image), models.Image.id,
+                           after=after, before=before, limit=limit)
+
 
 
 def add_comment(db: Session, comment: schemas.CommentCreate, user_id: int, image_id: int):
@@ -75,6 +83,24 @@ def add_comment(db: Session, comment: schemas.CommentCreate, user_id: int, image
     return db_comment
 
 
+def insert_image(db: Session, filename: str, content_hash: str, description: Optional[str]) -> int:
+    """Операция для очереди групповой фиксации (write_queue):
+    добавляет изображение и задачу его обработки без фиксации транзакции и возвращает id изображения"""
+    db_image = models.Image(filename=filename, content_hash=content_hash, description=description)
+    db.add(db_image)
+    db.flush()
+    enqueue(db, "process_image", image_id=db_image.id)
+    return db_image.id
+
+
+def insert_comment(db: Session, text: str, user_id: int, image_id: int) -> int:
+    """Операция для очереди групповой фиксации: добавляет комментарий и возвращает его id"""
+    db_comment = models.Comment(text=text, user_id=user_id, image_id=image_id)
+    db.add(db_comment)
+    db.flush()
+    return db_comment.id
+
+
 def get_comments_by_image(db: Session, image_id: int):
     """Функция возвращает список комментариев к изображению"""
     return db.query(models.Comment).filter(models.Comment.image_id == image_id).all()
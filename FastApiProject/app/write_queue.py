@@ -0,0 +1,147 @@
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+
+"""Групповая фиксация небольших записей (комментарии, строки загруженных изображений).
+Операции передаются единственному потоку-писателю, который собирает их в пакет
+в течение WRITE_BATCH_DELAY_MS (или до WRITE_BATCH_SIZE операций) и выполняет одной
+транзакцией: на весь пакет приходится один COMMIT (и один fsync) вместо одного на запись.
+Вызывающий получает результат своей операции после фиксации пакета.
+Если пакет не удалось зафиксировать, операции повторяются по одной, чтобы ошибка
+одной записи не отменяла остальные; любая другая ошибка (например, при открытии сессии)
+передается операциям пакета, а поток-писатель продолжает работу.
+Режим включается переменной WRITE_BEHIND=1"""
+
+logger = logging.getLogger(__name__)
+
+WRITE_BEHIND = os.environ.get("WRITE_BEHIND", "0") == "1"
+WRITE_BATCH_DELAY = float(os.environ.get("WRITE_BATCH_DELAY_MS", 2)) / 1000  # Время сбора пакета, секунды
+WRITE_BATCH_SIZE = int(os.environ.get("WRITE_BATCH_SIZE", 256))  # Максимум операций в пакете
+
+_STOP = object()
+
+
+class GroupCommitQueue:
+    """Очередь записей с единственным писателем и групповой фиксацией.
+    Операция - функция operation(session, *args), которая добавляет объекты в сессию,
+    при необходимости вызывает flush и возвращает простое значение (например, id)"""
+
+    def __init__(self, session_factory, enabled: bool = WRITE_BEHIND,
+                 max_batch: int = WRITE_BATCH_SIZE, max_delay: float = WRITE_BATCH_DELAY):
+        self._session_factory = session_factory
+        self.enabled = enabled
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches = 0  # Зафиксированных пакетов
+        self.writes = 0  # Выполненных операций
+        self.retries = 0  # Пакетов, повторенных по одной операции
+
+    def submit(self, operation, *args) -> Future:
+        """Ставит операцию в очередь и возвращает Future с ее результатом"""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((future, operation, args))
+        return future
+
+    async def run(self, operation, *args):
+        """Асинхронно ждет выполнения операции, не блокируя цикл событий"""
+        return await asyncio.wrap_future(self.submit(operation, *args))
+
+    def close(self) -> None:
+        """Выполняет оставшиеся операции и останавливает поток-писатель"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def _ensure_started(self) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._loop, name="group-commit", daemon=True)
+                    self._thread.start()
+
+    def _loop(self) -> None:
+        stopping = False
+        try:
+            while not stopping:
+                item = self._queue.get()
+                if item is _STOP:
+                    break
+                batch = [item]
+                deadline = time.perf_counter() + self.max_delay
+                while len(batch) < self.max_batch:
+                    timeout = deadline - time.perf_counter()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=timeout)
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+                try:
+                    self._execute(batch)
+                except Exception as e:
+                    logger.exception("Ошибка выполнения пакета из %s операций", len(batch))
+                    for future, _, _ in batch:
+                        if not future.done():
+                            future.set_exception(e)
+        finally:
+            with self._lock:
+                if self._thread is threading.current_thread():
+                    self._thread = None  # Следующая операция запустит новый поток
+
+    def _execute(self, batch) -> None:
+        """Выполняет пакет одной транзакцией, а при ошибке - каждую операцию отдельно"""
+        batch = [item for item in batch if item[0].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        session: Session = self._session_factory()
+        try:
+            results = [operation(session, *args) for _, operation, args in batch]
+            session.commit()
+        except Exception:
+            session.rollback()
+            self.retries += 1
+            for item in batch:
+                self._execute_one(*item)
+            return
+        finally:
+            session.close()
+        self.batches += 1
+        self.writes += len(batch)
+        for (future, _, _), result in zip(batch, results):
+            future.set_result(result)
+
+    def _execute_one(self, future: Future, operation, args) -> None:
+        session: Session = self._session_factory()
+        try:
+            result = operation(session, *args)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            future.set_exception(e)
+            return
+        finally:
+            session.close()
+        self.batches += 1
+        self.writes += 1
+        future.set_result(result)
+
+
+write_queue = GroupCommitQueue(SessionLocal)  # Общая очередь для обработчиков запросов
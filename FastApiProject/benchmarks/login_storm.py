@@ -0,0 +1,140 @@
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode
+
+"""Бенчмарк "шторм входов": множество одновременных POST /login (bcrypt),
+и параллельно - замер задержки постороннего маршрута GET /.
+Сервер запускается через uvicorn с отдельной временной базой данных.
+
+Запуск из каталога FastApiProject:
+    python -m benchmarks.login_storm --logins 200 --concurrency 32
+    python -m benchmarks.login_storm --hash-workers 0   # прежний режим: bcrypt в цикле событий
+Результат выводится в формате JSON"""
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, p):
+    """Возвращает p-й перцентиль (в миллисекундах) списка задержек в секундах"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))
+    return round(ordered[index] * 1000, 2)
+
+
+def summary(latencies):
+    """Сводка задержек: количество, p50/p95/p99 и максимум"""
+    return {
+        "count": len(latencies),
+        "p50_ms": percentile(latencies, 50),
+        "p95_ms": percentile(latencies, 95),
+        "p99_ms": percentile(latencies, 99),
+        "max_ms": round(max(latencies) * 1000, 2) if latencies else None,
+    }
+
+
+def request(port, method, path, form=None):
+    """Выполняет HTTP-запрос и возвращает (статус, задержка в секундах)"""
+    body = urlencode(form) if form else None
+    headers = {"Content-Type": "application/x-www-form-urlencoded"} if form else {}
+    started = time.perf_counter()
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    try:
+        connection.request(method, path, body=body, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        return response.status, time.perf_counter() - started
+    finally:
+        connection.close()
+
+
+def start_server(port, database_path, hash_workers):
+    """Запускает uvicorn с приложением и ждет, пока оно начнет отвечать"""
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{database_path}")
+    if hash_workers is not None:
+        env["PASSWORD_HASH_WORKERS"] = str(hash_workers)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=PROJECT_DIR, env=env)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if request(port, "GET", "/")[0] == 200:
+                return server
+        except OSError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("Сервер не запустился")
+
+
+def run(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        server = start_server(args.port, os.path.join(tmp, "bench.db"), args.hash_workers)
+        try:
+            request(args.port, "POST", "/reg", {
+                "username": "bench", "first_name": "Bench", "last_name": "User",
+                "email": "bench@example.com", "birth_date": "2000-01-01",
+                "password": "secret", "confirm_password": "secret"})
+
+            probe_latencies = []
+            storm_running = threading.Event()
+            storm_running.set()
+
+            def probe():
+                while storm_running.is_set():
+                    probe_latencies.append(request(args.port, "GET", "/")[1])
+                    time.sleep(args.probe_interval)
+
+            def login(_):
+                return request(args.port, "POST", "/login", {"username": "bench", "password": "secret"})
+
+            prober = threading.Thread(target=probe)
+            prober.start()
+            started = time.perf_counter()
+            with ThreadPoolExecutor(args.concurrency) as pool:
+                results = list(pool.map(login, range(args.logins)))
+            elapsed = time.perf_counter() - started
+            storm_running.clear()
+            prober.join()
+        finally:
+            server.terminate()
+            server.wait()
+
+    statuses = {}
+    for status, _ in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        "hash_workers": args.hash_workers,
+        "logins": args.logins,
+        "concurrency": args.concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "logins_per_s": round(args.logins / elapsed, 2),
+        "login_statuses": statuses,
+        "login_latency": summary([latency for _, latency in results]),
+        "unrelated_route_latency": summary(probe_latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк входа пользователей под нагрузкой")
+    parser.add_argument("--logins", type=int, default=200, help="Общее число запросов POST /login")
+    parser.add_argument("--concurrency", type=int, default=32, help="Число одновременных клиентов")
+    parser.add_argument("--probe-interval", type=float, default=0.01,
+                        help="Пауза между запросами GET / (секунды)")
+    parser.add_argument("--hash-workers", type=int, default=None,
+                        help="PASSWORD_HASH_WORKERS сервера; 0 - хеширование в цикле событий")
+    parser.add_argument("--port", type=int, default=8765)
+    print(json.dumps(run(parser.parse_args()), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
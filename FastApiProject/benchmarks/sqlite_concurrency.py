@@ -0,0 +1,142 @@
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import OperationalError
+
+from app.sqlite_profile import SQLITE_PRAGMAS, apply_sqlite_profile
+from benchmarks.login_storm import summary
+
+"""Проверка конкурентного доступа к SQLite: профиль приложения (WAL и PRAGMA из app.sqlite_profile)
+против режима по умолчанию (журнал отката) с тем же busy_timeout.
+Одновременно работают писатель (короткие транзакции INSERT), длинный читатель
+(постранично читает всю таблицу, удерживая транзакцию чтения) и быстрые читатели (выборка по id).
+В режиме журнала отката писатель ждет окончания длинного чтения, а пока он ждет,
+новые читатели тоже блокируются; в режиме WAL чтение и запись друг друга не ждут.
+
+Запуск из каталога FastApiProject:
+    python -m benchmarks.sqlite_concurrency --duration 5 --readers 4
+Выводит JSON по обоим режимам; код возврата 1, если в профиле приложения были ошибки блокировки
+или p99 быстрых чтений превысил --max-read-ms. Короткий прогон профиля выполняет
+tests/test_sqlite_concurrency.py"""
+
+
+def make_engine(path, mode, busy_timeout):
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    if mode == "profile":
+        apply_sqlite_profile(engine, dict(SQLITE_PRAGMAS, busy_timeout=busy_timeout))
+    else:
+        @event.listens_for(engine, "connect")
+        def _default_mode(dbapi_connection, connection_record):
+            dbapi_connection.execute("PRAGMA journal_mode = DELETE")
+            dbapi_connection.execute(f"PRAGMA busy_timeout = {busy_timeout}")
+    return engine
+
+
+def run_mode(mode, args):
+    """Прогоняет нагрузку в одном режиме и возвращает сводку"""
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = make_engine(os.path.join(tmp, "bench.db"), mode, args.busy_timeout)
+        with engine.begin() as connection:
+            connection.exec_driver_sql("CREATE TABLE items (id INTEGER PRIMARY KEY, payload TEXT)")
+            connection.exec_driver_sql("INSERT INTO items (payload) VALUES (?)", [("x" * 200,)] * args.rows)
+            journal_mode = connection.exec_driver_sql("PRAGMA journal_mode").scalar()
+
+        stop = threading.Event()
+        results = {"writes": [], "write_errors": 0, "reads": [], "read_errors": 0, "long_reads": 0}
+        lock = threading.Lock()
+
+        def timed(kind, func):
+            started = time.perf_counter()
+            try:
+                func()
+            except OperationalError:  # database is locked
+                with lock:
+                    results[f"{kind}_errors"] += 1
+                return
+            with lock:
+                results[f"{kind}s"].append(time.perf_counter() - started)
+
+        def write():
+            with engine.begin() as connection:
+                connection.exec_driver_sql("INSERT INTO items (payload) VALUES (?)", ("y" * 200,))
+
+        def writer():
+            while not stop.is_set():
+                timed("write", write)
+                time.sleep(0.001)
+
+        def long_reader():
+            while not stop.is_set():
+                with engine.connect() as connection:
+                    for number, _ in enumerate(connection.exec_driver_sql("SELECT * FROM items")):
+                        if number % 1000 == 0:
+                            time.sleep(args.long_read_pause)  # Медленный потребитель, например экспорт
+                results["long_reads"] += 1
+
+        def reader(seed):
+            rng = random.Random(seed)
+
+            def read():
+                with engine.connect() as connection:
+                    connection.exec_driver_sql("SELECT payload FROM items WHERE id = ?",
+                                               (rng.randrange(1, args.rows),)).fetchall()
+
+            while not stop.is_set():
+                timed("read", read)
+
+        threads = [threading.Thread(target=writer), threading.Thread(target=long_reader)]
+        threads += [threading.Thread(target=reader, args=(number,)) for number in range(args.readers)]
+        for thread in threads:
+            thread.start()
+        time.sleep(args.duration)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+
+    return {
+        "journal_mode": journal_mode,
+        "writes": summary(results["writes"]),
+        "write_errors": results["write_errors"],
+        "reads": summary(results["reads"]),
+        "read_errors": results["read_errors"],
+        "long_reads": results["long_reads"],
+    }
+
+
+def passed(result, max_read_ms):
+    """Прогон без ошибок блокировки, p99 быстрых чтений которого не больше max_read_ms"""
+    return (result["read_errors"] == 0 and result["write_errors"] == 0
+            and result["reads"]["p99_ms"] is not None and result["reads"]["p99_ms"] <= max_read_ms)
+
+
+def make_parser():
+    parser = argparse.ArgumentParser(description="Чтение и запись SQLite под конкурентной нагрузкой")
+    parser.add_argument("--duration", type=float, default=5.0, help="Длительность прогона каждого режима, секунды")
+    parser.add_argument("--readers", type=int, default=4, help="Число быстрых читателей")
+    parser.add_argument("--rows", type=int, default=20000, help="Строк в таблице")
+    parser.add_argument("--busy-timeout", type=int, default=1000, help="busy_timeout в обоих режимах, мс")
+    parser.add_argument("--long-read-pause", type=float, default=0.01,
+                        help="Пауза длинного читателя на каждую тысячу строк, секунды")
+    parser.add_argument("--max-read-ms", type=float, default=50.0,
+                        help="Допустимый p99 быстрых чтений в профиле приложения, мс")
+    return parser
+
+
+def main():
+    args = make_parser().parse_args()
+    report = {mode: run_mode(mode, args) for mode in ("default", "profile")}
+    report["passed"] = passed(report["profile"], args.max_read_ms)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    sys.exit(0 if report["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+"""Общая настройка тестов FastAPI-приложения (запуск из каталога FastApiProject: python -m pytest tests).
+База данных - временный файл SQLite; DATABASE_URL задается до первого импорта app.database.
+Шаблоны и статические файлы подключаются по относительным путям, поэтому рабочий каталог - корень проекта"""
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEST_DIR = tempfile.mkdtemp(prefix="image_share_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEST_DIR, 'test.db')}"
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+
+@pytest.fixture(scope="session")
+def client():
+    """Клиент приложения с выполненными обработчиками запуска"""
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="session")
+def logged_in_client(client):
+    """Клиент с сессией зарегистрированного пользователя"""
+    client.post("/reg", data={"username": "tester", "first_name": "Test", "last_name": "User",
+                              "email": "tester@example.com", "birth_date": "2000-01-01",
+                              "password": "secret", "confirm_password": "secret"})
+    response = client.post("/login", data={"username": "tester", "password": "secret"}, follow_redirects=False)
+    assert response.status_code == 303
+    return client
+
+
+@pytest.fixture
+def db():
+    """Синхронная сессия для подготовки данных"""
+    from app.database import SessionLocal
+
+    with SessionLocal() as session:
+        yield session
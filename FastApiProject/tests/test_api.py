@@ -0,0 +1,51 @@
+from fastapi.testclient import TestClient
+
+from app import models
+
+"""JSON API (app/api.py) на строках, которые действительно есть в базе"""
+
+
+def test_images_without_user_are_listed(logged_in_client, db):
+    """Изображения, загруженные через /upload_image, не связаны с пользователем (user_id NULL)"""
+    db.add_all([models.Image(filename="aa/bb/anonymous.png", description="без автора"),
+                models.Image(filename="aa/bb/owned.png", description="с автором", user_id=1)])
+    db.commit()
+
+    response = logged_in_client.get("/api/v1/images", params={"limit": 200})
+    assert response.status_code == 200
+    items = {item["filename"]: item for item in response.json()["items"]}
+    assert items["aa/bb/anonymous.png"]["user_id"] is None
+    assert items["aa/bb/owned.png"]["user_id"] == 1
+
+    response = logged_in_client.get("/api/v1/images", params={"limit": 200, "fields": "id,description"})
+    assert response.status_code == 200
+    assert all(set(item) == {"id", "description"} for item in response.json()["items"])
+
+
+def test_images_fields_are_validated(logged_in_client, db):
+    db.add(models.Image(filename="ee/ff/fields.png"))
+    db.commit()
+    assert "comments" not in logged_in_client.get("/api/v1/images").json()["items"][0]
+    for fields in (",", " , ", "id,comments", "password"):  # Пустой выбор, комментарии - отдельным запросом
+        response = logged_in_client.get("/api/v1/images", params={"fields": fields})
+        assert response.status_code == 400, fields
+
+
+def test_images_cursor_pagination(logged_in_client, db):
+    db.add_all(models.Image(filename=f"cc/dd/page{number}.png") for number in range(5))
+    db.commit()
+    total = db.query(models.Image).count()
+
+    seen, params = [], {"limit": 2, "fields": "id"}
+    while True:
+        page = logged_in_client.get("/api/v1/images", params=params).json()
+        seen.extend(item["id"] for item in page["items"])
+        if not page["next_cursor"]:
+            break
+        params["after"] = page["next_cursor"]
+    assert seen == sorted(seen) and len(seen) == total
+
+
+def test_api_requires_session(client):
+    anonymous = TestClient(client.app)
+    assert anonymous.get("/api/v1/images").status_code == 401
@@ -0,0 +1,86 @@
+import pytest
+
+from app import duplicates, jobs, models
+from app.duplicates import HammingIndex, duplicate_index
+
+"""Поиск ранее загруженной копии фоновой задачей process_image и ссылка на нее на странице изображения"""
+
+PIL = pytest.importorskip("PIL.Image")
+
+
+def _gradient(path, size, shift=0):
+    """Горизонтальный градиент: уменьшенная копия дает тот же перцептивный хеш"""
+    image = PIL.new("L", (size, size))
+    image.putdata([min(255, x * 256 // size + shift) for _ in range(size) for x in range(size)])
+    image.save(path)
+
+
+def _add_image(db, filename, description):
+    image = models.Image(filename=filename, description=description)
+    db.add(image)
+    db.commit()
+    return image
+
+
+def test_process_image_records_duplicate(logged_in_client, db, tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "UPLOAD_DIR", str(tmp_path))
+    _gradient(tmp_path / "original.png", 256)
+    _gradient(tmp_path / "copy.png", 64, shift=3)
+    _gradient(tmp_path / "other.png", 64)
+    PIL.open(tmp_path / "other.png").transpose(PIL.FLIP_LEFT_RIGHT).save(tmp_path / "other.png")
+    original = _add_image(db, "original.png", "оригинал")
+    copy = _add_image(db, "copy.png", "копия")
+    other = _add_image(db, "other.png", "другое")
+    for image in (original, copy, other):
+        jobs.process_image(db, image.id)
+        db.commit()
+
+    assert original.duplicate_of_id is None  # Оригинал загружен первым
+    assert copy.duplicate_of_id == original.id
+    assert other.duplicate_of_id is None
+    assert duplicate_index.search(int(copy.phash, 16))
+
+    page = logged_in_client.get(f"/get_image/{copy.id}")
+    assert page.status_code == 200
+    assert f'href="/get_image/{original.id}"' in page.text
+    assert "Похожее изображение уже загружено" not in logged_in_client.get(f"/get_image/{original.id}").text
+
+
+def test_search_returns_nearest_within_limit():
+    index = HammingIndex()
+    index.add_many([(1, 0b1011), (2, 0b1), (3, 0), (4, 0), (5, 1 << 40 | 0b111)])
+    assert index.search(0, 6) == [(0, 3), (0, 4), (1, 2), (3, 1), (4, 5)]
+    assert index.search(0, 6, limit=3) == [(0, 3), (0, 4), (1, 2)]
+    assert index.search(0, 6, limit=2) == [(0, 3), (0, 4)]  # Только точные совпадения
+    assert index.search(0, 6, limit=3, before_id=4) == [(0, 3), (1, 2), (3, 1)]
+
+
+def test_watermark_waits_for_processing(db):
+    def refresh():
+        duplicates._add_rows(db.execute(duplicates._refresh_query()))
+
+    image = _add_image(db, "missing.png", "файла нет")
+    jobs.enqueue(db, "process_image", image_id=image.id)
+    db.commit()
+    refresh()
+    assert duplicate_index.watermark == image.id  # Задача еще не выполнена
+    job = jobs.claim(db, "test")
+    assert job.payload == f'{{"image_id": {image.id}}}'
+    assert jobs.run_job(db, job)  # Метаданных и хеша у отсутствующего файла нет
+    refresh()
+    assert duplicate_index.watermark > image.id
+
+
+def test_slow_hash_is_indexed_after_later_rows():
+    index = HammingIndex()
+    index.add_many([(1, None), *((item_id, item_id) for item_id in range(2, 20000))])
+    assert index.watermark == 1  # Изображение 1 еще обрабатывается
+    index.add_many([(1, 0b1), *((item_id, item_id) for item_id in range(2, 20000)), (20000, None)])
+    assert len(index) == 19999  # Строки 2..19999 прочитаны повторно, но не добавлены второй раз
+    assert index.search(0b1, 0) == [(0, 1)]
+    assert index.watermark == 20000
+    index.add_many([(20000, None)])
+    assert index.watermark == 20000
+    index.add_many([(20001, 0b10)])  # Обработка 20000 завершилась без хеша
+    assert index.watermark == 20002
+    assert len(index) == 20000
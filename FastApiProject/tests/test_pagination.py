@@ -0,0 +1,25 @@
+import re
+
+import pytest
+
+from app import models
+
+"""Ссылки на соседние страницы списков изображений и пользователей сохраняют размер страницы limit"""
+
+
+@pytest.mark.parametrize("path", ["/images", "/list"])
+def test_page_links_keep_limit(logged_in_client, db, path):
+    suffix = path.strip("/")
+    db.add_all(models.Image(filename=f"page-{number}.png") for number in range(5))
+    db.add_all(models.CustomUser(username=f"page-{suffix}-{number}", first_name="Page", last_name=str(number),
+                                 email=f"page-{suffix}-{number}@example.com", birth_date="2000-01-01",
+                                 hashed_password="-") for number in range(5))
+    db.commit()
+    first = logged_in_client.get(f"{path}?limit=2")
+    assert first.status_code == 200
+    next_url, = re.findall(rf'href="({path}\?after=[^"]*)"', first.text)
+    assert next_url.endswith("&amp;limit=2")
+    second = logged_in_client.get(next_url.replace("&amp;", "&"))
+    assert second.status_code == 200
+    prev_url, = re.findall(rf'href="({path}\?before=[^"]*)"', second.text)
+    assert prev_url.endswith("&amp;limit=2")
@@ -0,0 +1,80 @@
+import os
+
+import pytest
+
+from app import resumable, storage
+
+"""Возобновляемая загрузка по частям: создание, части по смещению, 409, 413 и завершение"""
+
+DATA = bytes(range(256)) * 4
+
+
+@pytest.fixture
+def upload_dirs(tmp_path, monkeypatch):
+    """Загрузки и хранилище во временном каталоге, а не в каталоге проекта"""
+    monkeypatch.setattr(storage, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setattr(storage, "TEMP_DIR", str(tmp_path / "uploads_tmp"))
+    monkeypatch.setattr(resumable, "RESUMABLE_DIR", str(tmp_path / "uploads_tmp" / "resumable"))
+    monkeypatch.setattr(resumable, "MAX_CHUNK_SIZE", 512)
+    return tmp_path
+
+
+def _create(client, size=len(DATA)):
+    response = client.post("/resumable_uploads", json={"filename": "big.bin", "size": size,
+                                                       "description": "по частям"})
+    assert response.status_code == 201
+    assert response.headers["Location"] == f"/resumable_uploads/{response.json()['id']}"
+    return response.headers["Location"]
+
+
+def _patch(client, location, offset, body):
+    return client.patch(location, content=body, headers={"Upload-Offset": str(offset),
+                                                         "Content-Type": "application/offset+octet-stream"})
+
+
+def test_resumable_upload_flow(client, upload_dirs):
+    location = _create(client)
+
+    response = _patch(client, location, 0, DATA[:400])
+    assert response.status_code == 200
+    assert response.headers["Upload-Offset"] == "400"
+
+    response = _patch(client, location, 100, DATA[100:200])  # Повтор уже полученной части
+    assert response.status_code == 409
+    assert response.headers["Upload-Offset"] == "400"
+
+    assert _patch(client, location, 400, DATA[400:1000]).status_code == 413  # Длиннее MAX_CHUNK_SIZE
+    assert client.get(location).headers["Upload-Offset"] == "400"  # Часть отброшена целиком
+
+    assert client.post(f"{location}/complete").status_code == 409  # Файл получен не полностью
+
+    assert _patch(client, location, 400, DATA[400:800]).headers["Upload-Offset"] == "800"
+    assert _patch(client, location, 800, DATA[800:]).headers["Upload-Offset"] == str(len(DATA))
+    assert _patch(client, location, len(DATA), b"x").status_code == 413  # За объявленным размером
+
+    response = client.post(f"{location}/complete")
+    assert response.status_code == 201
+    image_id = response.json()["image_id"]
+    assert response.json()["url"] == f"/get_image/{image_id}"
+    stored = [os.path.join(root, name) for root, _, names in os.walk(upload_dirs / "uploads") for name in names]
+    assert len(stored) == 1
+    with open(stored[0], "rb") as data:
+        assert data.read() == DATA
+    assert client.get(location).status_code == 404
+    assert client.post(f"{location}/complete").status_code == 404
+
+
+@pytest.mark.skipif(resumable.fcntl is None, reason="flock недоступен")
+def test_locked_upload_is_busy(client, upload_dirs):
+    location = _create(client)
+    upload_id = location.rsplit("/", 1)[1]
+    _, part_path = resumable._paths(upload_id)
+    with open(part_path, "r+b") as part:  # Часть пишет другой процесс
+        resumable.fcntl.flock(part.fileno(), resumable.fcntl.LOCK_EX)
+        response = _patch(client, location, 0, DATA[:100])
+        assert response.status_code == 409
+        assert response.headers["Upload-Offset"] == "0"
+        assert client.delete(location).status_code == 409
+    assert _patch(client, location, 0, DATA[:100]).headers["Upload-Offset"] == "100"
+    assert client.delete(location).status_code == 204
+    assert not os.path.exists(part_path)
@@ -0,0 +1,15 @@
+from benchmarks.sqlite_concurrency import make_parser, run_mode
+
+"""Короткий прогон benchmarks/sqlite_concurrency.py с профилем SQLite приложения:
+база работает в режиме WAL, а писатель, длинный читатель и быстрые читатели работают
+одновременно без ошибок "database is locked". Время чтения зависит от машины, поэтому
+порог p99 проверяет только сам бенчмарк (--max-read-ms), а не тест"""
+
+
+def test_profile_has_no_lock_errors():
+    args = make_parser().parse_args(["--duration", "1", "--rows", "5000"])
+    result = run_mode("profile", args)
+    assert result["journal_mode"] == "wal"
+    assert result["write_errors"] == 0
+    assert result["read_errors"] == 0
+    assert result["writes"]["count"] > 0 and result["long_reads"] > 0  # Нагрузка действительно смешанная
@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+from app.uploads import UploadSizeLimitMiddleware
+
+"""Проверка заголовка Content-Length в UploadSizeLimitMiddleware до чтения тела запроса"""
+
+
+async def _app(scope, receive, send):
+    """Приложение за middleware: отвечает 200, если запрос до него дошел"""
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+def _status(content_length: bytes) -> int:
+    middleware = UploadSizeLimitMiddleware(_app, paths=["/upload_image"], max_size=100, overhead=0)
+    scope = {"type": "http", "method": "POST", "path": "/upload_image",
+             "headers": [(b"content-length", content_length)]}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(middleware(scope, receive, send))
+    return messages[0]["status"]
+
+
+@pytest.mark.parametrize("content_length, expected", [
+    (b"10", 200), (b"101", 413), (b"abc", 400), (b"", 400), (b"-1", 400),
+])
+def test_content_length_is_validated(content_length, expected):
+    assert _status(content_length) == expected
@@ -0,0 +1,82 @@
+import threading
+
+import pytest
+
+from app.write_queue import GroupCommitQueue
+
+"""Групповая фиксация (app/write_queue.py): пакеты, повтор по одной операции и ошибки вне операций"""
+
+
+class FakeSession:
+    """Сессия, которая только считает фиксации и откаты"""
+
+    def __init__(self, log):
+        self.log = log
+
+    def commit(self):
+        self.log.append("commit")
+
+    def rollback(self):
+        self.log.append("rollback")
+
+    def close(self):
+        pass
+
+
+def _queue(log, **kwargs):
+    return GroupCommitQueue(lambda: FakeSession(log), enabled=True, **kwargs)
+
+
+def _double(session, value):
+    return value * 2
+
+
+def _fail(session, value):
+    raise ValueError(value)
+
+
+def test_operations_are_committed_in_one_batch():
+    log = []
+    write_queue = _queue(log, max_delay=0.5)
+    futures = [write_queue.submit(_double, value) for value in range(5)]
+    assert [future.result(timeout=5) for future in futures] == [0, 2, 4, 6, 8]
+    write_queue.close()
+    assert log == ["commit"]
+    assert (write_queue.batches, write_queue.writes, write_queue.retries) == (1, 5, 0)
+
+
+def test_failed_batch_is_replayed_one_at_a_time():
+    log = []
+    write_queue = _queue(log, max_delay=0.5)
+    futures = [write_queue.submit(_double, 1), write_queue.submit(_fail, "плохая запись"),
+               write_queue.submit(_double, 3)]
+    assert futures[0].result(timeout=5) == 2
+    with pytest.raises(ValueError, match="плохая запись"):
+        futures[1].result(timeout=5)
+    assert futures[2].result(timeout=5) == 6
+    write_queue.close()
+    assert log == ["rollback", "commit", "rollback", "commit"]
+    assert (write_queue.batches, write_queue.writes, write_queue.retries) == (2, 2, 1)
+
+
+def test_session_error_fails_the_batch_and_keeps_the_writer():
+    broken = threading.Event()
+    broken.set()
+    log = []
+
+    def session_factory():
+        if broken.is_set():
+            raise RuntimeError("база недоступна")
+        return FakeSession(log)
+
+    write_queue = GroupCommitQueue(session_factory, enabled=True, max_delay=0)
+    with pytest.raises(RuntimeError, match="база недоступна"):
+        write_queue.submit(_double, 1).result(timeout=5)
+    writer = write_queue._thread
+    broken.clear()
+    assert write_queue.submit(_double, 2).result(timeout=5) == 4
+    assert write_queue._thread is writer and writer.is_alive()
+    write_queue.close()
+    assert write_queue._thread is None
+    assert write_queue.submit(_double, 3).result(timeout=5) == 6  # После остановки поток запускается снова
+    write_queue.close()
@@ -1,16 +1,32 @@
-from flask import Flask, render_template, redirect, url_for, request, flash, send_from_directory
+from flask import (Flask, Response, render_template, redirect, url_for, request, flash, send_from_directory,
+                   abort, stream_with_context)
 from flask_login import LoginManager, login_user, login_required, logout_user, current_user
 from models import db, CustomUser, Image, Comment
 from forms import UserRegistrationForm, UserLoginForm
 from werkzeug.security import generate_password_hash, check_password_hash
-from werkzeug.utils import secure_filename
 from flask_migrate import Migrate
+from comment_counts import reconcile_comments_command
+from duplicates import find_similar
+from export import FORMATS, HTTP_TABLES, export_command, export_rows
+from jobs import enqueue, run_jobs_command
+from metadata import backfill_metadata_command
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload
+from metrics import init_metrics, metrics
+from search import search_images
+from seed import seed_command
+from sqlite_profile import init_sqlite_profile
+from storage import is_content_addressed, store_file
+from user_cache import user_cache
+from write_queue import init_write_queue, write_queue
 import os
 
 app = Flask(__name__)  # Создание экземпляр приложения Flask
 app.config.from_object('config.Config')  # Инициализация конфигурации приложения
 app.config['UPLOAD_FOLDER'] = 'uploads'
 db.init_app(app)  # Инициализация SQLAlchemy
+init_sqlite_profile(app, db)  # WAL, busy_timeout и остальные PRAGMA для каждого соединения
+init_write_queue(app, db)  # Групповая фиксация записей, если включен WRITE_BEHIND
 
 migrate = Migrate(app, db)  # Связывание базы данных с приложением
 
@@ -20,14 +36,33 @@ login_manager.login_view = 'login'  # Перенаправление неавт
 UPLOAD_FOLDER = 'uploads'  # Директория для хранения загруженных файлов
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)  # Создание директории uploads, если она ещё не существует
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER  # Путь для хранения изображений
+user_cache.configure(app.config['USER_CACHE_SIZE'], app.config['USER_CACHE_TTL'])
+init_metrics(app)  # Задержки, статусы и SQL-запросы по маршрутам, см. /metrics
+metrics.add_collector(lambda: [
+    ('write_queue_batches_total', 'Транзакции очереди групповой фиксации', 'counter', write_queue.batches),
+    ('write_queue_writes_total', 'Операции очереди групповой фиксации', 'counter', write_queue.writes),
+])
+app.cli.add_command(seed_command)  # flask seed - синтетические данные для нагрузочного тестирования
+app.cli.add_command(reconcile_comments_command)  # flask reconcile-comments - сверка счетчиков комментариев
+app.cli.add_command(backfill_metadata_command)  # flask backfill-metadata - размеры и заглушки старых файлов
+app.cli.add_command(run_jobs_command)  # flask run-jobs - процессы-обработчики фоновых задач
+app.cli.add_command(export_command)  # flask export - выгрузка таблицы в NDJSON или CSV
 
 @login_manager.user_loader
 def load_user(user_id):
-    """Возвращает объект пользователя или None"""
+    """Возвращает объект пользователя или None.
+    Пользователь берется из кеша процесса, запрос к БД выполняется только при промахе"""
     try:
-        return CustomUser.query.get(int(user_id))
+        user_id = int(user_id)
     except (ValueError, TypeError):
         return None
+    user = user_cache.get(user_id)
+    if user is None:
+        user = CustomUser.query.get(user_id)
+        if user is not None:
+            db.session.expunge(user)  # Отсоединяем объект от сессии, чтобы безопасно хранить его в кеше
+            user_cache.set(user_id, user)
+    return user
 
 @app.route('/')
 def home():
@@ -110,6 +145,35 @@ def logout():
 с функцией images, обрабатывающей как GET-запросы (отображение формы), 
 так и POST-запросы (обработка данных формы)"""
 
+def _insert(session, obj):
+    """Операция очереди групповой фиксации: добавляет новый объект в сессию писателя"""
+    session.add(obj)
+    session.flush()
+    return obj.id
+
+def _insert_image(session, image, max_attempts):
+    """Добавляет изображение и задачу его обработки (размеры, заглушка, перцептивный хеш)
+    в одной транзакции; используется и очередью групповой фиксации"""
+    session.add(image)
+    session.flush()
+    enqueue(session, 'process_image', {'image_id': image.id}, max_attempts)
+    return image.id
+
+def _latest_comments(image_ids, limit):
+    """Последние limit комментариев каждого изображения одним запросом (оконная функция row_number)
+    вместе с авторами. Возвращает словарь id изображения -> комментарии в хронологическом порядке"""
+    latest = {image_id: [] for image_id in image_ids}
+    if not image_ids or limit <= 0:
+        return latest
+    position = func.row_number().over(partition_by=Comment.image_id,
+                                      order_by=(Comment.timestamp.desc(), Comment.id.desc()))
+    ranked = select(Comment.id, position.label('position')).where(Comment.image_id.in_(image_ids)).subquery()
+    comments = Comment.query.options(joinedload(Comment.user)).join(ranked, ranked.c.id == Comment.id).filter(
+        ranked.c.position <= limit).order_by(Comment.timestamp, Comment.id)
+    for comment in comments:
+        latest[comment.image_id].append(comment)
+    return latest
+
 @app.route('/images', methods=['GET', 'POST'])
 @login_required
 def images():
@@ -118,24 +182,49 @@ def images():
         file = request.files.get('image')  # Получение загруженного изображения по ключу
         description = request.form.get('description')  # Получение описания изображения
         if file:  # Проверка на загрузку изображения
-            filename = secure_filename(file.filename)
-            file.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))  # Сохранение изображений в uploads
+            # Сохранение в uploads под именем-хешем: одинаковые файлы хранятся один раз
+            filename, content_hash = store_file(file, app.config['UPLOAD_FOLDER'])
+            image_path = f"{app.config['UPLOAD_FOLDER']}/{filename}"
             new_image = Image(
                 user_id=current_user.id,
-                image_path=f"{app.config['UPLOAD_FOLDER']}/{filename}",
-                description=description
+                image_path=image_path,
+                content_hash=content_hash,
+                description=description,
             )  # Создание объекта изображения по модели из БД с описанием, путем и пользователем, загрузившем его
-            db.session.add(new_image)  # Добавление фотографии в БД
-            db.session.commit()
+            # Разбор файла выполняет фоновая задача (flask run-jobs), ответ ее не ждет
+            if write_queue.enabled:  # Строка фиксируется пакетом вместе с другими записями
+                write_queue.run(_insert_image, new_image, app.config['JOB_MAX_ATTEMPTS'])
+            else:
+                _insert_image(db.session, new_image, app.config['JOB_MAX_ATTEMPTS'])  # Добавление фотографии в БД
+                db.session.commit()
             flash('Изображение успешно загружено', 'success')  # Отображает сообщение об успешной загрузке
-    images = Image.query.order_by(Image.timestamp.desc()).all()
-    return render_template('images.html', images=images)
+    # Автор загружается в том же запросе (JOIN), последние GALLERY_COMMENTS комментариев с авторами -
+    # одним дополнительным запросом, поэтому страница стоит фиксированное число запросов и не читает
+    # все комментарии изображения. Полный список выводится постранично на странице изображения.
+    # sort=popular - по числу комментариев (хранимый счетчик, без агрегации)
+    sort = 'popular' if request.args.get('sort') == 'popular' else None
+    order = (Image.comment_count.desc(), Image.id.desc()) if sort else (Image.timestamp.desc(), Image.id.desc())
+    pagination = Image.query.options(joinedload(Image.user)).order_by(*order).paginate(
+        page=request.args.get('page', 1, type=int), per_page=app.config['IMAGES_PER_PAGE'], error_out=False)
+    latest = _latest_comments([image.id for image in pagination.items], app.config['GALLERY_COMMENTS'])
+    return render_template('images.html', images=pagination.items, pagination=pagination, sort=sort,
+                           latest=latest)
 
-"""Функция маршрута для обслуживания файлов из папки uploads"""
+"""Функция маршрута для обслуживания файлов из папки uploads.
+send_from_directory отдает ETag и Last-Modified, отвечает 304 на условные запросы
+и поддерживает Range. Файлы с именем-хешем неизменяемы и кешируются на год"""
 
-@app.route('/uploads/<filename>')
+@app.route('/uploads/<path:filename>')
 def uploaded_file(filename):
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    immutable = is_content_addressed(filename)
+    max_age = app.config['UPLOADS_IMMUTABLE_MAX_AGE'] if immutable else app.config['UPLOADS_MAX_AGE']
+    response = send_from_directory(app.config['UPLOAD_FOLDER'], filename, max_age=max_age)
+    response.cache_control.public = True
+    if immutable:
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.must_revalidate = True
+    return response
 
 """app.route - декоратор, связывающий URL /images/<int:image_id>/comments с функцией add_comment.
 Декоратор @login_required ограничивает доступ к представлению только для авторизованных пользователей. 
@@ -151,16 +240,54 @@ def add_comment(image_id):
             image_id=image_id,
             content=content
         )  # Создание объекта комментарий с данными о пользователе, изображении и тексте комментария
-        db.session.add(new_comment)  # Добавление в базу данных
-        db.session.commit()
+        if write_queue.enabled:  # Групповая фиксация: один COMMIT на пакет комментариев
+            write_queue.run(_insert, new_comment)
+        else:
+            db.session.add(new_comment)  # Добавление в базу данных
+            db.session.commit()
         flash('Комментарий добавлен', 'success')
     return redirect(url_for('images'))
 
 @app.route('/image/<int:image_id>')
 def image_detail(image_id):
+    """Функция отображает изображение и страницу его комментариев.
+    Авторы комментариев загружаются тем же запросом, что и комментарии.
+    Если фоновая задача нашла ранее загруженную копию изображения, показывается ссылка на нее"""
     image = Image.query.get_or_404(image_id)
-    comments = Comment.query.filter_by(image_id=image_id).all()
-    return render_template('image_detail.html', image=image, comments=comments)
+    pagination = Comment.query.options(joinedload(Comment.user)).filter_by(image_id=image_id).order_by(
+        Comment.timestamp, Comment.id).paginate(
+        page=request.args.get('page', 1, type=int), per_page=app.config['COMMENTS_PER_PAGE'], error_out=False)
+    similar = find_similar(image.phash, app.config['DUPLICATE_MAX_DISTANCE'], app.config['SIMILAR_LIMIT'],
+                           exclude_id=image.id) if image.phash else []
+    duplicate = db.session.get(Image, image.duplicate_of_id) if image.duplicate_of_id else None
+    return render_template('image_detail.html', image=image, comments=pagination.items, pagination=pagination,
+                           similar=similar, duplicate=duplicate)
+
+@app.route('/search')
+@login_required
+def search():
+    """Функция полнотекстового поиска изображений по описанию и комментариям.
+    Возвращает отрендеренный шаблон search.html с результатами в порядке релевантности"""
+    query = request.args.get('q', '').strip()
+    found = search_images(query) if query else []
+    return render_template('search.html', query=query, images=found)
+
+@app.route('/export/<table>.<fmt>')
+@login_required
+def export(table, fmt):
+    """Потоковая выгрузка таблицы images или comments в формате ndjson или csv (export.py).
+    Строки читаются из базы частями и отдаются по мере чтения, ответ не собирается в памяти.
+    Пользователи (с адресами почты) выгружаются только командой flask export"""
+    if table not in HTTP_TABLES or fmt not in FORMATS:
+        abort(404)
+    rows = export_rows(table, fmt, app.config['EXPORT_CHUNK_SIZE'])
+    return Response(stream_with_context(rows), mimetype=FORMATS[fmt],
+                    headers={'Content-Disposition': f'attachment; filename="{table}.{fmt}"'})
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Метрики приложения в текстовом формате Prometheus"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
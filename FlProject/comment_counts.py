@@ -0,0 +1,29 @@
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import func, select, update
+
+from models import db, Image, Comment
+
+"""Сверка денормализованного счетчика Image.comment_count с таблицей комментариев.
+Счетчик поддерживается обработчиками в models.py; сверка нужна после массовых вставок
+в обход ORM и для исправления расхождений.
+Пример: flask --app app reconcile-comments"""
+
+
+def reconcile_comment_counts(session):
+    """Пересчитывает счетчики, отличающиеся от фактического числа комментариев.
+    Возвращает число исправленных изображений"""
+    images, comments = Image.__table__, Comment.__table__
+    actual = (select(func.count()).select_from(comments)
+              .where(comments.c.image_id == images.c.id).scalar_subquery())
+    return session.execute(
+        update(images).where(images.c.comment_count != actual).values(comment_count=actual)).rowcount
+
+
+@click.command('reconcile-comments')
+@with_appcontext
+def reconcile_comments_command():
+    """Пересчитывает счетчики комментариев изображений"""
+    fixed = reconcile_comment_counts(db.session)
+    db.session.commit()
+    click.echo(f'Исправлено счетчиков: {fixed}')
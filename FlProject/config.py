@@ -3,6 +3,37 @@ import os
 class Config:
     """Стандартное подключение к базе данных с конфигурационными настройками."""
     SECRET_KEY = os.urandom(24)
-    SQLALCHEMY_DATABASE_URI = 'sqlite:///db.sqlite3'
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'sqlite:///db.sqlite3')  # Тесты задают свою базу
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # PRAGMA для каждого соединения SQLite (см. sqlite_profile.py): WAL, ожидание блокировки (мс),
+    # synchronous=NORMAL, размер отображения файла в память (байт) и кеша страниц (КиБ со знаком минус)
+    SQLITE_PRAGMAS = {
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)),
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)),
+        'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -64 * 1024)),
+    }
+    USER_CACHE_TTL = 60  # Время жизни записи кеша пользователей, секунды
+    USER_CACHE_SIZE = 1024  # Максимальное число пользователей в кеше
+    UPLOADS_MAX_AGE = 3600  # Cache-Control max-age для файлов, имя которых не является хешем
+    UPLOADS_IMMUTABLE_MAX_AGE = 31536000  # Год для неизменяемых файлов с именем-хешем
+    IMAGES_PER_PAGE = 20  # Количество изображений на странице галереи
+    COMMENTS_PER_PAGE = 50  # Количество комментариев на странице изображения
+    GALLERY_COMMENTS = 3  # Последние комментарии под изображением в галерее, полный список - на его странице
 
+    # Групповая фиксация комментариев и загрузок одним потоком-писателем (см. write_queue.py)
+    WRITE_BEHIND = os.environ.get('WRITE_BEHIND', '0') == '1'
+    WRITE_BATCH_DELAY = float(os.environ.get('WRITE_BATCH_DELAY_MS', 2)) / 1000  # Время сбора пакета, секунды
+    WRITE_BATCH_SIZE = int(os.environ.get('WRITE_BATCH_SIZE', 256))  # Максимум операций в пакете
+    WRITE_TIMEOUT = float(os.environ.get('WRITE_TIMEOUT', 30))  # Ожидание фиксации записи, секунды
+    DUPLICATE_MAX_DISTANCE = 6  # Порог похожести изображений, бит перцептивного хеша из 64 (см. duplicates.py)
+    SIMILAR_LIMIT = 12  # Сколько похожих изображений показывать
+
+    # Очередь фоновых задач (см. jobs.py)
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 5))
+    JOB_RETRY_DELAY = float(os.environ.get('JOB_RETRY_DELAY', 5))  # Задержка первого повтора, секунды
+    JOB_LEASE = float(os.environ.get('JOB_LEASE', 300))  # Максимальное время выполнения задачи, секунды
+    JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 1))  # Пауза при пустой очереди, секунды
+
+    EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 1000))  # Строк в одной части выгрузки (export.py)
@@ -0,0 +1,153 @@
+import heapq
+import threading
+from array import array
+from itertools import combinations
+
+from sqlalchemy import exists, func, or_, select
+
+from models import db, Image, Job
+
+"""Поиск почти одинаковых изображений (пережатых, уменьшенных копий) по перцептивному хешу.
+Хеш - 64-битный dHash (metadata.py); похожие изображения отличаются в нескольких битах.
+Индекс в памяти - многоиндексное хеширование по расстоянию Хэмминга: хеш делится на 4 части
+по 16 бит, и у двух хешей на расстоянии не больше d хотя бы одна часть отличается не больше
+чем на d // 4 бит. Поэтому поиск просматривает только корзины с такими частями, а не все хеши,
+и стоимость запроса почти не зависит от числа изображений.
+Индекс загружается из базы при первом поиске, а перед каждым следующим дополняется строками
+с большим id, так что изображения, добавленные другими процессами сервера, тоже находятся.
+Хеш вычисляет фоновая задача (jobs.py) уже после добавления строки, поэтому индекс помнит нижнюю
+границу (watermark) - наименьший id изображения, которое еще обрабатывается, - и при обновлении
+заново читает строки с хешем начиная с нее. Так изображение попадает в индекс, как только хеш
+появился, сколько бы строк ни было добавлено за время обработки. Граница поднимается, когда
+обработка завершается: с хешем, без хеша (файл не разобран как изображение) или с ошибкой.
+Та же задача сразу после вычисления хеша ищет ранее загруженную копию (find_duplicate)
+и сохраняет ее id в image.duplicate_of_id; страница изображения показывает эту копию.
+Порог расстояния и число результатов задаются в конфигурации"""
+
+DUPLICATE_CANDIDATES = 5  # Сколько ближайших хешей проверяется при поиске копии (изображение могло быть удалено)
+CHUNKS = 4
+CHUNK_BITS = 16
+_CHUNK_MASK = (1 << CHUNK_BITS) - 1
+
+
+class HammingIndex:
+    """Индекс 64-битных хешей для поиска соседей по расстоянию Хэмминга"""
+
+    def __init__(self):
+        self._hashes = array('Q')
+        self._ids = array('q')
+        self._tables = [{} for _ in range(CHUNKS)]  # Часть хеша -> позиции в _hashes
+        self._lock = threading.Lock()
+        self.last_id = 0  # Наибольший просмотренный id
+        self.watermark = 1  # Наименьший id, который еще может получить хеш; строки читаются с него
+        self._recent = set()  # Добавленные в индекс id не ниже watermark (они читаются повторно)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def add_many(self, rows):
+        """Добавляет пары (id, хеш), прочитанные в порядке возрастания id начиная с watermark:
+        строки с хешем и строки, которые еще обрабатываются (хеш None). Уже добавленные id пропускаются.
+        Новая граница - наименьший id без хеша или, если таких нет, следующий за последним id"""
+        with self._lock:
+            watermark = None
+            for item_id, value in rows:
+                self.last_id = max(self.last_id, item_id)
+                if value is None:
+                    if watermark is None:
+                        watermark = item_id
+                    continue
+                if item_id < self.watermark or item_id in self._recent:  # Уже в индексе
+                    continue
+                self._recent.add(item_id)
+                position = len(self._ids)
+                self._hashes.append(value)
+                self._ids.append(item_id)
+                for table, chunk in zip(self._tables, _chunks(value)):
+                    bucket = table.get(chunk)
+                    if bucket is None:
+                        table[chunk] = bucket = array('I')
+                    bucket.append(position)
+            self.watermark = max(self.watermark, self.last_id + 1 if watermark is None else watermark)
+            self._recent = {item_id for item_id in self._recent if item_id >= self.watermark}
+
+    def search(self, value, max_distance, limit=None, before_id=None):
+        """Возвращает не больше limit пар (расстояние, id) хешей не дальше max_distance
+        по возрастанию расстояния, с before_id - только для id меньше before_id.
+        Ближайшие выбираются heapq.nsmallest без сортировки всех кандидатов, а если точных совпадений
+        набралось limit, остальные корзины не просматриваются (например, у одноцветных изображений)"""
+        chunks = _chunks(value)
+        with self._lock:
+            if limit:
+                exact = []
+                for position in self._tables[0].get(chunks[0], ()):
+                    item_id = self._ids[position]
+                    if self._hashes[position] == value and (before_id is None or item_id < before_id):
+                        exact.append((0, item_id))
+                        if len(exact) == limit:
+                            return exact
+            candidates = set()
+            for table, chunk in zip(self._tables, chunks):
+                for probe in _neighbours(chunk, max_distance // CHUNKS):
+                    bucket = table.get(probe)
+                    if bucket is not None:
+                        candidates.update(bucket)
+            found = ((distance, item_id) for distance, item_id in
+                     (((self._hashes[position] ^ value).bit_count(), self._ids[position]) for position in candidates)
+                     if distance <= max_distance and (before_id is None or item_id < before_id))
+            return heapq.nsmallest(limit, found) if limit else sorted(found)
+
+
+def _chunks(value):
+    return [(value >> (CHUNK_BITS * number)) & _CHUNK_MASK for number in range(CHUNKS)]
+
+
+def _neighbours(chunk, radius):
+    """Все значения части, отличающиеся от chunk не больше чем в radius битах"""
+    yield chunk
+    for distance in range(1, radius + 1):
+        for bits in combinations(range(CHUNK_BITS), distance):
+            flipped = chunk
+            for bit in bits:
+                flipped ^= 1 << bit
+            yield flipped
+
+
+duplicate_index = HammingIndex()  # Общий индекс процесса
+
+
+def refresh_index():
+    """Дополняет индекс изображениями начиная с нижней границы индекса: с хешем и теми,
+    что еще обрабатываются (есть задача обработки, не завершившаяся ошибкой).
+    При первом вызове загружает все хеши из базы"""
+    processing = exists().where(Job.kind == 'process_image', Job.status != 'failed',
+                                func.json_extract(Job.payload, '$.image_id') == Image.id)
+    rows = db.session.execute(
+        select(Image.id, Image.phash)
+        .where(Image.id >= duplicate_index.watermark, or_(Image.phash.is_not(None), processing))
+        .order_by(Image.id))
+    duplicate_index.add_many((image_id, int(phash, 16) if phash else None) for image_id, phash in rows)
+
+
+def find_similar(phash, max_distance, limit, exclude_id=0):
+    """Возвращает уже загруженные изображения, похожие на изображение с хешем phash,
+    от самого похожего. Удаленные изображения, оставшиеся в индексе, отбрасываются"""
+    refresh_index()
+    ids = [image_id for _, image_id in duplicate_index.search(int(phash, 16), max_distance, limit + 1)
+           if image_id != exclude_id][:limit]
+    if not ids:
+        return []
+    images = {image.id: image for image in Image.query.filter(Image.id.in_(ids)).all()}
+    return [images[image_id] for image_id in ids if image_id in images]
+
+
+def find_duplicate(phash, image_id, max_distance):
+    """Возвращает id самого похожего изображения, загруженного раньше image_id, или None.
+    Вызывается фоновой задачей, вычислившей хеш"""
+    refresh_index()
+    ids = [other_id for _, other_id in
+           duplicate_index.search(int(phash, 16), max_distance, DUPLICATE_CANDIDATES, before_id=image_id)]
+    if not ids:
+        return None
+    existing = set(db.session.scalars(select(Image.id).where(Image.id.in_(ids))))
+    return next((other_id for other_id in ids if other_id in existing), None)
@@ -0,0 +1,85 @@
+import csv
+import json
+import sys
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import select
+
+from models import db, CustomUser, Image, Comment
+
+"""Потоковая выгрузка пользователей, изображений и комментариев в формате NDJSON или CSV.
+Строки читаются из базы частями по EXPORT_CHUNK_SIZE (yield_per). Выбираются только столбцы,
+а не объекты модели (в отличие от CustomUser.query.all()), поэтому таблица не загружается в память
+целиком и карта идентичности сессии не растет. Каждая часть сразу преобразуется в текст
+и отдается клиенту, так что память не зависит от размера таблицы. Хеши паролей не выгружаются.
+Таблица users с адресами почты выгружается только из командной строки, по HTTP - HTTP_TABLES.
+Пример: flask --app app export images --format csv --output images.csv"""
+
+FORMATS = {'ndjson': 'application/x-ndjson', 'csv': 'text/csv; charset=utf-8'}  # Формат -> тип содержимого
+TABLES = {  # Имя выгрузки -> модель и выгружаемые столбцы
+    'users': (CustomUser, ('id', 'username', 'first_name', 'last_name', 'email', 'birth_date')),
+    'images': (Image, ('id', 'user_id', 'image_path', 'content_hash', 'description', 'width', 'height',
+                       'format', 'file_size', 'comment_count', 'timestamp')),
+    'comments': (Comment, ('id', 'image_id', 'user_id', 'content', 'timestamp')),
+}
+HTTP_TABLES = ('images', 'comments')  # Выгрузки, доступные любому вошедшему пользователю
+
+
+class _Echo:
+    """Файловый объект для csv.writer: writerow возвращает строку вместо записи"""
+
+    def write(self, value):
+        return value
+
+
+def _isoformat(value):
+    """Даты и время в NDJSON записываются в формате ISO 8601"""
+    return value.isoformat()
+
+
+def _encoder(table, fmt):
+    """Возвращает заголовок выгрузки и функцию, преобразующую часть строк в текст"""
+    fields = TABLES[table][1]
+    if fmt == 'csv':
+        writer = csv.writer(_Echo())
+        return writer.writerow(fields), lambda rows: ''.join(writer.writerow(row) for row in rows)
+
+    def ndjson(rows):
+        return ''.join(json.dumps(dict(zip(fields, row)), ensure_ascii=False, default=_isoformat) + '\n' for row in rows)
+    return '', ndjson
+
+
+def export_rows(table, fmt, chunk_size):
+    """Генератор выгрузки таблицы table: заголовок, затем текст каждой части из chunk_size строк.
+    Выполняется в контексте приложения (для ответа - через stream_with_context)"""
+    model, fields = TABLES[table]
+    header, encode = _encoder(table, fmt)
+    if header:
+        yield header
+    query = (select(*(getattr(model, field) for field in fields)).order_by(model.id)
+             .execution_options(yield_per=chunk_size))
+    try:
+        for rows in db.session.execute(query).partitions():
+            yield encode(rows)
+    finally:
+        db.session.rollback()  # Завершает транзакцию чтения, даже если клиент прервал загрузку
+
+
+@click.command('export')
+@click.argument('table', type=click.Choice(sorted(TABLES)))
+@click.option('--format', 'fmt', type=click.Choice(sorted(FORMATS)), default='ndjson', show_default=True,
+              help='Формат выгрузки')
+@click.option('--output', type=click.Path(dir_okay=False), help='Файл выгрузки (по умолчанию стандартный вывод)')
+@with_appcontext
+def export_command(table, fmt, output):
+    """Выгружает таблицу users, images или comments в NDJSON или CSV"""
+    # newline='': строки CSV уже заканчиваются на \r\n и не должны преобразовываться
+    out = open(output, 'w', encoding='utf-8', newline='') if output else sys.stdout
+    try:
+        for text in export_rows(table, fmt, current_app.config['EXPORT_CHUNK_SIZE']):
+            out.write(text)
+    finally:
+        if output:
+            out.close()
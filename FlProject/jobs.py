@@ -0,0 +1,180 @@
+import json
+import logging
+import os
+import signal
+import socket
+import time
+import traceback
+from datetime import datetime, timedelta
+from multiprocessing import get_context
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import and_, or_, select, update
+
+from duplicates import find_duplicate
+from metadata import extract_metadata
+from models import db, Image, Job
+
+"""Очередь фоновых задач в таблице job той же базы SQLite.
+Обработчик запроса добавляет задачу в своей транзакции (вместе со строкой изображения) и сразу отвечает,
+а разбор файла выполняют отдельные процессы-обработчики:
+    flask --app app run-jobs --concurrency 4
+Процесс забирает задачу условным UPDATE: задачу получает только тот, чей UPDATE изменил строку.
+Выполненная задача удаляется в одной транзакции с результатом. При ошибке задача повторяется
+с задержкой JOB_RETRY_DELAY * 2^(попытка - 1), после JOB_MAX_ATTEMPTS попыток получает статус failed.
+Задача процесса, завершившегося аварийно, снова становится доступной через JOB_LEASE секунд,
+поэтому обработчики задач должны быть идемпотентными"""
+
+CLAIM_CANDIDATES = 10  # Сколько задач просматривается за одну попытку взять задачу
+
+logger = logging.getLogger(__name__)
+handlers = {}  # Вид задачи -> обработчик
+_stopping = False
+
+
+def job_handler(kind):
+    """Декоратор регистрирует обработчик задач вида kind - функцию handler(session, **payload).
+    Обработчик только изменяет данные в сессии, фиксирует их очередь вместе с удалением задачи"""
+    def register(handler):
+        handlers[kind] = handler
+        return handler
+    return register
+
+
+def enqueue(session, kind, payload, max_attempts):
+    """Добавляет задачу с аргументами payload (словарь) в сессию без фиксации:
+    задача сохраняется в той же транзакции, что и данные, для которых она создана"""
+    job = Job(kind=kind, payload=json.dumps(payload), max_attempts=max_attempts)
+    session.add(job)
+    return job
+
+
+def _available(now, lease):
+    """Условие доступности задачи: ожидающая, срок которой наступил, или брошенная обработчиком"""
+    return or_(and_(Job.status == 'queued', Job.run_after <= now),
+               and_(Job.status == 'running', Job.locked_at < now - timedelta(seconds=lease)))
+
+
+def claim(session, worker, lease):
+    """Забирает одну доступную задачу и возвращает ее или None, если очередь пуста"""
+    now = datetime.utcnow()
+    candidates = session.execute(
+        select(Job.id, Job.status, Job.attempts, Job.max_attempts)
+        .where(_available(now, lease)).order_by(Job.run_after, Job.id).limit(CLAIM_CANDIDATES)).all()
+    for job_id, job_status, attempts, max_attempts in candidates:
+        if job_status == 'running' and attempts >= max_attempts:
+            # Брошенная задача, исчерпавшая попытки (например, обработчик падает на ней целиком)
+            values = {'status': 'failed', 'locked_at': None, 'locked_by': None,
+                      'last_error': 'Превышено время выполнения'}
+        else:
+            values = {'status': 'running', 'attempts': Job.attempts + 1, 'locked_at': now, 'locked_by': worker}
+        claimed = session.execute(
+            update(Job).where(Job.id == job_id, _available(now, lease)).values(**values)).rowcount
+        session.commit()
+        if claimed and values['status'] == 'running':
+            return session.get(Job, job_id)
+    session.commit()
+    return None
+
+
+def run_job(session, job, retry_delay):
+    """Выполняет взятую задачу. При ошибке откладывает повтор или помечает задачу как failed"""
+    job_id, attempts, max_attempts = job.id, job.attempts, job.max_attempts
+    handler = handlers.get(job.kind)
+    try:
+        if handler is None:
+            raise LookupError(f'Нет обработчика задач {job.kind}')
+        handler(session, **json.loads(job.payload))
+        session.delete(job)
+        session.commit()
+        return True
+    except Exception:
+        session.rollback()
+        failed = attempts >= max_attempts
+        logger.exception(f'Задача {job_id}: попытка {attempts} из {max_attempts} не удалась')
+        session.execute(update(Job).where(Job.id == job_id).values(
+            status='failed' if failed else 'queued',
+            run_after=datetime.utcnow() + timedelta(seconds=retry_delay * 2 ** (attempts - 1)),
+            locked_at=None, locked_by=None, last_error=traceback.format_exc(limit=5)))
+        session.commit()
+        return False
+
+
+def _stop(signum, frame):
+    global _stopping
+    _stopping = True
+
+
+def work(worker, once=False):
+    """Цикл процесса-обработчика (в контексте приложения): выполняет задачи по одной до сигнала
+    остановки (текущая задача при этом завершается), а с once=True - пока очередь не опустеет.
+    Возвращает число выполненных задач"""
+    signal.signal(signal.SIGINT, _stop)
+    signal.signal(signal.SIGTERM, _stop)
+    config = current_app.config
+    done = 0
+    try:
+        while not _stopping:
+            job = claim(db.session, worker, config['JOB_LEASE'])
+            if job is None:
+                if once:
+                    break
+                time.sleep(config['JOB_POLL_INTERVAL'])
+                continue
+            done += run_job(db.session, job, config['JOB_RETRY_DELAY'])
+    finally:
+        db.session.remove()
+    return done
+
+
+def _work_process(worker, once):
+    """Точка входа дочернего процесса: создает приложение заново (контекст spawn)"""
+    from app import app
+
+    logging.basicConfig(level=logging.INFO)
+    with app.app_context():
+        work(worker, once)
+
+
+@job_handler('process_image')
+def process_image(session, image_id):
+    """Размеры, формат, LQIP-заглушка и перцептивный хеш загруженного файла,
+    а по хешу - ранее загруженная копия изображения"""
+    image = session.get(Image, image_id)
+    if image is None:  # Изображение удалено до обработки
+        return
+    for name, value in (extract_metadata(image.image_path) or {}).items():
+        setattr(image, name, value)
+    image.duplicate_of_id = (find_duplicate(image.phash, image.id, current_app.config['DUPLICATE_MAX_DISTANCE'])
+                             if image.phash else None)
+
+
+@click.command('run-jobs')
+@click.option('--concurrency', default=os.cpu_count() or 1, show_default=True, help='Число процессов-обработчиков')
+@click.option('--once', is_flag=True, help='Выполнить накопившиеся задачи и завершиться')
+@with_appcontext
+def run_jobs_command(concurrency, once):
+    """Запускает процессы-обработчики фоновых задач"""
+    logging.basicConfig(level=logging.INFO)
+    name = f'{socket.gethostname()}:{os.getpid()}'
+    if concurrency <= 1:
+        click.echo(f'Выполнено задач: {work(name, once)}')
+        return
+    # spawn: каждый процесс открывает собственные соединения с базой
+    context = get_context('spawn')
+    processes = [context.Process(target=_work_process, args=(f'{name}/{number}', once))
+                 for number in range(concurrency)]
+    for process in processes:
+        process.start()
+
+    def forward(signum, frame):
+        for process in processes:
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGINT, forward)
+    signal.signal(signal.SIGTERM, forward)
+    for process in processes:
+        process.join()
@@ -0,0 +1,102 @@
+import base64
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import select, update
+
+from models import db, Image
+
+"""Метаданные загруженных изображений: размеры, формат, размер файла, LQIP-заглушка
+(крошечная WebP-копия в data URI, которая показывается размытым фоном, пока грузится оригинал)
+и перцептивный хеш для поиска похожих изображений (duplicates.py).
+Зная ширину и высоту, шаблоны резервируют место под изображение, и страница не сдвигается.
+Pillow импортируется внутри функции: без него загрузка работает, но метаданные не заполняются.
+Для уже загруженных файлов: flask --app app backfill-metadata"""
+
+PLACEHOLDER_SIZE = 16  # Длинная сторона заглушки, пикселей
+PLACEHOLDER_QUALITY = 40
+_TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}  # EXIF-поворот на 90 градусов: ширина и высота меняются местами
+
+
+def difference_hash(image):
+    """Возвращает 64-битный разностный хеш (dHash) в виде 16 шестнадцатеричных цифр:
+    каждый бит - сравнение яркости соседних пикселей копии 9x8 в оттенках серого.
+    Хеш почти не меняется при изменении размера, пережатии и небольшой цветокоррекции"""
+    from PIL import Image as PILImage
+
+    pixels = list(image.convert('L').resize((9, 8), PILImage.LANCZOS).getdata())
+    value = 0
+    for row in range(8):
+        for column in range(8):
+            left = pixels[row * 9 + column]
+            value = value << 1 | (left > pixels[row * 9 + column + 1])
+    return f'{value:016x}'
+
+
+def extract_metadata(path):
+    """Функция возвращает словарь со столбцами width, height, format, file_size, placeholder и phash
+    для файла изображения или None, если файл не читается как изображение"""
+    try:
+        from PIL import Image as PILImage, ImageOps
+    except ImportError:
+        return None
+    try:
+        with PILImage.open(path) as original:
+            image_format = original.format
+            width, height = original.size
+            if original.getexif().get(0x0112) in _TRANSPOSED_ORIENTATIONS:
+                width, height = height, width
+            # JPEG декодируется сразу в уменьшенном масштабе, без разбора полного изображения
+            original.draft('RGB', (PLACEHOLDER_SIZE * 2, PLACEHOLDER_SIZE * 2))
+            preview = ImageOps.exif_transpose(original)
+            phash = difference_hash(preview)
+            preview.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+            if preview.mode in ('RGBA', 'LA', 'PA') or 'transparency' in preview.info:
+                rgba = preview.convert('RGBA')
+                preview = PILImage.new('RGB', rgba.size, (255, 255, 255))
+                preview.paste(rgba, mask=rgba.getchannel('A'))  # Прозрачные области - на белом фоне
+            else:
+                preview = preview.convert('RGB')
+            buffer = io.BytesIO()
+            preview.save(buffer, 'WEBP', quality=PLACEHOLDER_QUALITY)
+    except (OSError, ValueError, PILImage.DecompressionBombError):
+        return None
+    return {
+        'width': width,
+        'height': height,
+        'format': image_format,
+        'file_size': os.path.getsize(path),
+        'placeholder': 'data:image/webp;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii'),
+        'phash': phash,
+    }
+
+
+@click.command('backfill-metadata')
+@click.option('--workers', default=None, type=int, help='Число потоков разбора файлов')
+@click.option('--batch-size', default=500, show_default=True)
+@with_appcontext
+def backfill_metadata_command(workers, batch_size):
+    """Заполняет метаданные изображений, у которых их еще нет.
+    Одинаковые файлы (адресуемое по содержимому хранилище) разбираются один раз"""
+    images = Image.__table__
+    updated, last_id = 0, 0
+    with ThreadPoolExecutor(workers) as executor:  # Pillow освобождает GIL при декодировании
+        while True:
+            rows = db.session.execute(
+                select(images.c.id, images.c.image_path)
+                .where(images.c.phash.is_(None), images.c.id > last_id)
+                .order_by(images.c.id).limit(batch_size)).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            paths = sorted({row.image_path for row in rows})
+            found = dict(zip(paths, executor.map(extract_metadata, paths)))
+            for row in rows:
+                if found[row.image_path] is not None:
+                    db.session.execute(update(images).where(images.c.id == row.id).values(**found[row.image_path]))
+                    updated += 1
+            db.session.commit()
+    click.echo(f'Обновлено изображений: {updated}')
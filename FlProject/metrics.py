@@ -0,0 +1,161 @@
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+"""Метрики запросов в текстовом формате Prometheus (маршрут /metrics).
+Для каждого маршрута собираются гистограммы задержки, числа SQL-запросов и времени в БД,
+а также счетчики ответов по статусам. SQL-запросы считаются через события SQLAlchemy
+и относятся к текущему HTTP-запросу через contextvars"""
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+UNMATCHED_ROUTE = 'unmatched'  # Метка для путей без маршрута, чтобы не плодить ряды по каждому URL
+
+
+class QueryStats:
+    """Число SQL-запросов и суммарное время в БД в рамках одного HTTP-запроса"""
+    __slots__ = ('count', 'duration')
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+
+_current_queries = ContextVar('current_queries', default=None)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _query_started(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._metrics_started = time.perf_counter()
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _query_finished(conn, cursor, statement, parameters, context, executemany):
+    stats = _current_queries.get()
+    if stats is not None and context is not None:
+        stats.count += 1
+        stats.duration += time.perf_counter() - getattr(context, '_metrics_started', time.perf_counter())
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин"""
+    __slots__ = ('buckets', 'counts', 'total', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Последняя корзина - +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def samples(self, name, labels):
+        """Строки гистограммы: накопленные корзины, сумма и количество"""
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{name}_sum{{{labels}}} {self.total}'
+        yield f'{name}_count{{{labels}}} {self.count}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MetricsRegistry:
+    """Хранилище метрик процесса"""
+
+    HISTOGRAMS = (
+        ('http_request_duration_seconds', 'Время обработки запроса, секунды', LATENCY_BUCKETS),
+        ('http_request_db_queries', 'Число SQL-запросов на один запрос', QUERY_BUCKETS),
+        ('http_request_db_seconds', 'Время выполнения SQL-запросов на один запрос, секунды', LATENCY_BUCKETS),
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}  # (method, route) -> гистограммы в порядке HISTOGRAMS
+        self._statuses = {}  # (method, route, status) -> количество
+        self._collectors = []
+
+    def observe_request(self, method, route, status, duration, queries, db_time):
+        """Учитывает завершенный HTTP-запрос"""
+        key = (method, route)
+        with self._lock:
+            histograms = self._histograms.get(key)
+            if histograms is None:
+                histograms = self._histograms[key] = tuple(Histogram(buckets) for _, _, buckets in self.HISTOGRAMS)
+            for histogram, value in zip(histograms, (duration, queries, db_time)):
+                histogram.observe(value)
+            status_key = (method, route, status)
+            self._statuses[status_key] = self._statuses.get(status_key, 0) + 1
+
+    def add_collector(self, collector):
+        """Регистрирует функцию, возвращающую дополнительные метрики
+        в виде списка (имя, описание, тип, значение)"""
+        self._collectors.append(collector)
+
+    def render(self):
+        """Возвращает все метрики в текстовом формате Prometheus"""
+        lines = []
+        with self._lock:
+            for index, (name, help_text, _) in enumerate(self.HISTOGRAMS):
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+                for (method, route), histograms in self._histograms.items():
+                    labels = f'method="{_escape(method)}",route="{_escape(route)}"'
+                    lines.extend(histograms[index].samples(name, labels))
+            lines += ['# HELP http_requests_total Число обработанных запросов по статусам',
+                      '# TYPE http_requests_total counter']
+            for (method, route, status), count in self._statuses.items():
+                lines.append(f'http_requests_total{{method="{_escape(method)}",route="{_escape(route)}",'
+                             f'status="{status}"}} {count}')
+        for collector in self._collectors:
+            for name, help_text, kind, value in collector():
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}', f'{name} {value}']
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+
+
+def _start_request():
+    """Запоминает время начала запроса и начинает подсчет SQL-запросов"""
+    g._metrics_stats = QueryStats()
+    g._metrics_token = _current_queries.set(g._metrics_stats)
+    g._metrics_started = time.perf_counter()
+
+
+def _record(status_code):
+    stats = g.pop('_metrics_stats', None)
+    if stats is None:  # Запрос уже учтен
+        return
+    duration = time.perf_counter() - g._metrics_started
+    _current_queries.reset(g.pop('_metrics_token'))
+    route = request.url_rule.rule if request.url_rule is not None else UNMATCHED_ROUTE
+    metrics.observe_request(request.method, route, status_code, duration, stats.count, stats.duration)
+
+
+def _finish_request(response):
+    _record(response.status_code)
+    return response
+
+
+def _teardown_request(exc):
+    """Запрос завершился необработанным исключением - after_request не вызывался"""
+    _record(500)
+
+
+def init_metrics(app):
+    """Подключает сбор метрик к приложению"""
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_teardown_request)
@@ -0,0 +1,49 @@
+"""add FTS5 search index for images and comments
+
+Revision ID: b7e3d1c5f8a2
+Revises: a4c2e9f1b7d3
+Create Date: 2025-02-14 17:22:48.530117
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7e3d1c5f8a2'
+down_revision = 'a4c2e9f1b7d3'
+branch_labels = None
+depends_on = None
+
+
+COMMENTS_OF = "(SELECT group_concat(content, ' ') FROM comment WHERE image_id = {image_id})"
+
+
+def upgrade():
+    op.execute("CREATE VIRTUAL TABLE image_fts USING fts5("
+               "description, comments, tokenize = 'unicode61 remove_diacritics 2')")
+    op.execute("INSERT INTO image_fts (rowid, description, comments) "
+               "SELECT id, description, " + COMMENTS_OF.format(image_id='image.id') + " FROM image")
+    op.execute("CREATE TRIGGER image_fts_ai AFTER INSERT ON image BEGIN "
+               "INSERT INTO image_fts (rowid, description, comments) VALUES (new.id, new.description, ''); END")
+    op.execute("CREATE TRIGGER image_fts_au AFTER UPDATE OF description ON image BEGIN "
+               "UPDATE image_fts SET description = new.description WHERE rowid = new.id; END")
+    op.execute("CREATE TRIGGER image_fts_ad AFTER DELETE ON image BEGIN "
+               "DELETE FROM image_fts WHERE rowid = old.id; END")
+    op.execute("CREATE TRIGGER comment_fts_ai AFTER INSERT ON comment BEGIN "
+               "UPDATE image_fts SET comments = " + COMMENTS_OF.format(image_id='new.image_id') +
+               " WHERE rowid = new.image_id; END")
+    op.execute("CREATE TRIGGER comment_fts_au AFTER UPDATE OF content, image_id ON comment BEGIN "
+               "UPDATE image_fts SET comments = " + COMMENTS_OF.format(image_id='old.image_id') +
+               " WHERE rowid = old.image_id; "
+               "UPDATE image_fts SET comments = " + COMMENTS_OF.format(image_id='new.image_id') +
+               " WHERE rowid = new.image_id; END")
+    op.execute("CREATE TRIGGER comment_fts_ad AFTER DELETE ON comment BEGIN "
+               "UPDATE image_fts SET comments = " + COMMENTS_OF.format(image_id='old.image_id') +
+               " WHERE rowid = old.image_id; END")
+
+
+def downgrade():
+    for trigger in ('comment_fts_ad', 'comment_fts_au', 'comment_fts_ai',
+                    'image_fts_ad', 'image_fts_au', 'image_fts_ai'):
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE IF EXISTS image_fts")
@@ -0,0 +1,72 @@
+"""index comments in their own FTS5 table
+
+Revision ID: c3f7a1e9d5b2
+Revises: b2e6c0a4d8f1
+Create Date: 2025-02-26 10:21:53.417062
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3f7a1e9d5b2'
+down_revision = 'b2e6c0a4d8f1'
+branch_labels = None
+depends_on = None
+
+
+COMMENTS_OF = "(SELECT group_concat(content, ' ') FROM comment WHERE image_id = {image_id})"
+
+
+def _drop_index():
+    for trigger in ('comment_fts_ad', 'comment_fts_au', 'comment_fts_ai',
+                    'image_fts_ad', 'image_fts_au', 'image_fts_ai'):
+        op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    op.execute("DROP TABLE IF EXISTS comment_fts")
+    op.execute("DROP TABLE IF EXISTS image_fts")
+
+
+def _create_image_triggers(columns, values):
+    op.execute("CREATE TRIGGER image_fts_ai AFTER INSERT ON image BEGIN "
+               f"INSERT INTO image_fts ({columns}) VALUES ({values}); END")
+    op.execute("CREATE TRIGGER image_fts_au AFTER UPDATE OF description ON image BEGIN "
+               "UPDATE image_fts SET description = new.description WHERE rowid = new.id; END")
+    op.execute("CREATE TRIGGER image_fts_ad AFTER DELETE ON image BEGIN "
+               "DELETE FROM image_fts WHERE rowid = old.id; END")
+
+
+def upgrade():
+    _drop_index()
+    op.execute("CREATE VIRTUAL TABLE image_fts USING fts5("
+               "description, tokenize = 'unicode61 remove_diacritics 2')")
+    op.execute("CREATE VIRTUAL TABLE comment_fts USING fts5("
+               "content, image_id UNINDEXED, tokenize = 'unicode61 remove_diacritics 2')")
+    op.execute("INSERT INTO image_fts (rowid, description) SELECT id, description FROM image")
+    op.execute("INSERT INTO comment_fts (rowid, content, image_id) SELECT id, content, image_id FROM comment")
+    _create_image_triggers('rowid, description', 'new.id, new.description')
+    op.execute("CREATE TRIGGER comment_fts_ai AFTER INSERT ON comment BEGIN "
+               "INSERT INTO comment_fts (rowid, content, image_id) VALUES (new.id, new.content, new.image_id); END")
+    op.execute("CREATE TRIGGER comment_fts_au AFTER UPDATE OF content, image_id ON comment BEGIN "
+               "UPDATE comment_fts SET content = new.content, image_id = new.image_id WHERE rowid = new.id; END")
+    op.execute("CREATE TRIGGER comment_fts_ad AFTER DELETE ON comment BEGIN "
+               "DELETE FROM comment_fts WHERE rowid = old.id; END")
+
+
+def downgrade():
+    _drop_index()
+    op.execute("CREATE VIRTUAL TABLE image_fts USING fts5("
+               "description, comments, tokenize = 'unicode61 remove_diacritics 2')")
+    op.execute("INSERT INTO image_fts (rowid, description, comments) "
+               "SELECT id, description, " + COMMENTS_OF.format(image_id='image.id') + " FROM image")
+    _create_image_triggers('rowid, description, comments', "new.id, new.description, ''")
+    op.execute("CREATE TRIGGER comment_fts_ai AFTER INSERT ON comment BEGIN "
+               "UPDATE image_fts SET comments = " + COMMENTS_OF.format(image_id='new.image_id') +
+               " WHERE rowid = new.image_id; END")
+    op.execute("CREATE TRIGGER comment_fts_au AFTER UPDATE OF content, image_id ON comment BEGIN "
+               "UPDATE image_fts SET comments = " + COMMENTS_OF.format(image_id='old.image_id') +
+               " WHERE rowid = old.image_id; "
+               "UPDATE image_fts SET comments = " + COMMENTS_OF.format(image_id='new.image_id') +
+               " WHERE rowid = new.image_id; END")
+    op.execute("CREATE TRIGGER comment_fts_ad AFTER DELETE ON comment BEGIN "
+               "UPDATE image_fts SET comments = " + COMMENTS_OF.format(image_id='old.image_id') +
+               " WHERE rowid = old.image_id; END")
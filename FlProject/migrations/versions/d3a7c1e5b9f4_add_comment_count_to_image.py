@@ -0,0 +1,31 @@
+"""add comment_count to image
+
+Revision ID: d3a7c1e5b9f4
+Revises: c9d4f2a6e1b8
+Create Date: 2025-02-18 10:31:52.118406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd3a7c1e5b9f4'
+down_revision = 'c9d4f2a6e1b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('image', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('comment_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.create_index('ix_image_comment_count', ['comment_count', 'id'], unique=False)
+
+    # Начальные значения счетчиков по существующим комментариям
+    op.execute('UPDATE image SET comment_count = (SELECT COUNT(*) FROM comment WHERE comment.image_id = image.id)')
+
+
+def downgrade():
+    # Без пересоздания таблицы, чтобы сохранить триггеры полнотекстового индекса
+    op.drop_index('ix_image_comment_count', table_name='image')
+    op.drop_column('image', 'comment_count')
@@ -1,6 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime
+from sqlalchemy import event, update
 
 db = SQLAlchemy() # Создание объекта SQLAlchemy
 
@@ -23,16 +24,78 @@ class Image(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('custom_user.id'), nullable=False)
     image_path = db.Column(db.String(300), nullable=False)
+    content_hash = db.Column(db.String(64), nullable=True, index=True)  # SHA-256 содержимого файла
     description = db.Column(db.String(500), nullable=True)
+    # Метаданные файла (metadata.py); пусто, если файл не удалось разобрать как изображение
+    width = db.Column(db.Integer, nullable=True)
+    height = db.Column(db.Integer, nullable=True)
+    format = db.Column(db.String(10), nullable=True)
+    file_size = db.Column(db.Integer, nullable=True)  # Байт
+    placeholder = db.Column(db.Text, nullable=True)  # LQIP-заглушка в виде data URI
+    phash = db.Column(db.String(16), nullable=True)  # Перцептивный хеш для поиска похожих (duplicates.py)
+    # Ранее загруженная копия изображения, найденная по хешу фоновой задачей; без внешнего ключа,
+    # чтобы удаление оригинала не затрагивало копии
+    duplicate_of_id = db.Column(db.Integer, nullable=True)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    # Число комментариев; поддерживается при добавлении и удалении комментариев (см. ниже)
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     user = db.relationship('CustomUser', backref='images')
 
+    __table_args__ = (
+        db.Index('ix_image_comment_count', 'comment_count', 'id'),  # Сортировка галереи по числу комментариев
+    )
+
+    @property
+    def filename(self):
+        """Путь файла относительно каталога загрузок (для маршрута uploaded_file)"""
+        return self.image_path.split('/', 1)[-1]
+
 class Comment(db.Model):
     "Модель комментариев для отображения в БД"
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('custom_user.id'), nullable=False)
-    image_id = db.Column(db.Integer, db.ForeignKey('image.id'), nullable=False)
+    image_id = db.Column(db.Integer, db.ForeignKey('image.id'), nullable=False, index=True)
     content = db.Column(db.String(500), nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
     user = db.relationship('CustomUser', backref='comments')
-    image = db.relationship('Image', backref='comments')
\ No newline at end of file
+    image = db.relationship('Image', backref='comments')
+
+
+"""Счетчик комментариев изображения изменяется в той же транзакции, что и сам комментарий,
+поэтому галерея выводит и сортирует изображения по числу комментариев без подсчета.
+Массовые вставки в обход ORM (flask seed) и расхождения исправляет flask reconcile-comments"""
+
+
+def _change_comment_count(connection, image_id, delta):
+    if image_id is not None:
+        connection.execute(update(Image.__table__).where(Image.__table__.c.id == image_id)
+                           .values(comment_count=Image.__table__.c.comment_count + delta))
+
+
+@event.listens_for(Comment, 'after_insert')
+def _comment_inserted(mapper, connection, target):
+    _change_comment_count(connection, target.image_id, 1)
+
+
+@event.listens_for(Comment, 'after_delete')
+def _comment_deleted(mapper, connection, target):
+    _change_comment_count(connection, target.image_id, -1)
+
+
+class Job(db.Model):
+    """Задача фоновой обработки (jobs.py).
+    Выполненные задачи удаляются, неудачные остаются со статусом failed и текстом ошибки"""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)  # Имя обработчика
+    payload = db.Column(db.Text, nullable=False, default='{}')  # Аргументы обработчика в JSON
+    status = db.Column(db.String(10), nullable=False, default='queued')  # queued, running или failed
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # Не раньше этого времени (UTC)
+    locked_at = db.Column(db.DateTime, nullable=True)  # Когда задачу взял обработчик
+    locked_by = db.Column(db.String(100), nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+
+    __table_args__ = (
+        db.Index('ix_job_status_run_after', 'status', 'run_after'),  # Выбор следующей задачи
+    )
@@ -0,0 +1,54 @@
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from models import db
+
+"""Вспомогательные средства для проверки числа SQL-запросов, которые выполняет маршрут.
+Позволяют убедиться, что стоимость страницы - фиксированное число запросов
+независимо от количества изображений и комментариев (нет проблемы N+1).
+
+Пример:
+    with app.app_context(), assert_num_queries(3):
+        client.get('/images')"""
+
+
+class QueryCounter:
+    """Собирает SQL-запросы, выполненные через движок приложения"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, 'before_cursor_execute', self._record)
+
+    @property
+    def count(self):
+        """Количество выполненных запросов"""
+        return len(self.statements)
+
+
+@contextmanager
+def count_queries(engine=None):
+    """Считает запросы, выполненные внутри блока with (нужен контекст приложения)"""
+    with QueryCounter(engine or db.engine) as counter:
+        yield counter
+
+
+@contextmanager
+def assert_num_queries(expected, engine=None):
+    """Проверяет, что внутри блока with выполнено ровно expected запросов.
+    При несовпадении возбуждает AssertionError со списком запросов"""
+    with count_queries(engine) as counter:
+        yield counter
+    if counter.count != expected:
+        listing = '\n'.join(f'{number}. {statement}' for number, statement in enumerate(counter.statements, 1))
+        raise AssertionError(f'Ожидалось запросов: {expected}, выполнено: {counter.count}\n{listing}')
@@ -0,0 +1,69 @@
+import re
+from contextlib import contextmanager
+
+from sqlalchemy import text
+
+from models import db, Image
+
+"""Полнотекстовый поиск изображений по описанию и комментариям.
+Используются виртуальные таблицы SQLite FTS5 image_fts (описания) и comment_fts (по строке
+на комментарий, id изображения в неиндексируемом столбце), см. миграции b7e3d1c5f8a2 и c3f7a1e9d5b2.
+Их поддерживают в актуальном состоянии триггеры на таблицах image и comment: новый комментарий
+добавляет в индекс одну строку, а не перестраивает документ изображения со всеми комментариями.
+Совпадения из обеих таблиц объединяются по изображению (все слова запроса должны встретиться
+в описании или в одном комментарии) и упорядочиваются по релевантности (bm25)"""
+
+SEARCH_LIMIT = 50
+MAX_TERMS = 10
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+
+# Оценки bm25 отрицательные: сумма выше у изображений, где совпадений больше. Описание важнее комментария
+_SEARCH_SQL = text(
+    'SELECT image_id FROM ('
+    'SELECT rowid AS image_id, bm25(image_fts, 5.0) AS rank FROM image_fts WHERE image_fts MATCH :match '
+    'UNION ALL '
+    'SELECT image_id, bm25(comment_fts) AS rank FROM comment_fts WHERE comment_fts MATCH :match'
+    ') GROUP BY image_id ORDER BY sum(rank) LIMIT :limit')
+
+_TRIGGERS_SQL = text("SELECT name, sql FROM sqlite_master WHERE type = 'trigger' "
+                     "AND (sql LIKE '%image_fts%' OR sql LIKE '%comment_fts%')")
+_REBUILD_SQL = (
+    'DELETE FROM image_fts',
+    'DELETE FROM comment_fts',
+    'INSERT INTO image_fts (rowid, description) SELECT id, description FROM image',
+    'INSERT INTO comment_fts (rowid, content, image_id) SELECT id, content, image_id FROM comment',
+)
+
+
+def build_match_query(query):
+    """Преобразует введенную строку в безопасный запрос FTS5:
+    каждое слово берется в кавычки и ищется как префикс, слова объединяются через AND"""
+    terms = _TERM_RE.findall(query)[:MAX_TERMS]
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search_images(query, limit=SEARCH_LIMIT):
+    """Возвращает список изображений, подходящих под запрос, в порядке релевантности"""
+    match = build_match_query(query)
+    if not match:
+        return []
+    ids = db.session.execute(_SEARCH_SQL, {'match': match, 'limit': limit}).scalars().all()
+    images = {image.id: image for image in Image.query.filter(Image.id.in_(ids)).all()}
+    return [images[image_id] for image_id in ids if image_id in images]
+
+
+@contextmanager
+def search_index_suspended():
+    """Для массовой вставки: на время блока триггеры индекса удаляются, после него индекс
+    перестраивается одним запросом и триггеры создаются заново. Все выполняется в текущей
+    транзакции сессии, поэтому при ошибке откат возвращает триггеры на место"""
+    connection = db.session.connection()
+    triggers = connection.execute(_TRIGGERS_SQL).all()
+    for name, _ in triggers:
+        connection.exec_driver_sql(f'DROP TRIGGER {name}')
+    yield
+    if triggers:  # Без триггеров индекса нет (миграция поиска не применена)
+        for statement in _REBUILD_SQL:
+            connection.exec_driver_sql(statement)
+        for _, sql in triggers:
+            connection.exec_driver_sql(sql)
@@ -0,0 +1,138 @@
+import hashlib
+import os
+import random
+import struct
+import zlib
+from datetime import date, datetime, timedelta
+from itertools import islice
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import func, insert, text
+from werkzeug.security import generate_password_hash
+
+from comment_counts import reconcile_comment_counts
+from metadata import extract_metadata
+from models import db, CustomUser, Image, Comment
+from search import search_index_suspended
+from storage import blob_name
+
+"""Команда flask seed заполняет базу синтетическими пользователями, изображениями и комментариями
+для проверки под нагрузкой. Данные детерминированы (--seed), строки вставляются пакетами
+(executemany) в одной транзакции, хеш пароля вычисляется один раз для всех пользователей,
+а изображения ссылаются на небольшой набор файлов-заглушек в хранилище.
+Полнотекстовый индекс и счетчики комментариев строятся один раз после вставки, а не на каждую строку.
+Пример: flask --app app seed --users 10000 --images 100000 --comments 1000000"""
+
+WORDS = ('закат', 'море', 'горы', 'город', 'лес', 'река', 'кот', 'собака', 'поезд', 'мост',
+         'снег', 'небо', 'цветы', 'портрет', 'улица', 'ночь', 'облака', 'озеро', 'корабль', 'поле')
+START_TIME = datetime(2024, 1, 1)
+
+
+def batched(iterable, size):
+    """Разбивает итератор на списки по size элементов"""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def phrase(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def placeholder_png(rng, width=640, height=480, columns=16, rows=12):
+    """PNG-изображение из columns x rows прямоугольников случайных цветов (без сторонних библиотек).
+    Перцептивные хеши таких заглушек различаются; у однотонных изображений хеш нулевой,
+    и все изображения базы оказались бы копиями друг друга"""
+    bounds = [column * width // columns for column in range(columns + 1)]
+    lines = []
+    for row in range(rows):
+        line = b'\x00' + b''.join(bytes(rng.randrange(256) for _ in range(3)) * (right - left)
+                                  for left, right in zip(bounds, bounds[1:]))
+        lines.append(line * ((row + 1) * height // rows - row * height // rows))
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    header = struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header)
+            + chunk(b'IDAT', zlib.compress(b''.join(lines))) + chunk(b'IEND', b''))
+
+
+def make_placeholders(count, rng, upload_folder):
+    """Сохраняет файлы-заглушки в хранилище под именами-хешами.
+    Возвращает список пар (путь image_path, хеш содержимого)"""
+    placeholders = []
+    for _ in range(max(1, count)):
+        data = placeholder_png(rng)
+        content_hash = hashlib.sha256(data).hexdigest()
+        name = blob_name(content_hash, 'placeholder.png')
+        path = os.path.join(upload_folder, name)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(data)
+        placeholders.append((f'{upload_folder}/{name}', content_hash))
+    return placeholders
+
+
+def _next_id(model):
+    return (db.session.scalar(db.select(func.max(model.id))) or 0) + 1
+
+
+@click.command('seed')
+@click.option('--users', default=1000, show_default=True, help='Число пользователей')
+@click.option('--images', default=10000, show_default=True, help='Число изображений')
+@click.option('--comments', default=50000, show_default=True, help='Число комментариев')
+@click.option('--placeholders', default=16, show_default=True, help='Число различных файлов-заглушек')
+@click.option('--password', default='seed-password', show_default=True, help='Пароль всех пользователей')
+@click.option('--seed', 'seed_value', default=0, show_default=True, help='Начальное значение генератора')
+@click.option('--batch-size', default=5000, show_default=True, help='Строк в одном пакете вставки')
+@with_appcontext
+def seed_command(users, images, comments, placeholders, password, seed_value, batch_size):
+    """Заполняет базу синтетическими данными для нагрузочного тестирования.
+    При --users 0 авторами изображений и комментариев становятся уже существующие пользователи"""
+    authors = []
+    if not users and images:
+        authors = db.session.scalars(db.select(CustomUser.id)).all()
+        if not authors:
+            raise click.UsageError('В базе нет пользователей - авторов изображений, укажите --users больше 0')
+    rng = random.Random(seed_value)
+    files = make_placeholders(placeholders, rng, current_app.config['UPLOAD_FOLDER'])
+    metadata = {path: extract_metadata(path) or {} for path, _ in files}  # Одинаковые для всех копий файла
+    hashed_password = generate_password_hash(password, method='pbkdf2:sha256')  # Один хеш на всех
+
+    db.session.execute(text('PRAGMA synchronous = OFF'))  # Только для этого соединения на время заполнения
+    with search_index_suspended():
+        first_user = _next_id(CustomUser)
+        user_ids = range(first_user, first_user + users)
+        rows = ({'id': user_id, 'username': f'seed{user_id}', 'email': f'seed{user_id}@example.com',
+                 'first_name': rng.choice(WORDS).title(), 'last_name': rng.choice(WORDS).title(),
+                 'birth_date': date(1970, 1, 1) + timedelta(days=rng.randrange(15000)), 'password': hashed_password}
+                for user_id in user_ids)
+        for batch in batched(rows, batch_size):
+            db.session.execute(insert(CustomUser), batch)
+        click.echo(f'Пользователей: {users}')
+        authors = user_ids or authors
+
+        first_image = _next_id(Image)
+        image_ids = range(first_image, first_image + images)
+        rows = ({'id': image_id, 'user_id': rng.choice(authors), 'image_path': path, 'content_hash': content_hash,
+                 'description': phrase(rng, 8), 'timestamp': START_TIME + timedelta(minutes=image_id),
+                 **metadata[path]}
+                for image_id in image_ids for path, content_hash in [rng.choice(files)])
+        for batch in batched(rows, batch_size):
+            db.session.execute(insert(Image), batch)
+        click.echo(f'Изображений: {images}')
+
+        if image_ids:
+            rows = ({'image_id': rng.choice(image_ids), 'user_id': rng.choice(authors), 'content': phrase(rng, 6),
+                     'timestamp': START_TIME + timedelta(seconds=number)}
+                    for number in range(comments))
+            for batch in batched(rows, batch_size):
+                db.session.execute(insert(Comment), batch)
+            click.echo(f'Комментариев: {comments}')
+            reconcile_comment_counts(db.session)  # Вставка в обход ORM не обновляет счетчики
+    db.session.commit()
+    click.echo('Данные созданы')
@@ -0,0 +1,26 @@
+from sqlalchemy import event
+
+"""Профиль SQLite, который применяется к каждому новому соединению движка приложения.
+Набор PRAGMA тот же, что в FastApiProject/app/sqlite_profile.py, там же описано назначение каждой.
+Значения задаются в конфигурации (SQLITE_PRAGMAS)"""
+
+
+def apply_sqlite_profile(engine, pragmas):
+    """Регистрирует установку PRAGMA при каждом новом соединении движка (для SQLite)"""
+    if engine.dialect.name != 'sqlite' or not pragmas:
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f'PRAGMA {name} = {value}')
+        finally:
+            cursor.close()
+
+
+def init_sqlite_profile(app, db):
+    """Применяет профиль из app.config['SQLITE_PRAGMAS'] к движку Flask-SQLAlchemy"""
+    with app.app_context():
+        apply_sqlite_profile(db.engine, app.config.get('SQLITE_PRAGMAS'))
@@ -0,0 +1,55 @@
+import hashlib
+import os
+import re
+import uuid
+
+"""Модуль адресуемого по содержимому хранилища загруженных файлов.
+Файл сохраняется под именем, равным SHA-256 его содержимого, в дереве каталогов
+uploads/ab/cd/<sha256>.<ext>. Одинаковые загрузки занимают место на диске один раз,
+а ссылками на файл служат записи Image с тем же content_hash.
+Изображения в приложении не удаляются, поэтому файлы из хранилища тоже не удаляются"""
+
+CHUNK_SIZE = 64 * 1024  # Размер блока чтения/записи (64 КБ)
+_EXTENSION_RE = re.compile(r'^\.[a-z0-9]{1,10}$')
+_BLOB_NAME_RE = re.compile(r'^[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(\.[a-z0-9]{1,10})?$')
+
+
+def blob_name(content_hash, original_filename=''):
+    """Возвращает путь файла относительно каталога загрузок по его хешу"""
+    extension = os.path.splitext(original_filename or '')[1].lower()
+    if not _EXTENSION_RE.match(extension):
+        extension = ''
+    return f'{content_hash[:2]}/{content_hash[2:4]}/{content_hash}{extension}'
+
+
+def is_content_addressed(name):
+    """Проверяет, что путь - имя-хеш из хранилища; содержимое по такому пути не меняется"""
+    return bool(_BLOB_NAME_RE.match(name))
+
+
+def store_file(file, upload_folder):
+    """Потоково сохраняет объект FileStorage в хранилище, вычисляя SHA-256 по ходу записи.
+    Возвращает пару (путь относительно upload_folder, хеш содержимого).
+    Если такой файл уже есть, повторная копия удаляется"""
+    temp_dir = f'{upload_folder}_tmp'  # Тот же диск, чтобы перенос был атомарным
+    os.makedirs(temp_dir, exist_ok=True)
+    temp_path = os.path.join(temp_dir, uuid.uuid4().hex)
+    digest = hashlib.sha256()
+    try:
+        with open(temp_path, 'wb') as out:
+            for chunk in iter(lambda: file.stream.read(CHUNK_SIZE), b''):
+                digest.update(chunk)
+                out.write(chunk)
+        content_hash = digest.hexdigest()
+        name = blob_name(content_hash, file.filename)
+        target = os.path.join(upload_folder, name)
+        if os.path.exists(target):
+            os.remove(temp_path)
+        else:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(temp_path, target)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return name, content_hash
@@ -0,0 +1,52 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+"""Общая настройка тестов Flask-приложения (запуск из каталога FlProject: python -m pytest tests).
+База данных - временный файл SQLite; DATABASE_URL задается до импорта приложения,
+схема создается миграциями, как в рабочей базе (вместе с полнотекстовым индексом).
+Каталоги migrations и uploads подключаются по относительным путям, поэтому рабочий каталог - корень проекта"""
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEST_DIR = tempfile.mkdtemp(prefix='image_share_tests_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(TEST_DIR, 'test.db')}"
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+
+@pytest.fixture(scope='session')
+def app():
+    """Приложение с примененными миграциями"""
+    from flask_migrate import upgrade
+    from app import app as flask_app
+
+    flask_app.config.update(TESTING=True, WTF_CSRF_ENABLED=False)
+    with flask_app.app_context():
+        upgrade()
+    return flask_app
+
+
+@pytest.fixture(scope='session')
+def user(app):
+    """Пользователь, от имени которого выполняются запросы"""
+    from werkzeug.security import generate_password_hash
+    from models import db, CustomUser
+
+    with app.app_context():
+        user = CustomUser(username='tester', first_name='Test', last_name='User', email='tester@example.com',
+                          password=generate_password_hash('secret'))
+        db.session.add(user)
+        db.session.commit()
+        return user.id
+
+
+@pytest.fixture
+def logged_in_client(app, user):
+    """Клиент с сессией пользователя user"""
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user)
+        session['_fresh'] = True
+    return client
@@ -0,0 +1,93 @@
+from itertools import count
+
+import pytest
+
+from models import db, Comment, CustomUser, Image
+from querycount import assert_num_queries, count_queries
+
+"""Число SQL-запросов галереи и страницы изображения не зависит от количества изображений
+и комментариев: после роста данных страница выполняет столько же запросов, сколько до него"""
+
+PHASH = '0f0f0f0f0f0f0f0f'  # Общий хеш: у изображения есть похожие, и они тоже выводятся
+_numbers = count(1)
+
+
+def _comments(number):
+    """Комментарии разных авторов: автор каждого комментария загружается вместе с ним, а не отдельно"""
+    comments = []
+    for _ in range(number):
+        suffix = next(_numbers)
+        author = CustomUser(username=f'author{suffix}', first_name='Author', last_name=str(suffix),
+                            email=f'author{suffix}@example.com', password='-')
+        comments.append(Comment(user=author, content='комментарий'))
+    return comments
+
+
+def _add_images(user, number, comments, phash=None):
+    """Добавляет number изображений с comments комментариями у каждого и возвращает их id"""
+    images = [Image(user_id=user, image_path='uploads/test.png', description='тест', phash=phash,
+                    comments=_comments(comments)) for _ in range(number)]
+    db.session.add_all(images)
+    db.session.commit()
+    return [image.id for image in images]
+
+
+def _add_comments(image_id, number):
+    for comment in _comments(number):
+        comment.image_id = image_id
+        db.session.add(comment)
+    db.session.commit()
+
+
+def _queries(client, url):
+    """Число запросов страницы url; первый запрос загружает пользователя в кеш процесса"""
+    assert client.get(url).status_code == 200
+    with count_queries() as counter:
+        assert client.get(url).status_code == 200
+    return counter.count
+
+
+@pytest.fixture(autouse=True)
+def empty_tables(app):
+    """Каждая проверка начинается с пустой галереи, чтобы до роста данных страница была неполной"""
+    with app.app_context():
+        Comment.query.delete()
+        Image.query.delete()
+        db.session.commit()
+
+
+@pytest.mark.parametrize('url, page', [('/images', 1), ('/images?sort=popular', 1), ('/images?page=2', 2)])
+def test_gallery_query_count_is_constant(app, user, logged_in_client, url, page):
+    with app.app_context():
+        _add_images(user, (page - 1) * app.config['IMAGES_PER_PAGE'] + 2, 1)
+        expected = _queries(logged_in_client, url)
+        _add_images(user, 60, 5)
+        with assert_num_queries(expected):
+            assert logged_in_client.get(url).status_code == 200
+
+
+def test_image_detail_query_count_is_constant(app, user, logged_in_client):
+    with app.app_context():
+        image_id, _ = _add_images(user, 2, 1, phash=PHASH)  # Одно похожее изображение
+        url = f'/image/{image_id}'
+        expected = _queries(logged_in_client, url)
+        _add_comments(image_id, 120)
+        _add_images(user, 20, 3, phash=PHASH)
+        with assert_num_queries(expected):
+            response = logged_in_client.get(url)
+        assert response.status_code == 200
+        assert response.get_data(as_text=True).count('class="similar"') == 1
+
+
+def test_gallery_shows_latest_comments(app, user, logged_in_client):
+    """Под изображением выводятся только последние GALLERY_COMMENTS комментариев и ссылка на остальные"""
+    with app.app_context():
+        image_id, = _add_images(user, 1, 0)
+        for number in range(5):
+            db.session.add(Comment(user_id=user, image_id=image_id, content=f'комментарий-{number}'))
+        db.session.commit()
+    page = logged_in_client.get('/images').get_data(as_text=True)
+    assert 'Комментарии (5)' in page
+    assert [number for number in range(5) if f'комментарий-{number}<' in page] == [2, 3, 4]
+    assert page.index('комментарий-2') < page.index('комментарий-4')
+    assert 'Все комментарии' in page
@@ -0,0 +1,102 @@
+import threading
+from concurrent.futures import TimeoutError
+
+import pytest
+
+from write_queue import GroupCommitQueue
+
+"""Групповая фиксация (write_queue.py): пакеты, повтор по одной операции, ошибки вне операций
+и ограничение ожидания результата"""
+
+
+class FakeSession:
+    """Сессия, которая только считает фиксации и откаты"""
+
+    def __init__(self, log):
+        self.log = log
+
+    def commit(self):
+        self.log.append('commit')
+
+    def rollback(self):
+        self.log.append('rollback')
+
+    def close(self):
+        pass
+
+
+def _queue(session_factory, max_batch=256, max_delay=0.5, timeout=5):
+    write_queue = GroupCommitQueue()
+    write_queue.configure(session_factory, True, max_batch, max_delay, timeout)
+    return write_queue
+
+
+def _double(session, value):
+    return value * 2
+
+
+def _fail(session, value):
+    raise ValueError(value)
+
+
+def test_operations_are_committed_in_one_batch():
+    log = []
+    write_queue = _queue(lambda: FakeSession(log))
+    futures = [write_queue.submit(_double, value) for value in range(5)]
+    assert [future.result(timeout=5) for future in futures] == [0, 2, 4, 6, 8]
+    write_queue.close()
+    assert log == ['commit']
+    assert (write_queue.batches, write_queue.writes, write_queue.retries) == (1, 5, 0)
+
+
+def test_failed_batch_is_replayed_one_at_a_time():
+    log = []
+    write_queue = _queue(lambda: FakeSession(log))
+    futures = [write_queue.submit(_double, 1), write_queue.submit(_fail, 'плохая запись'),
+               write_queue.submit(_double, 3)]
+    assert futures[0].result(timeout=5) == 2
+    with pytest.raises(ValueError, match='плохая запись'):
+        futures[1].result(timeout=5)
+    assert futures[2].result(timeout=5) == 6
+    write_queue.close()
+    assert log == ['rollback', 'commit', 'rollback', 'commit']
+    assert (write_queue.batches, write_queue.writes, write_queue.retries) == (2, 2, 1)
+
+
+def test_session_error_fails_the_batch_and_keeps_the_writer():
+    broken = threading.Event()
+    broken.set()
+
+    def session_factory():
+        if broken.is_set():
+            raise RuntimeError('база недоступна')
+        return FakeSession([])
+
+    write_queue = _queue(session_factory, max_delay=0)
+    with pytest.raises(RuntimeError, match='база недоступна'):
+        write_queue.run(_double, 1)
+    writer = write_queue._thread
+    broken.clear()
+    assert write_queue.run(_double, 2) == 4
+    assert write_queue._thread is writer and writer.is_alive()
+    write_queue.close()
+    assert write_queue._thread is None
+
+
+def test_run_gives_up_after_timeout():
+    release = threading.Event()
+    calls = []
+
+    def blocking(session):
+        release.wait(5)
+
+    def record(session):
+        calls.append('record')
+
+    write_queue = _queue(lambda: FakeSession([]), max_batch=1, max_delay=0, timeout=0.05)
+    write_queue.submit(blocking)
+    with pytest.raises(TimeoutError):
+        write_queue.run(record)  # Писатель занят предыдущим пакетом
+    release.set()
+    write_queue.close()
+    assert calls == []  # Операция отменена, пока ждала в очереди
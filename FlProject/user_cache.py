@@ -0,0 +1,86 @@
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from models import CustomUser
+
+"""Модуль кеширует пользователей, которых восстанавливает load_user при каждом запросе.
+Кеш живет в памяти процесса, ограничен по размеру (LRU) и времени жизни записи (TTL).
+Объекты хранятся отсоединенными от сессии (expunge) и используются только для чтения.
+Запись удаляется из кеша после фиксации транзакции, изменившей или удалившей пользователя"""
+
+_CHANGED_KEY = 'user_cache_changed_ids'
+
+
+class TTLCache:
+    """Потокобезопасный LRU-кеш с ограниченным временем жизни записей"""
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def configure(self, maxsize, ttl):
+        """Применяет настройки из конфигурации приложения"""
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clear()
+
+    def get(self, key):
+        """Возвращает значение или None, если записи нет или она устарела"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[1] < time.monotonic():
+                if item is not None:
+                    del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return item[0]
+
+    def set(self, key, value):
+        """Сохраняет значение, вытесняя самую давно использованную запись при переполнении"""
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        """Удаляет запись из кеша"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Очищает кеш"""
+        with self._lock:
+            self._data.clear()
+
+
+user_cache = TTLCache()
+
+
+@event.listens_for(CustomUser, 'after_update')
+@event.listens_for(CustomUser, 'after_delete')
+def _remember_changed_user(mapper, connection, target):
+    """Запоминает id измененного пользователя до фиксации транзакции"""
+    user_cache.invalidate(target.id)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_CHANGED_KEY, set()).add(target.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_users(session):
+    """После фиксации удаляет из кеша всех измененных в транзакции пользователей"""
+    for user_id in session.info.pop(_CHANGED_KEY, ()):
+        user_cache.invalidate(user_id)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_changed_users(session):
+    """При откате изменения не применились, список очищается"""
+    session.info.pop(_CHANGED_KEY, None)
@@ -0,0 +1,161 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+
+from sqlalchemy.orm import Session
+
+"""Групповая фиксация небольших записей (комментарии, строки загруженных изображений).
+Операции передаются единственному потоку-писателю, который собирает их в пакет
+в течение WRITE_BATCH_DELAY секунд (или до WRITE_BATCH_SIZE операций) и выполняет одной
+транзакцией: на весь пакет приходится один COMMIT вместо одного на запрос.
+Поток запроса ждет результат своей операции (не дольше WRITE_TIMEOUT секунд), поэтому ответ
+отправляется после фиксации. Если пакет не удалось зафиксировать, операции повторяются по одной;
+любая другая ошибка (например, при открытии сессии) передается операциям пакета,
+а поток-писатель продолжает работу. Режим включается настройкой WRITE_BEHIND"""
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class GroupCommitQueue:
+    """Очередь записей с единственным писателем и групповой фиксацией.
+    Операция - функция operation(session, *args), которая добавляет объекты в сессию,
+    при необходимости вызывает flush и возвращает простое значение (например, id)"""
+
+    def __init__(self):
+        self.enabled = False
+        self.max_batch = 256
+        self.max_delay = 0.002
+        self.timeout = 30.0
+        self._session_factory = None
+        self._queue = queue.SimpleQueue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.batches = 0  # Зафиксированных транзакций
+        self.writes = 0  # Выполненных операций
+        self.retries = 0  # Пакетов, повторенных по одной операции
+
+    def configure(self, session_factory, enabled, max_batch, max_delay, timeout):
+        self._session_factory = session_factory
+        self.enabled = enabled
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.timeout = timeout
+
+    def submit(self, operation, *args):
+        """Ставит операцию в очередь и возвращает Future с ее результатом"""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((future, operation, args))
+        return future
+
+    def run(self, operation, *args):
+        """Выполняет операцию в составе пакета и возвращает ее результат.
+        Если результата нет за timeout секунд, еще не начатая операция отменяется
+        и выбрасывается TimeoutError"""
+        future = self.submit(operation, *args)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def close(self):
+        """Выполняет оставшиеся операции и останавливает поток-писатель"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._loop, name='group-commit', daemon=True)
+                    self._thread.start()
+
+    def _loop(self):
+        stopping = False
+        try:
+            while not stopping:
+                item = self._queue.get()
+                if item is _STOP:
+                    break
+                batch = [item]
+                deadline = time.perf_counter() + self.max_delay
+                while len(batch) < self.max_batch:
+                    timeout = deadline - time.perf_counter()
+                    if timeout <= 0:
+                        break
+                    try:
+                        item = self._queue.get(timeout=timeout)
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        stopping = True
+                        break
+                    batch.append(item)
+                try:
+                    self._execute(batch)
+                except Exception as e:
+                    logger.exception('Ошибка выполнения пакета из %s операций', len(batch))
+                    for future, _, _ in batch:
+                        if not future.done():
+                            future.set_exception(e)
+        finally:
+            with self._lock:
+                if self._thread is threading.current_thread():
+                    self._thread = None  # Следующая операция запустит новый поток
+
+    def _execute(self, batch):
+        """Выполняет пакет одной транзакцией, а при ошибке - каждую операцию отдельно"""
+        batch = [item for item in batch if item[0].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        session = self._session_factory()
+        try:
+            results = [operation(session, *args) for _, operation, args in batch]
+            session.commit()
+        except Exception:
+            session.rollback()
+            self.retries += 1
+            for item in batch:
+                self._execute_one(*item)
+            return
+        finally:
+            session.close()
+        self.batches += 1
+        self.writes += len(batch)
+        for (future, _, _), result in zip(batch, results):
+            future.set_result(result)
+
+    def _execute_one(self, future, operation, args):
+        session = self._session_factory()
+        try:
+            result = operation(session, *args)
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            future.set_exception(e)
+            return
+        finally:
+            session.close()
+        self.batches += 1
+        self.writes += 1
+        future.set_result(result)
+
+
+write_queue = GroupCommitQueue()
+
+
+def init_write_queue(app, db):
+    """Настраивает очередь по app.config; сессии писателя работают с движком приложения
+    напрямую, без контекста приложения Flask"""
+    with app.app_context():
+        engine = db.engine
+    write_queue.configure(lambda: Session(engine), app.config['WRITE_BEHIND'], app.config['WRITE_BATCH_SIZE'],
+                          app.config['WRITE_BATCH_DELAY'], app.config['WRITE_TIMEOUT'])
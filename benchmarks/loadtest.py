@@ -0,0 +1,450 @@
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import zlib
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode
+
+"""Нагрузочный бенчмарк трех реализаций проекта (DJProject, FlProject, FastApiProject).
+Каждое приложение копируется во временный каталог, получает чистую базу SQLite (миграции),
+запускается локально и заполняется начальными данными (изображения и комментарии).
+Затем виртуальные пользователи параллельно выполняют сценарий: регистрация, вход,
+просмотр галереи, комментарий и загрузка изображения.
+По каждому маршруту считаются число запросов, ошибки, пропускная способность
+и перцентили задержки p50/p95/p99. Отчет в формате JSON с отсортированными ключами
+удобно сравнивать между коммитами (--compare).
+
+Запуск из корня репозитория:
+    python -m benchmarks.loadtest --apps fastapi flask django --users 16 --iterations 20 --output report.json
+    python -m benchmarks.loadtest --apps fastapi --output new.json --compare report.json"""
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = 'Bench-password-1'
+# Файлы и каталоги с данными, которые не копируются: приложение стартует с чистой базой
+IGNORED = ('__pycache__', '*.db', '*.sqlite3', 'uploads', 'uploads_tmp', 'media', 'django_cache', 'instance')
+
+
+def percentile(values, p):
+    """Возвращает p-й перцентиль (в миллисекундах) списка задержек в секундах"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))
+    return round(ordered[index] * 1000, 2)
+
+
+def placeholder_png(seed, size=16):
+    """Небольшое PNG-изображение из пикселей случайных цветов, зависящих от seed: файлы различаются
+    и содержимым, и перцептивным хешем (у однотонных изображений он нулевой)"""
+    rng = random.Random(seed)
+    raw = b''.join(b'\x00' + bytes(rng.randrange(256) for _ in range(3 * size)) for _ in range(size))
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    header = struct.pack('>IIBBBBB', size, size, 8, 2, 0, 0, 0)
+    return b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', header) + chunk(b'IDAT', zlib.compress(raw)) + chunk(b'IEND', b'')
+
+
+class Recorder:
+    """Собирает задержки и статусы ответов по маршрутам"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {}
+        self.statuses = {}
+
+    def add(self, route, status, elapsed):
+        with self._lock:
+            self.latencies.setdefault(route, []).append(elapsed)
+            counts = self.statuses.setdefault(route, {})
+            counts[str(status)] = counts.get(str(status), 0) + 1
+
+    def report(self, elapsed):
+        """Сводка по маршрутам и в целом за время elapsed (секунды)"""
+        routes = {}
+        for route, latencies in self.latencies.items():
+            statuses = self.statuses[route]
+            routes[route] = {
+                'count': len(latencies),
+                'errors': sum(count for status, count in statuses.items() if int(status) >= 400),
+                'statuses': statuses,
+                'throughput_rps': round(len(latencies) / elapsed, 2),
+                'p50_ms': percentile(latencies, 50),
+                'p95_ms': percentile(latencies, 95),
+                'p99_ms': percentile(latencies, 99),
+                'max_ms': round(max(latencies) * 1000, 2),
+            }
+        total = sum(route['count'] for route in routes.values())
+        return {
+            'elapsed_s': round(elapsed, 3),
+            'requests': total,
+            'errors': sum(route['errors'] for route in routes.values()),
+            'throughput_rps': round(total / elapsed, 2) if elapsed else None,
+            'routes': routes,
+        }
+
+
+class Client:
+    """HTTP-клиент одного виртуального пользователя: хранит cookie сессии и не следует редиректам"""
+
+    def __init__(self, port, recorder=None):
+        self.port = port
+        self.recorder = recorder
+        self.cookies = {}
+
+    def request(self, route, method, path, fields=None, files=None):
+        """Выполняет запрос и возвращает (статус, тело); задержка учитывается под именем route"""
+        headers = {}
+        body = None
+        if files:
+            boundary = uuid.uuid4().hex
+            body = _multipart(boundary, fields or {}, files)
+            headers['Content-Type'] = f'multipart/form-data; boundary={boundary}'
+        elif fields is not None:
+            body = urlencode(fields)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{name}={value}' for name, value in self.cookies.items())
+
+        started = time.perf_counter()
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+        try:
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            content = response.read()
+        finally:
+            connection.close()
+        elapsed = time.perf_counter() - started
+
+        for header in response.headers.get_all('Set-Cookie') or ():
+            for name, morsel in SimpleCookie(header).items():
+                self.cookies[name] = morsel.value
+        if self.recorder is not None:
+            self.recorder.add(route, response.status, elapsed)
+        return response.status, content.decode('utf-8', 'replace')
+
+
+def _multipart(boundary, fields, files):
+    """Тело multipart/form-data из текстовых полей и файлов {поле: (имя, данные, тип)}"""
+    parts = []
+    for name, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode())
+    for name, (filename, data, content_type) in files.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+                     f'Content-Type: {content_type}\r\n\r\n'.encode() + data + b'\r\n')
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts)
+
+
+def _user_fields(username):
+    return {
+        'username': username, 'first_name': 'Bench', 'last_name': 'User',
+        'email': f'{username}@example.com', 'birth_date': '2000-01-01',
+        'password': PASSWORD, 'confirm_password': PASSWORD,
+    }
+
+
+def _upload_file(seed):
+    return {'file': (f'bench-{seed}.png', placeholder_png(seed), 'image/png')}
+
+
+class Scenario(ABC):
+    """Шаги сценария для конкретного приложения. Подклассы описывают его маршруты и формы"""
+    name = None
+    directory = None
+    image_link = None  # Регулярное выражение для id изображений на странице галереи
+
+    def setup_commands(self):
+        """Команды подготовки базы данных (миграции)"""
+        return []
+
+    @abstractmethod
+    def server_command(self, port):
+        """Команда запуска сервера на порту port"""
+
+    def image_ids(self, page):
+        return sorted({int(image_id) for image_id in re.findall(self.image_link, page)})
+
+    @abstractmethod
+    def register(self, client, username):
+        """Регистрирует пользователя username"""
+
+    @abstractmethod
+    def login(self, client, username):
+        """Входит под пользователем username"""
+
+    @abstractmethod
+    def browse(self, client):
+        """Открывает галерею и возвращает id изображений на странице"""
+
+    @abstractmethod
+    def upload(self, client, seed):
+        """Загружает изображение, сгенерированное из seed"""
+
+    @abstractmethod
+    def comment(self, client, image_id, text):
+        """Добавляет комментарий text к изображению image_id"""
+
+
+def _csrf_token(page, field):
+    match = re.search(rf'name="{field}"[^>]*value="([^"]+)"', page)
+    return match.group(1) if match else ''
+
+
+class DjangoScenario(Scenario):
+    name = 'django'
+    directory = os.path.join('DJProject', 'my_site')
+    image_link = r'/images/(\d+)/'
+
+    def setup_commands(self):
+        return [[sys.executable, 'manage.py', 'migrate', '--noinput', '-v', '0']]
+
+    def server_command(self, port):
+        return [sys.executable, 'manage.py', 'runserver', f'127.0.0.1:{port}', '--noreload']
+
+    def _post_form(self, client, route, path, fields, files=None):
+        """Получает форму (токен CSRF) и отправляет ее"""
+        _, page = client.request(f'GET {route}', 'GET', path)
+        fields = dict(fields, csrfmiddlewaretoken=_csrf_token(page, 'csrfmiddlewaretoken'))
+        return client.request(f'POST {route}', 'POST', path, fields, files)
+
+    def register(self, client, username):
+        self._post_form(client, '/reg/', '/reg/', _user_fields(username))
+
+    def login(self, client, username):
+        self._post_form(client, '/login/', '/login/', {'username': username, 'password': PASSWORD})
+
+    def browse(self, client):
+        return self.image_ids(client.request('GET /images/', 'GET', '/images/')[1])
+
+    def upload(self, client, seed):
+        file = _upload_file(seed)
+        self._post_form(client, '/images/upload/', '/images/upload/',
+                        {'title': f'Bench {seed}', 'description': f'Benchmark image {seed}'}, {'image': file['file']})
+
+    def comment(self, client, image_id, text):
+        self._post_form(client, '/images/<int:pk>/', f'/images/{image_id}/', {'content': text})
+
+
+class FlaskScenario(Scenario):
+    name = 'flask'
+    directory = 'FlProject'
+    image_link = r'/image/(\d+)'
+
+    def setup_commands(self):
+        return [[sys.executable, '-m', 'flask', '--app', 'app', 'db', 'upgrade']]
+
+    def server_command(self, port):
+        return [sys.executable, '-m', 'flask', '--app', 'app', 'run', '--port', str(port), '--with-threads']
+
+    def _post_form(self, client, route, fields):
+        """Получает форму Flask-WTF (токен CSRF) и отправляет ее"""
+        _, page = client.request(f'GET {route}', 'GET', route)
+        return client.request(f'POST {route}', 'POST', route, dict(fields, csrf_token=_csrf_token(page, 'csrf_token')))
+
+    def register(self, client, username):
+        self._post_form(client, '/register', _user_fields(username))
+
+    def login(self, client, username):
+        self._post_form(client, '/login', {'username': username, 'password': PASSWORD})
+
+    def browse(self, client):
+        return self.image_ids(client.request('GET /images', 'GET', '/images')[1])
+
+    def upload(self, client, seed):
+        file = _upload_file(seed)
+        client.request('POST /images', 'POST', '/images', {'description': f'Benchmark image {seed}'},
+                       {'image': file['file']})
+
+    def comment(self, client, image_id, text):
+        client.request('POST /images/<int:image_id>/comments', 'POST', f'/images/{image_id}/comments',
+                       {'comment': text})
+
+
+class FastApiScenario(Scenario):
+    name = 'fastapi'
+    directory = 'FastApiProject'
+    image_link = r'/get_image/(\d+)'
+
+    def server_command(self, port):
+        return [sys.executable, '-m', 'uvicorn', 'app.main:app', '--port', str(port), '--log-level', 'warning']
+
+    def register(self, client, username):
+        client.request('POST /reg', 'POST', '/reg', _user_fields(username))
+
+    def login(self, client, username):
+        client.request('POST /login', 'POST', '/login', {'username': username, 'password': PASSWORD})
+
+    def browse(self, client):
+        _, page = client.request('GET /images', 'GET', '/images')
+        match = re.search(r'name="user_id" value="(\d+)"', page)
+        client.user_id = match.group(1) if match else ''
+        return self.image_ids(page)
+
+    def upload(self, client, seed):
+        client.request('POST /upload_image', 'POST', '/upload_image', {'description': f'Benchmark image {seed}'},
+                       _upload_file(seed))
+
+    def comment(self, client, image_id, text):
+        client.request('POST /images/{image_id}/comments', 'POST', f'/images/{image_id}/comments',
+                       {'text': text, 'user_id': getattr(client, 'user_id', '')})
+
+
+SCENARIOS = {scenario.name: scenario for scenario in (DjangoScenario(), FlaskScenario(), FastApiScenario())}
+
+
+def start_server(scenario, workdir, port, log):
+    """Готовит базу данных, запускает приложение и ждет, пока оно начнет отвечать"""
+    env = dict(os.environ, PYTHONUNBUFFERED='1')
+    for command in scenario.setup_commands():
+        subprocess.run(command, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT, check=True)
+    server = subprocess.Popen(scenario.server_command(port), cwd=workdir, env=env,
+                              stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if server.poll() is not None:
+            break
+        try:
+            if Client(port).request('', 'GET', '/')[0] == 200:
+                return server
+        except OSError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f'Приложение {scenario.name} не запустилось, см. {log.name}')
+
+
+def seed(scenario, port, images, comments):
+    """Начальные данные (не учитываются в отчете): пользователь, изображения и комментарии к ним"""
+    client = Client(port)
+    scenario.register(client, 'seed')
+    scenario.login(client, 'seed')
+    for number in range(images):
+        scenario.upload(client, f'seed-{number}')
+    image_ids = scenario.browse(client)
+    for number in range(comments):
+        if image_ids:
+            scenario.comment(client, image_ids[number % len(image_ids)], f'Seed comment {number}')
+
+
+def virtual_user(scenario, port, recorder, number, args):
+    """Сценарий одного пользователя: регистрация, вход и iterations циклов
+    просмотр галереи -> комментарий -> (каждый upload_every цикл) загрузка"""
+    rng = random.Random(number)
+    client = Client(port, recorder)
+    username = f'bench{number}'
+    scenario.register(client, username)
+    scenario.login(client, username)
+    for iteration in range(args.iterations):
+        image_ids = scenario.browse(client)
+        if image_ids:
+            scenario.comment(client, rng.choice(image_ids), f'Comment {number}-{iteration}')
+        if args.upload_every and iteration % args.upload_every == 0:
+            scenario.upload(client, f'{number}-{iteration}')
+
+
+def run_app(scenario, args):
+    """Запускает приложение и прогоняет нагрузку; возвращает сводку по маршрутам"""
+    with tempfile.TemporaryDirectory(prefix=f'bench-{scenario.name}-') as tmp:
+        workdir = os.path.join(tmp, 'app')
+        shutil.copytree(os.path.join(REPO_DIR, scenario.directory), workdir,
+                        ignore=shutil.ignore_patterns(*IGNORED))
+        with open(os.path.join(tmp, 'server.log'), 'w+') as log:
+            server = start_server(scenario, workdir, args.port, log)
+            try:
+                seed(scenario, args.port, args.seed_images, args.seed_comments)
+                recorder = Recorder()
+                started = time.perf_counter()
+                with ThreadPoolExecutor(args.users) as pool:
+                    for future in [pool.submit(virtual_user, scenario, args.port, recorder, number, args)
+                                   for number in range(args.users)]:
+                        future.result()
+                elapsed = time.perf_counter() - started
+            except Exception:
+                log.seek(0)
+                sys.stderr.write(log.read()[-4000:])
+                raise
+            finally:
+                server.terminate()
+                server.wait()
+    return recorder.report(elapsed)
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report, baseline):
+    """Выводит изменение p95 и пропускной способности относительно прошлого отчета"""
+    lines = []
+    for app, result in sorted(report['apps'].items()):
+        old_routes = baseline.get('apps', {}).get(app, {}).get('routes', {})
+        for route, stats in sorted(result['routes'].items()):
+            old = old_routes.get(route)
+            if old is None:
+                lines.append(f'{app:8} {route:40} p95 {stats["p95_ms"]:>9} ms  (новый маршрут)')
+                continue
+            change = (stats['p95_ms'] - old['p95_ms']) / old['p95_ms'] * 100 if old['p95_ms'] else 0.0
+            lines.append(f'{app:8} {route:40} p95 {old["p95_ms"]:>9} -> {stats["p95_ms"]:>9} ms ({change:+.1f}%)'
+                         f'  rps {old["throughput_rps"]} -> {stats["throughput_rps"]}')
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Нагрузочный бенчмарк Django, Flask и FastAPI версий проекта')
+    parser.add_argument('--apps', nargs='+', choices=sorted(SCENARIOS), default=sorted(SCENARIOS))
+    parser.add_argument('--users', type=int, default=8, help='Число одновременных виртуальных пользователей')
+    parser.add_argument('--iterations', type=int, default=10, help='Циклов просмотра на пользователя')
+    parser.add_argument('--upload-every', type=int, default=5,
+                        help='Загрузка изображения каждый N-й цикл; 0 - без загрузок')
+    parser.add_argument('--seed-images', type=int, default=30, help='Изображений в начальных данных')
+    parser.add_argument('--seed-comments', type=int, default=60, help='Комментариев в начальных данных')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--output', help='Файл для отчета JSON (по умолчанию вывод в консоль)')
+    parser.add_argument('--compare', help='Отчет прошлого запуска для сравнения')
+    args = parser.parse_args()
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'users': args.users,
+            'iterations': args.iterations,
+            'upload_every': args.upload_every,
+            'seed_images': args.seed_images,
+            'seed_comments': args.seed_comments,
+        },
+        'apps': {name: run_app(SCENARIOS[name], args) for name in args.apps},
+    }
+    text = json.dumps(report, ensure_ascii=False, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            print(compare(report, json.load(f)), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()